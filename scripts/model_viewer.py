@@ -4,6 +4,7 @@ Streamlit UI to explore saved model artifacts.
 Launch with: streamlit run scripts/model_viewer.py
 """
 
+import sys
 import joblib
 import streamlit as st
 from pathlib import Path
@@ -12,21 +13,37 @@ import numpy as np
 
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from analysis.regression_scoring import RegressionArtifact
+from analysis.tree_inference import CompiledTreeEnsemble
+
 MODELS_DIR = PROJECT_ROOT / "results" / "models"
 TABLES_DIR = PROJECT_ROOT / "results" / "tables"
 
 
-def safe_load(path: Path):
+def safe_load(path: Path, loader=joblib.load):
     if not path.exists():
         st.warning(f"Missing: {path.name}")
         return None
     try:
-        return joblib.load(path)
+        return loader(path)
     except Exception as exc:  # pragma: no cover - UI helper
         st.error(f"Failed to load {path.name}: {exc}")
         return None
 
 
+def tree_feature_names(model, stem):
+    """Encoded feature names of a saved tree model, from its compiled .npz artifact"""
+    artifact = MODELS_DIR / f"{stem}.npz"
+    if artifact.exists():
+        return CompiledTreeEnsemble.load(artifact).feature_names
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        return list(names)
+    return [f"x{i}" for i in range(model.n_features_in_)]
+
+
 st.set_page_config(page_title="Sleep Analysis Models", layout="wide")
 st.title("Sleep Quality Analysis – Model Viewer")
 st.caption("Browse saved joblib models and key artifacts.")
@@ -73,54 +90,52 @@ if kmeans is not None:
         st.subheader("Cluster Characteristics")
         st.dataframe(pd.read_csv(cluster_table), use_container_width=True)
 
-# ---- Regression (Statsmodels OLS) ----
+# ---- Regression (OLS) ----
 st.header("Linear Regression (OLS)")
 reg_files = {
-    "Sleep Duration (Model 1)": "regression_model1_sleep_duration.joblib",
-    "Sleep Quality (Model 2)": "regression_model2_sleep_quality.joblib",
-    "Daytime Sleepiness (Model 3)": "regression_model3_daytime_sleepiness.joblib",
+    "Sleep Duration (Model 1)": "regression_model1_sleep_duration.json",
+    "Sleep Quality (Model 2)": "regression_model2_sleep_quality.json",
+    "Daytime Sleepiness (Model 3)": "regression_model3_daytime_sleepiness.json",
 }
 
 for label, fname in reg_files.items():
-    model = safe_load(MODELS_DIR / fname)
+    model = safe_load(MODELS_DIR / fname, loader=RegressionArtifact.load)
     if model is None:
         continue
     with st.expander(label, expanded=False):
         st.write("Coefficients")
-        st.dataframe(model.params.to_frame("coef"), use_container_width=True)
-        st.markdown(f"**R²:** {getattr(model, 'rsquared', 'n/a'):.4f}")
-        st.markdown(f"**Adj. R²:** {getattr(model, 'rsquared_adj', 'n/a'):.4f}")
-        st.text(model.summary())
+        st.dataframe(model.summary_frame(), use_container_width=True)
+        st.markdown(f"**R²:** {model.statistics['r2']:.4f}")
+        st.markdown(f"**Adj. R²:** {model.statistics['r2_adj']:.4f}")
+        st.write({key: model.statistics[key] for key in ("n", "rmse", "mae")})
 
 # ---- Decision Trees / Random Forest ----
 st.header("Decision Trees and Random Forest")
-dt_clf = safe_load(MODELS_DIR / "decision_tree_classifier_poor_sleep.joblib")
-rf_clf = safe_load(MODELS_DIR / "random_forest_classifier_poor_sleep.joblib")
-dt_reg = safe_load(MODELS_DIR / "decision_tree_regressor_sleep_duration.joblib")
-
-dt_features = [
-    "SMOKING_STATUS",
-    "ALCOHOL_STATUS",
-    "CIGARETTES_PER_DAY",
-    "AVG_DRINKS_DAY",
-    "RIDAGEYR",
-    "RIAGENDR",
-    "INDFMPIR",
-]
+tree_stems = {
+    "dt_clf": "decision_tree_classifier_poor_sleep",
+    "rf_clf": "random_forest_classifier_poor_sleep",
+    "dt_reg": "decision_tree_regressor_sleep_duration",
+}
+dt_clf = safe_load(MODELS_DIR / f"{tree_stems['dt_clf']}.joblib")
+rf_clf = safe_load(MODELS_DIR / f"{tree_stems['rf_clf']}.joblib")
+dt_reg = safe_load(MODELS_DIR / f"{tree_stems['dt_reg']}.joblib")
 
 if dt_clf is not None:
     st.subheader("Decision Tree – Poor Sleep (Classifier)")
     st.write({"depth": dt_clf.get_depth(), "leaves": dt_clf.get_n_leaves()})
-    st.bar_chart(pd.Series(dt_clf.feature_importances_, index=dt_features))
+    st.bar_chart(pd.Series(dt_clf.feature_importances_,
+                           index=tree_feature_names(dt_clf, tree_stems["dt_clf"])))
 
 if rf_clf is not None:
     st.subheader("Random Forest – Poor Sleep (Classifier)")
     st.write({"n_estimators": len(rf_clf.estimators_), "depth": rf_clf.max_depth})
-    st.bar_chart(pd.Series(rf_clf.feature_importances_, index=dt_features))
+    st.bar_chart(pd.Series(rf_clf.feature_importances_,
+                           index=tree_feature_names(rf_clf, tree_stems["rf_clf"])))
 
 if dt_reg is not None:
     st.subheader("Decision Tree – Sleep Duration (Regressor)")
     st.write({"depth": dt_reg.get_depth(), "leaves": dt_reg.get_n_leaves()})
-    st.bar_chart(pd.Series(dt_reg.feature_importances_, index=dt_features))
+    st.bar_chart(pd.Series(dt_reg.feature_importances_,
+                           index=tree_feature_names(dt_reg, tree_stems["dt_reg"])))
 
 st.info("To launch: `streamlit run scripts/model_viewer.py` (activate the venv first).")
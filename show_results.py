@@ -1,33 +1,43 @@
 """
 Generate a summary of model performance metrics.
 """
-import pandas as pd
+import json
 from pathlib import Path
-import sys
 
-# Add src to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root / 'src'))
 
-from analysis.regression import perform_regression_analysis
-from analysis.decision_trees import perform_decision_tree_analysis
 
-def generate_results_summary():
+def read_metrics(output_dir, name):
     """
-    Runs the analysis and generates a markdown file with model performance.
+    Read {output_dir}/metrics/{name}.json as written by the analysis steps
+    (analysis.reporting.write_metrics); None if the step has not been run.
     """
-    # Load data
-    data_path = project_root / 'data' / 'processed' / 'prepared_sleep_analysis_data.csv'
-    if not data_path.exists():
-        print(f"Error: Data file not found at {data_path}")
-        print("Please run 'python run_analysis.py' first to generate the data.")
-        return
+    path = Path(output_dir) / 'metrics' / f'{name}.json'
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
 
-    df = pd.read_csv(data_path)
+def _fmt(value):
+    # Non-finite metrics are stored as null
+    return 'n/a' if value is None else f"{value:.4f}"
 
-    # Run analyses
-    regression_results = perform_regression_analysis(df)
-    decision_tree_results = perform_decision_tree_analysis(df)
+
+def generate_results_summary(output_dir=None):
+    """
+    Generates a markdown file with model performance from the stored metrics.
+
+    Reads {output_dir}/metrics/*.json written by the analysis steps, so no
+    model is refitted.
+    """
+    output_dir = Path(output_dir) if output_dir is not None else project_root / 'results'
+    regression_results = read_metrics(output_dir, 'regression')
+    decision_tree_results = read_metrics(output_dir, 'decision_trees')
+    if regression_results is None or decision_tree_results is None:
+        print(f"Error: Model metrics not found in {output_dir / 'metrics'}")
+        print("Please run 'python run_analysis.py' first to fit the models.")
+        return
 
     # Create markdown content
     md_content = "# Model Performance Results\n\n"
@@ -42,33 +52,44 @@ def generate_results_summary():
         r2 = regression_results[model_key]['r2']
         mae = regression_results[model_key]['mae']
         rmse = regression_results[model_key]['rmse']
-        md_content += f"| {model_name} | {r2:.4f} | {mae:.4f} | {rmse:.4f} |\n"
+        md_content += f"| {model_name} | {_fmt(r2)} | {_fmt(mae)} | {_fmt(rmse)} |\n"
     md_content += "\n"
 
     # Decision Tree Models
     md_content += "## Decision Tree Models\n\n"
-    
+
     # Classification
     class_results = decision_tree_results['classification']
     md_content += "### Classification (Poor Sleep)\n\n"
-    md_content += f"- **Test Accuracy:** {class_results['test_accuracy']:.4f}\n"
-    md_content += f"- **Random Forest Test Accuracy:** {class_results['rf_accuracy']:.4f}\n\n"
+    md_content += f"- **Test Accuracy:** {_fmt(class_results['test_accuracy'])}\n"
+    md_content += f"- **Random Forest Test Accuracy:** {_fmt(class_results['rf_accuracy'])}\n\n"
 
     # Regression
     reg_results = decision_tree_results['regression']
     md_content += "### Regression (Sleep Duration)\n\n"
     md_content += "| Metric | Value |\n"
     md_content += "|---|---|\n"
-    md_content += f"| Test R² | {reg_results['test_r2']:.4f} |\n"
-    md_content += f"| Test RMSE | {reg_results['test_rmse']:.4f} |\n"
+    md_content += f"| Test R² | {_fmt(reg_results['test_r2'])} |\n"
+    md_content += f"| Test RMSE | {_fmt(reg_results['test_rmse'])} |\n"
     md_content += "\n"
 
+    # Cross-validation, when it has been run
+    cv_results = read_metrics(output_dir, 'cross_validation')
+    if cv_results is not None:
+        md_content += f"## Cross-Validation ({cv_results['n_splits']}-fold)\n\n"
+        md_content += "| Model | Outcome | Metric | Mean | SD |\n"
+        md_content += "|---|---|---|---|---|\n"
+        for row in cv_results['summary']:
+            md_content += (f"| {row['Model']} | {row['Outcome']} | {row['Metric']} | "
+                           f"{_fmt(row['Mean'])} | {_fmt(row['SD'])} |\n")
+        md_content += "\n"
+
     # Write to file
     results_path = project_root / 'model_results.md'
-    with open(results_path, 'w') as f:
+    with open(results_path, 'w', encoding='utf-8') as f:
         f.write(md_content)
 
     print(f"Model performance summary saved to: {results_path}")
 
 if __name__ == '__main__':
-    generate_results_summary()
\ No newline at end of file
+    generate_results_summary()
@@ -3,13 +3,28 @@ Analysis Module
 Contains functions for K-means clustering, linear regression, and decision trees
 """
 
-from .clustering import perform_kmeans_clustering
-from .regression import perform_regression_analysis
-from .decision_trees import perform_decision_tree_analysis
+from importlib import import_module
 
-__all__ = [
-    'perform_kmeans_clustering',
-    'perform_regression_analysis',
-    'perform_decision_tree_analysis'
-]
+# Exports are imported on first access, so light modules such as
+# analysis.regression_scoring and analysis.cluster_scoring load without
+# pulling in statsmodels or sklearn
+_EXPORTS = {
+    'perform_kmeans_clustering': 'clustering',
+    'perform_regression_analysis': 'regression',
+    'perform_decision_tree_analysis': 'decision_trees',
+    'configure_logging': 'reporting'
+}
 
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,118 @@
+"""
+Parallel Execution Helpers
+Process pools whose workers read large arrays from shared memory
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Arrays visible to job functions, keyed by name. Filled by the pool
+# initializer in worker processes and directly when running inline.
+_WORKER_ARRAYS = {}
+
+
+def resolve_n_jobs(n_jobs):
+    """
+    Translate an sklearn-style n_jobs value into a worker count
+
+    None and 1 mean serial, -1 means all cores, -2 all but one, etc.
+    """
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(cpu_count + 1 + n_jobs, 1)
+    return int(n_jobs)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    array.flags.writeable = False
+    return shm, array
+
+
+def _init_worker(specs):
+    for key, spec in specs.items():
+        _WORKER_ARRAYS[key] = _attach(spec)
+
+
+def worker_array(key):
+    """Return the shared, read-only array registered under key"""
+    return _WORKER_ARRAYS[key][1]
+
+
+class _InlinePool:
+    """Serial stand-in for a process pool, used when n_jobs resolves to 1"""
+
+    def map(self, fn, *iterables):
+        return list(map(fn, *iterables))
+
+
+class _SharedPool:
+    def __init__(self, executor):
+        self._executor = executor
+
+    def map(self, fn, *iterables):
+        return list(self._executor.map(fn, *iterables))
+
+
+@contextmanager
+def shared_pool(arrays, n_jobs=None):
+    """
+    Run jobs over read-only arrays shared between processes
+
+    Parameters:
+    -----------
+    arrays : dict
+        Name -> ndarray. Job functions fetch them with worker_array(name).
+    n_jobs : int or None
+        Number of worker processes (sklearn convention)
+
+    Yields:
+    -------
+    pool
+        Object with a map(fn, *iterables) method returning a list
+    """
+    n_workers = resolve_n_jobs(n_jobs)
+
+    if n_workers == 1:
+        previous = dict(_WORKER_ARRAYS)
+        for key, array in arrays.items():
+            # Same C layout as the shared copies, so reductions over the
+            # arrays give the same result whatever the worker count
+            _WORKER_ARRAYS[key] = (None, np.ascontiguousarray(array))
+        try:
+            yield _InlinePool()
+        finally:
+            _WORKER_ARRAYS.clear()
+            _WORKER_ARRAYS.update(previous)
+        return
+
+    segments = []
+    specs = {}
+    try:
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            segments.append(shm)
+            specs[key] = (shm.name, array.shape, array.dtype.str)
+
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(specs,)) as executor:
+            yield _SharedPool(executor)
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
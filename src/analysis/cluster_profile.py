@@ -0,0 +1,149 @@
+"""
+Cluster Profiles
+Per-cluster means, counts, modes and proportions from the label array
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class ClusterProfileAccumulator:
+    """
+    Accumulate per-cluster statistics with bincount reductions
+
+    Every statistic is a sum or a count per cluster, so chunks can be
+    added one at a time (update) and partial results from other chunks
+    or processes combined (merge). Missing values are skipped per column,
+    like pandas groupby aggregations.
+
+    Parameters:
+    -----------
+    n_clusters : int
+        Number of clusters (labels are 0..n_clusters-1)
+    mean_columns : list
+        Columns to average
+    mode_columns : list
+        Categorical columns to take the most frequent value of
+    proportion_columns : dict
+        Output name -> (column, value): share of non-missing rows equal to value
+    """
+
+    def __init__(self, n_clusters, mean_columns=(), mode_columns=(), proportion_columns=None):
+        self.n_clusters = n_clusters
+        self.mean_columns = list(mean_columns)
+        self.mode_columns = list(mode_columns)
+        self.proportion_columns = dict(proportion_columns or {})
+
+        self.sizes = np.zeros(n_clusters, dtype=np.int64)
+        self.sums = np.zeros((len(self.mean_columns), n_clusters))
+        self.counts = np.zeros((len(self.mean_columns), n_clusters), dtype=np.int64)
+        self.hits = np.zeros((len(self.proportion_columns), n_clusters), dtype=np.int64)
+        self.valid = np.zeros((len(self.proportion_columns), n_clusters), dtype=np.int64)
+        # column -> {category value: per-cluster counts}
+        self.category_counts = {col: {} for col in self.mode_columns}
+
+    def _bincount(self, labels, weights=None):
+        return np.bincount(labels, weights=weights, minlength=self.n_clusters)
+
+    def update(self, labels, frame):
+        """
+        Add one block of rows
+
+        Parameters:
+        -----------
+        labels : array of int
+            Cluster label per row
+        frame : DataFrame or dict of arrays
+            Column values aligned with labels
+        """
+        labels = np.asarray(labels, dtype=np.intp)
+        self.sizes += self._bincount(labels)
+
+        for i, col in enumerate(self.mean_columns):
+            values = np.asarray(frame[col], dtype=float)
+            valid = ~np.isnan(values)
+            self.sums[i] += self._bincount(labels, np.where(valid, values, 0.0))
+            self.counts[i] += self._bincount(labels[valid])
+
+        for i, (col, target) in enumerate(self.proportion_columns.values()):
+            values = np.asarray(frame[col], dtype=float)
+            valid = ~np.isnan(values)
+            self.hits[i] += self._bincount(labels[valid & (values == target)])
+            self.valid[i] += self._bincount(labels[valid])
+
+        for col in self.mode_columns:
+            values = np.asarray(frame[col], dtype=float)
+            valid = ~np.isnan(values)
+            categories, codes = np.unique(values[valid], return_inverse=True)
+            table = np.bincount(labels[valid] * len(categories) + codes.ravel(),
+                                minlength=self.n_clusters * len(categories))
+            table = table.reshape(self.n_clusters, len(categories))
+            counts = self.category_counts[col]
+            for j, category in enumerate(categories):
+                counts[category] = counts.get(category, 0) + table[:, j]
+        return self
+
+    def merge(self, other):
+        """Combine the statistics of another accumulator into this one"""
+        self.sizes += other.sizes
+        self.sums += other.sums
+        self.counts += other.counts
+        self.hits += other.hits
+        self.valid += other.valid
+        for col, other_counts in other.category_counts.items():
+            counts = self.category_counts[col]
+            for category, values in other_counts.items():
+                counts[category] = counts.get(category, 0) + values
+        return self
+
+    def means(self):
+        """Per-cluster means as a DataFrame (clusters x mean_columns)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = self.sums / self.counts
+        return pd.DataFrame(means.T, columns=self.mean_columns)
+
+    def proportions(self):
+        """Per-cluster proportions as a DataFrame (clusters x proportion names)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = self.hits / self.valid
+        return pd.DataFrame(shares.T, columns=list(self.proportion_columns))
+
+    def modes(self):
+        """Per-cluster modes as a DataFrame; ties go to the smallest value"""
+        modes = {}
+        for col in self.mode_columns:
+            counts = self.category_counts[col]
+            if not counts:
+                modes[col] = np.full(self.n_clusters, np.nan)
+                continue
+            categories = np.array(sorted(counts))
+            table = np.column_stack([counts[c] for c in categories])
+            mode = categories[table.argmax(axis=1)]
+            modes[col] = np.where(table.sum(axis=1) > 0, mode, np.nan)
+        return pd.DataFrame(modes, columns=self.mode_columns)
+
+
+def compute_cluster_profile(labels, frame, n_clusters, mean_columns=(),
+                            mode_columns=(), proportion_columns=None):
+    """
+    Compute every per-cluster statistic in one pass over the labels
+
+    Parameters:
+    -----------
+    labels : array of int
+        Cluster label per row
+    frame : DataFrame
+        Rows aligned with labels
+    n_clusters : int
+        Number of clusters
+    mean_columns, mode_columns, proportion_columns
+        See ClusterProfileAccumulator
+
+    Returns:
+    --------
+    ClusterProfileAccumulator
+        Accumulator holding the finished statistics
+    """
+    profile = ClusterProfileAccumulator(n_clusters, mean_columns, mode_columns,
+                                        proportion_columns)
+    return profile.update(labels, frame)
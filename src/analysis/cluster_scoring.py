@@ -0,0 +1,97 @@
+"""
+Cluster Scoring
+Assign new respondents to lifestyle clusters from a compact NumPy artifact
+"""
+
+import numpy as np
+
+
+class ClusterAssigner:
+    """
+    Fused feature selection, casting, scaling and nearest-centroid assignment
+
+    Holds only plain arrays (feature order, scaler mean and scale, cluster
+    centers), so scoring needs NumPy alone. Scaling is folded into the
+    centers once: with z = x / scale and C' = centers + mean / scale,
+    ||(x - mean) / scale - c||² = ||z - c'||², and the nearest center is
+    argmin(||c'||² - 2 z·c').
+
+    Parameters:
+    -----------
+    feature_names : list of str
+        Column order expected by the model
+    mean, scale : array
+        StandardScaler statistics, shape (n_features,)
+    centers : array
+        Cluster centers in scaled space, shape (n_clusters, n_features)
+    """
+
+    def __init__(self, feature_names, mean, scale, centers):
+        self.feature_names = [str(name) for name in feature_names]
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.centers = np.asarray(centers, dtype=float)
+
+        self._inv_scale = 1.0 / self.scale
+        self._shifted = self.centers + self.mean * self._inv_scale
+        self._shifted_norms = (self._shifted ** 2).sum(axis=1)
+
+    @property
+    def n_clusters(self):
+        return len(self.centers)
+
+    @classmethod
+    def from_models(cls, kmeans, scaler, feature_names):
+        """Build from a fitted K-means model and StandardScaler"""
+        return cls(feature_names, scaler.mean_, scaler.scale_, kmeans.cluster_centers_)
+
+    def save(self, path):
+        """Save the artifact as an uncompressed .npz of plain arrays"""
+        np.savez(path, feature_names=np.array(self.feature_names), mean=self.mean,
+                 scale=self.scale, centers=self.centers)
+
+    @classmethod
+    def load(cls, path):
+        """Load an artifact written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['feature_names'].tolist(), data['mean'], data['scale'],
+                       data['centers'])
+
+    def _features(self, batch):
+        if hasattr(batch, 'columns') or isinstance(batch, dict):
+            return np.column_stack([np.asarray(batch[name], dtype=float)
+                                    for name in self.feature_names])
+        X = np.asarray(batch, dtype=float)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(
+                f"Expected an array with {len(self.feature_names)} columns "
+                f"({', '.join(self.feature_names)})"
+            )
+        return X
+
+    def assign(self, batch, chunk_size=262144):
+        """
+        Assign a batch of respondents to clusters
+
+        Parameters:
+        -----------
+        batch : DataFrame, dict of arrays or 2D array
+            Raw (unscaled) features. Frames and dicts are selected by name;
+            arrays must already be in feature_names order.
+        chunk_size : int
+            Rows per block, bounding the n x k distance buffer
+
+        Returns:
+        --------
+        array
+            int32 cluster labels, -1 for rows with a missing feature
+        """
+        X = self._features(batch)
+        labels = np.empty(len(X), dtype=np.int32)
+        for start in range(0, len(X), chunk_size):
+            z = X[start:start + chunk_size] * self._inv_scale
+            distances = self._shifted_norms - 2 * z @ self._shifted.T
+            block = distances.argmin(axis=1).astype(np.int32)
+            block[np.isnan(z).any(axis=1)] = -1
+            labels[start:start + chunk_size] = block
+        return labels
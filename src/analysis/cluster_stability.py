@@ -0,0 +1,138 @@
+"""
+Cluster Stability
+Bootstrap K-means refits matched back to the reference clustering
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans
+
+from ._parallel import shared_pool, worker_array
+from .clustering import assign_to_centers
+
+# Hennig's thresholds for clusterboot-style Jaccard stability
+STABLE_JACCARD = 0.75
+DISSOLVED_JACCARD = 0.5
+
+
+def bootstrap_indices(n_samples, n_replicates, rng):
+    """Draw an (n_replicates, n_samples) matrix of resampled row indices in one call"""
+    dtype = np.int32 if n_samples < np.iinfo(np.int32).max else np.int64
+    return rng.integers(0, n_samples, size=(n_replicates, n_samples), dtype=dtype)
+
+
+def _stability_job(n_replicates, seed, n_clusters, n_init):
+    """Fit a batch of bootstrap replicates and match each to the reference"""
+    X = worker_array('X')
+    ref_labels = worker_array('labels')
+    ref_centers = worker_array('centers')
+    rng = np.random.default_rng(seed)
+
+    jaccard = np.empty((n_replicates, n_clusters))
+    shifts = np.empty((n_replicates, n_clusters))
+    centers = np.empty((n_replicates, n_clusters, X.shape[1]))
+
+    for b, rows in enumerate(bootstrap_indices(len(X), n_replicates, rng)):
+        kmeans = KMeans(n_clusters=n_clusters, n_init=n_init,
+                        random_state=int(rng.integers(2 ** 31 - 1)))
+        kmeans.fit(X[rows])
+
+        # Compare memberships on the distinct respondents drawn
+        drawn = np.unique(rows)
+        ref = ref_labels[drawn]
+        boot = assign_to_centers(X[drawn], kmeans.cluster_centers_)
+        overlap = np.bincount(ref * n_clusters + boot,
+                              minlength=n_clusters * n_clusters).reshape(n_clusters, n_clusters)
+        union = (overlap.sum(axis=1)[:, None] + overlap.sum(axis=0)[None, :] - overlap)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table = np.where(union > 0, overlap / union, 0.0)
+
+        # Best-matching replicate cluster per reference cluster (clusterboot)
+        jaccard[b] = table.max(axis=1)
+
+        # One-to-one matching to line up centroids
+        _, match = linear_sum_assignment(-table)
+        centers[b] = kmeans.cluster_centers_[match]
+        shifts[b] = np.sqrt(((centers[b] - ref_centers) ** 2).sum(axis=1))
+
+    return jaccard, shifts, centers
+
+
+def bootstrap_cluster_stability(X_scaled, n_clusters=4, n_replicates=200, reference=None,
+                                n_init=10, n_jobs=1, batch_size=10, random_state=42):
+    """
+    Bootstrap stability of a K-means clustering
+
+    Each replicate refits K-means on a resample of the rows. Per reference
+    cluster it reports the best-match Jaccard similarity on the resampled
+    respondents and the shift of the Hungarian-matched centroid.
+
+    Parameters:
+    -----------
+    X_scaled : array
+        Scaled feature matrix the reference clustering was fitted on
+    n_clusters : int
+        Number of clusters
+    n_replicates : int
+        Number of bootstrap replicates
+    reference : fitted KMeans, optional
+        Reference clustering (fitted here with n_init when omitted)
+    n_init : int
+        K-means initializations per replicate
+    n_jobs : int
+        Worker processes. Batches of replicates run in a process pool
+        that reads X_scaled from shared memory.
+    batch_size : int
+        Replicates per job. Each job draws its index matrix in one call.
+    random_state : int
+        Seed for the resamples and fits
+
+    Returns:
+    --------
+    dict
+        summary (per-cluster table), jaccard and shifts (replicates x
+        clusters), centers (replicates x clusters x features)
+    """
+    X_scaled = np.asarray(X_scaled, dtype=float)
+    if reference is None:
+        reference = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=n_init)
+        reference.fit(X_scaled)
+    ref_centers = reference.cluster_centers_
+    ref_labels = assign_to_centers(X_scaled, ref_centers).astype(np.int64)
+
+    sizes = [batch_size] * (n_replicates // batch_size)
+    if n_replicates % batch_size:
+        sizes.append(n_replicates % batch_size)
+    seeds = [int(s.generate_state(1)[0])
+             for s in np.random.SeedSequence(random_state).spawn(len(sizes))]
+
+    arrays = {'X': X_scaled, 'labels': ref_labels, 'centers': ref_centers}
+    with shared_pool(arrays, n_jobs) as pool:
+        batches = pool.map(_stability_job, sizes, seeds,
+                           [n_clusters] * len(sizes), [n_init] * len(sizes))
+
+    jaccard = np.concatenate([b[0] for b in batches])
+    shifts = np.concatenate([b[1] for b in batches])
+    centers = np.concatenate([b[2] for b in batches])
+
+    summary = pd.DataFrame({
+        'N': np.bincount(ref_labels, minlength=n_clusters),
+        'Mean_Jaccard': jaccard.mean(axis=0),
+        'SD_Jaccard': jaccard.std(axis=0, ddof=1) if n_replicates > 1 else np.nan,
+        'Pct_Stable': (jaccard >= STABLE_JACCARD).mean(axis=0),
+        'Pct_Dissolved': (jaccard < DISSOLVED_JACCARD).mean(axis=0),
+        'Centroid_Mean_Shift': shifts.mean(axis=0),
+        'Centroid_RMS_Shift': np.sqrt((shifts ** 2).mean(axis=0)),
+        # Average per-feature SD of the matched centroids across replicates
+        'Centroid_Dispersion': centers.std(axis=0).mean(axis=1)
+    })
+    summary.index.name = 'CLUSTER'
+
+    return {
+        'summary': summary,
+        'jaccard': jaccard,
+        'shifts': shifts,
+        'centers': centers,
+        'n_replicates': n_replicates
+    }
@@ -3,11 +3,12 @@ K-Means Clustering Analysis
 Identify lifestyle clusters based on smoking, alcohol, and demographics
 """
 
+import logging
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
@@ -15,6 +16,87 @@ import seaborn as sns
 from pathlib import Path
 import joblib
 
+from ._parallel import shared_pool, worker_array
+from .reporting import get_logger, log_section, write_metrics
+from .cluster_scoring import ClusterAssigner
+from .cluster_profile import ClusterProfileAccumulator, compute_cluster_profile
+from .plotting import ClusterDensityGrid
+from .silhouette import silhouette_score_chunked, silhouette_score_sampled
+
+logger = get_logger(__name__)
+
+# Above this many rows auto-k switches to the sampled silhouette estimator
+AUTO_SILHOUETTE_MAX_N = 20000
+
+# Above this many rows the PCA projection uses a randomized solver and is
+# drawn as a binned density image instead of one marker per respondent
+DENSITY_PLOT_MIN_N = 50000
+
+CLUSTERING_FEATURES = [
+    'SMOKING_STATUS', 'ALCOHOL_STATUS', 'RIDAGEYR', 
+    'RIAGENDR', 'INDFMPIR', 'CIGARETTES_PER_DAY', 'AVG_DRINKS_DAY'
+]
+
+
+SLEEP_OUTCOMES = ['SLD012', 'SLQ030', 'SLQ120', 'POOR_SLEEP']
+
+# Gender is coded 1=Male, 2=Female. Profiled as mode and % male instead of a mean.
+CLUSTER_PROFILE_SPEC = {
+    'mean_columns': ['SMOKING_STATUS', 'ALCOHOL_STATUS', 'RIDAGEYR', 'INDFMPIR',
+                     'CIGARETTES_PER_DAY', 'AVG_DRINKS_DAY'] + SLEEP_OUTCOMES,
+    'mode_columns': ['RIAGENDR'],
+    'proportion_columns': {'Male_Pct': ('RIAGENDR', 1)}
+}
+
+
+def _cluster_tables(profile):
+    """
+    Build the cluster characteristics and sleep outcome tables from a profile
+
+    Parameters:
+    -----------
+    profile : ClusterProfileAccumulator
+        Profile accumulated with CLUSTER_PROFILE_SPEC
+
+    Returns:
+    --------
+    tuple : (cluster_summary, sleep_by_cluster)
+    """
+    means = profile.means()
+    modes = profile.modes()
+    shares = profile.proportions()
+    
+    cluster_summary = pd.DataFrame({
+        'Smoking_Status': means['SMOKING_STATUS'].round(2),
+        'Alcohol_Status': means['ALCOHOL_STATUS'].round(2),
+        'Age': means['RIDAGEYR'].round(2),
+        'Gender_Mode': modes['RIAGENDR'],
+        'Male_Pct': shares['Male_Pct'].round(2),
+        'Income_Ratio': means['INDFMPIR'].round(2),
+        'Cigarettes/Day': means['CIGARETTES_PER_DAY'].round(2),
+        'Drinks/Day': means['AVG_DRINKS_DAY'].round(2),
+        'N': profile.sizes
+    })
+    cluster_summary.index.name = 'CLUSTER'
+    
+    sleep_by_cluster = means[SLEEP_OUTCOMES].round(2)
+    sleep_by_cluster['SEQN'] = profile.sizes
+    # Cluster ids stay float here, as in the left-merged frame this table
+    # used to be grouped from
+    sleep_by_cluster.index = pd.Index(np.arange(profile.n_clusters, dtype=float), name='CLUSTER')
+    
+    # Like groupby, only report clusters that have members
+    present = profile.sizes > 0
+    return cluster_summary[present], sleep_by_cluster[present]
+
+
+def _encode_clustering_features(X):
+    """Cast the categorical clustering codes to float"""
+    for col in ['SMOKING_STATUS', 'ALCOHOL_STATUS', 'RIAGENDR']:
+        if col in X.columns:
+            X[col] = X[col].astype(float)
+    return X
+
 
 def prepare_clustering_data(df):
     """
@@ -31,10 +113,7 @@ def prepare_clustering_data(df):
         Scaled features, feature names, and complete cases dataframe
     """
     # Select features for clustering
-    features = [
-        'SMOKING_STATUS', 'ALCOHOL_STATUS', 'RIDAGEYR', 
-        'RIAGENDR', 'INDFMPIR', 'CIGARETTES_PER_DAY', 'AVG_DRINKS_DAY'
-    ]
+    features = list(CLUSTERING_FEATURES)
     
     # Get complete cases
     df_complete = df[features + ['SEQN']].dropna()
@@ -43,12 +122,7 @@ def prepare_clustering_data(df):
     X = df_complete[features].copy()
     
     # Encode categorical variables
-    if 'SMOKING_STATUS' in X.columns:
-        X['SMOKING_STATUS'] = X['SMOKING_STATUS'].astype(float)
-    if 'ALCOHOL_STATUS' in X.columns:
-        X['ALCOHOL_STATUS'] = X['ALCOHOL_STATUS'].astype(float)
-    if 'RIAGENDR' in X.columns:
-        X['RIAGENDR'] = X['RIAGENDR'].astype(float)
+    X = _encode_clustering_features(X)
     
     # Standardize features
     scaler = StandardScaler()
@@ -57,9 +131,213 @@ def prepare_clustering_data(df):
     return X_scaled, features, df_complete, scaler
 
 
-def find_optimal_clusters(X_scaled, max_k=8):
+def _min_sq_distances(X, centers):
+    """Squared distance from each row to its nearest center, one center at a time"""
+    d2 = np.full(len(X), np.inf)
+    for center in centers:
+        np.minimum(d2, ((X - center) ** 2).sum(axis=1), out=d2)
+    return d2
+
+
+def _add_center(X, centers, rng, d2):
+    """
+    Seed one more center by D² sampling against the existing centers
+
+    d2 holds each row's squared distance to its nearest existing center
+    and is updated in place against the new center only, so each
+    addition needs O(n * d) memory.
+    """
+    total = d2.sum()
+    if total <= 0:
+        idx = rng.integers(len(X))
+    else:
+        idx = rng.choice(len(X), p=d2 / total)
+    np.minimum(d2, ((X - X[idx]) ** 2).sum(axis=1), out=d2)
+    return np.vstack([centers, X[idx]])
+
+
+def _fit_k_chain(X, k_values, seed, warm_start):
+    """
+    Fit one K-means initialization for each k in k_values
+
+    With warm_start the fit for each k is seeded from the previous k's
+    converged centers plus one D²-sampled center; otherwise every k gets
+    its own k-means++ initialization from the same seed.
+    """
+    rng = np.random.default_rng(seed)
+    fits = []
+    centers = None
+    for k in k_values:
+        if warm_start and centers is not None and len(centers) < k:
+            init = centers
+            d2 = _min_sq_distances(X, init)
+            while len(init) < k:
+                init = _add_center(X, init, rng, d2)
+            kmeans = KMeans(n_clusters=k, init=init, n_init=1, random_state=seed)
+        else:
+            kmeans = KMeans(n_clusters=k, n_init=1, random_state=seed)
+        kmeans.fit(X)
+        centers = kmeans.cluster_centers_
+        fits.append((k, kmeans.inertia_, centers))
+    return fits
+
+
+def _sweep_job(k_values, seed, warm_start):
+    return _fit_k_chain(worker_array('X'), k_values, seed, warm_start)
+
+
+def _gap_reference_job(seed, k_values, lower, upper, n_samples, n_init, warm_start):
+    """
+    Log within-cluster dispersion of one uniform reference dataset per k
+
+    The reference data is drawn inside the worker and fitted the way the
+    data was: the best of n_init initializations per k, as warm-started
+    chains when warm_start is set.
+    """
+    rng = np.random.default_rng(seed)
+    reference = rng.uniform(lower, upper, size=(n_samples, len(lower)))
+    init_seeds = [int(s) for s in np.random.SeedSequence(seed).generate_state(n_init)]
+    if warm_start:
+        chains = [_fit_k_chain(reference, k_values, s, True) for s in init_seeds]
+    else:
+        chains = [_fit_k_chain(reference, [k], s, False) for k in k_values for s in init_seeds]
+    best = {}
+    for k, inertia, _ in (fit for chain in chains for fit in chain):
+        best[k] = min(best.get(k, np.inf), inertia)
+    return [np.log(best[k]) for k in k_values]
+
+
+def score_silhouette(X, labels, method='auto', sample_size=10000,
+                     max_memory_mb=64, random_state=42):
+    """
+    Score a clustering with the selected silhouette engine
+
+    Parameters:
+    -----------
+    X : array
+        Feature matrix
+    labels : array
+        Cluster labels
+    method : str
+        'exact' (sklearn), 'chunked' (exact, memory-bounded), 'sampled'
+        (stratified estimate with CI) or 'auto' (exact up to
+        AUTO_SILHOUETTE_MAX_N rows, sampled above)
+    sample_size : int
+        Rows scored by the sampled estimator
+    max_memory_mb : float
+        Distance block ceiling for the chunked and sampled engines
+    random_state : int
+        Seed for the sampled estimator
+
+    Returns:
+    --------
+    tuple : (score, ci)
+        Mean silhouette and (lower, upper) interval, or None when exact
+    """
+    from sklearn.metrics import silhouette_score
+
+    if method == 'auto':
+        method = 'exact' if len(X) <= AUTO_SILHOUETTE_MAX_N else 'sampled'
+    if method == 'exact':
+        return silhouette_score(X, labels), None
+    if method == 'chunked':
+        return silhouette_score_chunked(X, labels, max_memory_mb=max_memory_mb), None
+    if method == 'sampled':
+        estimate = silhouette_score_sampled(X, labels, sample_size=sample_size,
+                                            random_state=random_state,
+                                            max_memory_mb=max_memory_mb)
+        return estimate['score'], (estimate['ci_lower'], estimate['ci_upper'])
+    raise ValueError(f"Unknown silhouette method: {method}")
+
+
+def _silhouette_job(centers, silhouette_options):
+    X = worker_array('X')
+    labels = assign_to_centers(X, centers)
+    return score_silhouette(X, labels, **silhouette_options)
+
+
+def assign_to_centers(X, centers, chunk_size=65536):
+    """
+    Assign each row of X to its nearest center (squared Euclidean)
+
+    Parameters:
+    -----------
+    X : array
+        Feature matrix in the same space as centers
+    centers : array
+        Cluster centers, shape (k, n_features)
+    chunk_size : int
+        Rows processed per block, bounding the n x k distance buffer
+
+    Returns:
+    --------
+    array
+        Integer labels
+    """
+    centers = np.asarray(centers, dtype=float)
+    center_norms = (centers ** 2).sum(axis=1)
+    labels = np.empty(len(X), dtype=np.int32)
+    for start in range(0, len(X), chunk_size):
+        block = np.asarray(X[start:start + chunk_size], dtype=float)
+        # ||x||² is constant per row, so it can be dropped from the argmin
+        distances = center_norms - 2 * block @ centers.T
+        labels[start:start + chunk_size] = distances.argmin(axis=1)
+    return labels
+
+
+def project_pca(X, method='auto', batch_size=100000, random_state=42):
+    """
+    Project onto the first two principal components
+    
+    Parameters:
+    -----------
+    X : array
+        Scaled feature matrix
+    method : str
+        'full' (exact SVD), 'randomized', 'incremental' (batched, bounded
+        memory) or 'auto' (full up to DENSITY_PLOT_MIN_N rows, randomized above)
+    batch_size : int
+        Rows per batch for the incremental solver
+    random_state : int
+        Seed for the randomized solver
+    
+    Returns:
+    --------
+    tuple : (X_pca, pca)
+    """
+    if method == 'auto':
+        method = 'full' if len(X) <= DENSITY_PLOT_MIN_N else 'randomized'
+    if method == 'full':
+        pca = PCA(n_components=2)
+    elif method == 'randomized':
+        pca = PCA(n_components=2, svd_solver='randomized', random_state=random_state)
+    elif method == 'incremental':
+        pca = IncrementalPCA(n_components=2, batch_size=batch_size)
+    else:
+        raise ValueError(f"Unknown PCA method: {method}")
+    return pca.fit_transform(X), pca
+
+
+def _save_density_projection(grid, pca, path):
+    """Save a density-binned PCA projection colored by dominant cluster"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    mappable = grid.render(ax)
+    fig.colorbar(mappable, ax=ax, label='Cluster', ticks=range(grid.n_clusters))
+    ax.set_xlabel(f'PC1 ({pca.explained_variance_ratio_[0]:.2%} variance)')
+    ax.set_ylabel(f'PC2 ({pca.explained_variance_ratio_[1]:.2%} variance)')
+    ax.set_title('K-Means Clustering Results (PCA Projection, binned density)')
+    ax.grid(True, alpha=0.3)
+    fig.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+
+def find_optimal_clusters(X_scaled, max_k=8, k_range=None, n_init=10,
+                          n_jobs=1, warm_start=False, random_state=42,
+                          silhouette='auto', silhouette_sample_size=10000,
+                          max_memory_mb=64, method='silhouette', n_references=10):
     """
     Find optimal number of clusters using elbow method and silhouette score
+    or the gap statistic
     
     Parameters:
     -----------
@@ -67,36 +345,154 @@ def find_optimal_clusters(X_scaled, max_k=8):
         Scaled feature matrix
     max_k : int
         Maximum number of clusters to test
+    k_range : iterable of int, optional
+        Explicit k values to test (overrides max_k)
+    n_init : int
+        K-means initializations per k
+    n_jobs : int
+        Worker processes for the sweep. The (k, init) fits and the per-k
+        silhouette scores run as jobs in a process pool that reads
+        X_scaled from shared memory; results do not depend on n_jobs.
+    warm_start : bool
+        Seed each k from the converged centers of the previous k in the
+        same initialization chain
+    random_state : int
+        Seed for the initializations
+    silhouette : str
+        Silhouette engine: 'exact', 'chunked', 'sampled' or 'auto'
+        (see score_silhouette)
+    silhouette_sample_size : int
+        Rows scored per k by the sampled engine
+    max_memory_mb : float
+        Distance block ceiling for the chunked and sampled engines
+    method : str
+        'silhouette' (argmax silhouette) or 'gap' (Tibshirani et al. gap
+        statistic: smallest k with Gap(k) >= Gap(k+1) - s(k+1))
+    n_references : int
+        Uniform reference datasets for the gap statistic. They are drawn
+        over the bounding box of X_scaled and fitted across n_jobs processes.
     
     Returns:
     --------
     dict
-        Results with optimal k and metrics
+        Results with optimal k and metrics. silhouette_ci holds the
+        sampled engine's confidence intervals (None for exact scores);
+        gap and gap_se are included when method='gap'.
     """
-    from sklearn.metrics import silhouette_score
-    
-    inertias = []
-    silhouette_scores = []
-    k_range = range(2, max_k + 1)
-    
-    for k in k_range:
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        kmeans.fit(X_scaled)
-        inertias.append(kmeans.inertia_)
-        silhouette_scores.append(silhouette_score(X_scaled, kmeans.labels_))
+    silhouette_options = {
+        'method': silhouette,
+        'sample_size': silhouette_sample_size,
+        'max_memory_mb': max_memory_mb,
+        'random_state': random_state
+    }
+    k_range = range(2, max_k + 1) if k_range is None else sorted(k_range)
+    
+    # The same (k, seed) jobs run inline for n_jobs=1, so the worker count
+    # only changes the speed of the sweep
+    seeds = np.random.SeedSequence(random_state).generate_state(n_init)
+    if warm_start:
+        # One chain per initialization, each walking up the k range
+        jobs = [(list(k_range), int(seed), True) for seed in seeds]
+    else:
+        jobs = [([k], int(seed), False) for k in k_range for seed in seeds]
+    
+    with shared_pool({'X': np.asarray(X_scaled, dtype=float)}, n_jobs) as pool:
+        fits = [fit for chain in pool.map(_sweep_job, *zip(*jobs)) for fit in chain]
+        best = {}
+        for k, inertia, k_centers in fits:
+            if k not in best or inertia < best[k][0]:
+                best[k] = (inertia, k_centers)
+        inertias = [best[k][0] for k in k_range]
+        centers = [best[k][1] for k in k_range]
+        scored = pool.map(_silhouette_job, centers,
+                          [silhouette_options] * len(centers))
+        silhouette_scores = [score for score, _ in scored]
+        silhouette_ci = [ci for _, ci in scored]
     
     # Find optimal k (elbow + highest silhouette)
     optimal_k = k_range[np.argmax(silhouette_scores)]
     
-    return {
+    results = {
         'k_range': list(k_range),
         'inertias': inertias,
         'silhouette_scores': silhouette_scores,
+        'silhouette_ci': silhouette_ci,
+        'centers': centers,
         'optimal_k': optimal_k
     }
+    
+    if method == 'gap':
+        gap, gap_se = gap_statistic(X_scaled, k_range, inertias, n_references=n_references,
+                                    n_init=n_init, warm_start=warm_start, n_jobs=n_jobs,
+                                    random_state=random_state)
+        results['gap'] = gap
+        results['gap_se'] = gap_se
+        results['optimal_k'] = _gap_optimal_k(k_range, gap, gap_se)
+    elif method != 'silhouette':
+        raise ValueError(f"Unknown k selection method: {method}")
+    
+    return results
+
+
+def gap_statistic(X_scaled, k_range, inertias, n_references=10, n_init=10, warm_start=False,
+                  n_jobs=1, random_state=42):
+    """
+    Gap statistic from uniform reference datasets
+    
+    Parameters:
+    -----------
+    X_scaled : array
+        Scaled feature matrix
+    k_range : list of int
+        k values, ascending
+    inertias : list of float
+        Within-cluster sum of squares of the data for each k
+    n_references : int
+        Number of reference datasets (B)
+    n_init : int
+        K-means initializations per k, as used for the data's inertias
+    warm_start : bool
+        Whether the data's inertias came from warm-started chains; the
+        references are fitted the same way so the dispersions compare
+    n_jobs : int
+        Worker processes; one reference dataset per job
+    random_state : int
+        Seed for the reference datasets
+    
+    Returns:
+    --------
+    tuple : (gap, gap_se)
+        Gap(k) and s(k) = sd(k) * sqrt(1 + 1/B) for each k
+    """
+    X_scaled = np.asarray(X_scaled, dtype=float)
+    lower, upper = X_scaled.min(axis=0), X_scaled.max(axis=0)
+    seeds = [int(seed) for seed in
+             np.random.SeedSequence([random_state, 1]).generate_state(n_references)]
+    
+    with shared_pool({}, n_jobs) as pool:
+        reference_log_w = np.array(pool.map(
+            _gap_reference_job, seeds, [list(k_range)] * n_references,
+            [lower] * n_references, [upper] * n_references, [len(X_scaled)] * n_references,
+            [n_init] * n_references, [warm_start] * n_references
+        ))
+    
+    gap = reference_log_w.mean(axis=0) - np.log(inertias)
+    gap_se = reference_log_w.std(axis=0) * np.sqrt(1 + 1 / n_references)
+    return gap.tolist(), gap_se.tolist()
 
 
-def perform_kmeans_clustering(df, n_clusters=4, output_dir='results'):
+def _gap_optimal_k(k_range, gap, gap_se):
+    """Smallest k with Gap(k) >= Gap(k+1) - s(k+1), else the largest gap"""
+    for i in range(len(k_range) - 1):
+        if gap[i] >= gap[i + 1] - gap_se[i + 1]:
+            return k_range[i]
+    return k_range[int(np.argmax(gap))]
+
+
+def perform_kmeans_clustering(df, n_clusters=4, output_dir='results', quiet=False,
+                              k_range=None, n_jobs=1, warm_start=False,
+                              silhouette='auto', pca_method='auto', pca_plot='auto',
+                              n_bootstrap=0, k_method='silhouette'):
     """
     Perform K-means clustering analysis
     
@@ -108,29 +504,68 @@ def perform_kmeans_clustering(df, n_clusters=4, output_dir='results'):
         Number of clusters (None to auto-select)
     output_dir : str
         Directory to save results
+    quiet : bool
+        Skip rendering the cluster tables as text. Metrics are still
+        written to {output_dir}/metrics/clustering.json.
+    k_range : iterable of int, optional
+        k values to test when auto-selecting (default 2..8)
+    n_jobs : int
+        Worker processes for the auto-k sweep
+    warm_start : bool
+        Warm-start larger k from smaller solutions in the auto-k sweep
+    silhouette : str
+        Silhouette engine for the auto-k sweep (see score_silhouette)
+    pca_method : str
+        PCA solver for the projection figure (see project_pca)
+    pca_plot : str
+        'scatter', 'density' (2D histogram colored by dominant cluster)
+        or 'auto' (scatter up to DENSITY_PLOT_MIN_N rows)
+    n_bootstrap : int
+        Bootstrap replicates for the cluster stability table (0 to skip).
+        Replicates run across n_jobs processes.
+    k_method : str
+        Auto-k rule: 'silhouette' or 'gap' (see find_optimal_clusters)
     
     Returns:
     --------
     dict
         Clustering results
     """
-    print("\n" + "="*80)
-    print("K-MEANS CLUSTERING ANALYSIS")
-    print("="*80)
+    log_section(logger, "K-MEANS CLUSTERING ANALYSIS")
     
     # Prepare data
     X_scaled, feature_names, df_complete, scaler = prepare_clustering_data(df)
-    print(f"\nComplete cases for clustering: {len(df_complete)}")
+    logger.info(f"\nComplete cases for clustering: {len(df_complete)}")
+    
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    (output_path / 'figures').mkdir(exist_ok=True)
+    (output_path / 'tables').mkdir(exist_ok=True)
+    (output_path / 'models').mkdir(exist_ok=True)
     
+    init_centers = None
     # Find optimal clusters if not specified
     if n_clusters is None:
-        print("\nFinding optimal number of clusters...")
-        optimal_results = find_optimal_clusters(X_scaled)
+        logger.info("\nFinding optimal number of clusters...")
+        optimal_results = find_optimal_clusters(X_scaled, k_range=k_range, n_jobs=n_jobs,
+                                                warm_start=warm_start, silhouette=silhouette,
+                                                method=k_method)
         n_clusters = optimal_results['optimal_k']
-        print(f"Optimal number of clusters: {n_clusters}")
+        init_centers = optimal_results['centers'][optimal_results['k_range'].index(n_clusters)]
+        logger.info(f"Optimal number of clusters: {n_clusters}",
+                    extra={'fields': {'optimal_k': n_clusters}})
         
-        # Plot elbow and silhouette
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+        # Plot elbow and silhouette (and gap statistic when computed)
+        if 'gap' in optimal_results:
+            fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(21, 5))
+            ax3.errorbar(optimal_results['k_range'], optimal_results['gap'],
+                         yerr=optimal_results['gap_se'], fmt='go-', capsize=4)
+            ax3.set_xlabel('Number of Clusters (k)')
+            ax3.set_ylabel('Gap Statistic')
+            ax3.set_title('Gap Statistic')
+            ax3.grid(True)
+        else:
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
         
         ax1.plot(optimal_results['k_range'], optimal_results['inertias'], 'bo-')
         ax1.set_xlabel('Number of Clusters (k)')
@@ -139,6 +574,9 @@ def perform_kmeans_clustering(df, n_clusters=4, output_dir='results'):
         ax1.grid(True)
         
         ax2.plot(optimal_results['k_range'], optimal_results['silhouette_scores'], 'ro-')
+        if all(ci is not None for ci in optimal_results['silhouette_ci']):
+            lower, upper = zip(*optimal_results['silhouette_ci'])
+            ax2.fill_between(optimal_results['k_range'], lower, upper, color='r', alpha=0.2)
         ax2.set_xlabel('Number of Clusters (k)')
         ax2.set_ylabel('Silhouette Score')
         ax2.set_title('Silhouette Score')
@@ -149,92 +587,75 @@ def perform_kmeans_clustering(df, n_clusters=4, output_dir='results'):
         plt.close()
     
     # Perform clustering
-    print(f"\nPerforming K-means clustering with k={n_clusters}...")
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    logger.info(f"\nPerforming K-means clustering with k={n_clusters}...")
+    if init_centers is not None:
+        # Start from the sweep's best solution instead of repeating n_init fits
+        kmeans = KMeans(n_clusters=n_clusters, init=init_centers, n_init=1, random_state=42)
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
     cluster_labels = kmeans.fit_predict(X_scaled)
     
     # Add cluster labels to dataframe
     df_complete['CLUSTER'] = cluster_labels
     
-    # Analyze cluster characteristics
-    print("\nCluster Characteristics:")
-    print("-" * 80)
-    
-    cluster_summary = df_complete.groupby('CLUSTER').agg({
-        'SMOKING_STATUS': 'mean',
-        'ALCOHOL_STATUS': 'mean',
-        'RIDAGEYR': 'mean',
-        'INDFMPIR': 'mean',
-        'CIGARETTES_PER_DAY': 'mean',
-        'AVG_DRINKS_DAY': 'mean',
-        'SEQN': 'count'
-    }).round(2)
-
-    # Gender is coded 1=Male, 2=Female. Show mode and % male instead of a mean.
-    gender_mode = df_complete.groupby('CLUSTER')['RIAGENDR'].agg(
-        lambda s: s.mode().iloc[0] if not s.mode().empty else np.nan
+    # Analyze cluster characteristics and sleep outcomes in one pass
+    complete_mask = df[CLUSTERING_FEATURES + ['SEQN']].notna().all(axis=1).to_numpy()
+    profile = compute_cluster_profile(
+        cluster_labels,
+        {**{col: df_complete[col] for col in CLUSTERING_FEATURES},
+         **{col: df[col].to_numpy()[complete_mask] for col in SLEEP_OUTCOMES}},
+        n_clusters, **CLUSTER_PROFILE_SPEC
     )
-    gender_pct_male = df_complete.groupby('CLUSTER')['RIAGENDR'].apply(
-        lambda s: (s == 1).mean()
-    ).round(2)
-
-    cluster_summary['Gender_Mode'] = gender_mode
-    cluster_summary['Male_Pct'] = gender_pct_male
-    
-    cluster_summary = cluster_summary[['SMOKING_STATUS', 'ALCOHOL_STATUS', 'RIDAGEYR',
-                                       'Gender_Mode', 'Male_Pct', 'INDFMPIR',
-                                       'CIGARETTES_PER_DAY', 'AVG_DRINKS_DAY', 'SEQN']]
-    
-    cluster_summary.columns = ['Smoking_Status', 'Alcohol_Status', 'Age',
-                              'Gender_Mode', 'Male_Pct', 'Income_Ratio',
-                              'Cigarettes/Day', 'Drinks/Day', 'N']
-    # Show all columns so categorical summaries are visible
-    print(cluster_summary.to_string())
-    
-    # Compare sleep outcomes by cluster
-    df_with_clusters = df.merge(df_complete[['SEQN', 'CLUSTER']], on='SEQN', how='left')
-    
-    sleep_by_cluster = df_with_clusters.groupby('CLUSTER').agg({
-        'SLD012': 'mean',
-        'SLQ030': 'mean',
-        'SLQ120': 'mean',
-        'POOR_SLEEP': 'mean',
-        'SEQN': 'count'
-    }).round(2)
-    
-    print("\nSleep Outcomes by Cluster:")
-    print("-" * 80)
-    print(sleep_by_cluster)
+    cluster_summary, sleep_by_cluster = _cluster_tables(profile)
     
-    # Visualizations
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    (output_path / 'figures').mkdir(exist_ok=True)
-    (output_path / 'models').mkdir(exist_ok=True)
+    verbose = not quiet and logger.isEnabledFor(logging.INFO)
+    if verbose:
+        logger.info("\nCluster Characteristics:")
+        logger.info("-" * 80)
+        # Show all columns so categorical summaries are visible
+        logger.info(cluster_summary.to_string())
+    
+    if verbose:
+        logger.info("\nSleep Outcomes by Cluster:")
+        logger.info("-" * 80)
+        logger.info(sleep_by_cluster.to_string())
+    
+    cluster_column = np.full(len(df), np.nan)
+    cluster_column[complete_mask] = cluster_labels
+    df_with_clusters = df.assign(CLUSTER=cluster_column).reset_index(drop=True)
     
+    # Visualizations
     # PCA for 2D visualization
-    pca = PCA(n_components=2)
-    X_pca = pca.fit_transform(X_scaled)
-    
-    plt.figure(figsize=(12, 8))
-    scatter = plt.scatter(X_pca[:, 0], X_pca[:, 1], c=cluster_labels, 
-                         cmap='viridis', alpha=0.6, s=50)
-    plt.colorbar(scatter, label='Cluster')
-    plt.xlabel(f'PC1 ({pca.explained_variance_ratio_[0]:.2%} variance)')
-    plt.ylabel(f'PC2 ({pca.explained_variance_ratio_[1]:.2%} variance)')
-    plt.title('K-Means Clustering Results (PCA Projection)')
-    plt.grid(True, alpha=0.3)
-    plt.savefig(f'{output_dir}/figures/clustering_pca.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    X_pca, pca = project_pca(X_scaled, method=pca_method)
+    
+    if pca_plot == 'auto':
+        pca_plot = 'scatter' if len(X_pca) <= DENSITY_PLOT_MIN_N else 'density'
+    if pca_plot == 'density':
+        grid = ClusterDensityGrid((X_pca[:, 0].min(), X_pca[:, 0].max()),
+                                  (X_pca[:, 1].min(), X_pca[:, 1].max()), n_clusters)
+        grid.update(X_pca[:, 0], X_pca[:, 1], cluster_labels)
+        _save_density_projection(grid, pca, f'{output_dir}/figures/clustering_pca.png')
+    else:
+        plt.figure(figsize=(12, 8))
+        scatter = plt.scatter(X_pca[:, 0], X_pca[:, 1], c=cluster_labels, 
+                             cmap='viridis', alpha=0.6, s=50)
+        plt.colorbar(scatter, label='Cluster')
+        plt.xlabel(f'PC1 ({pca.explained_variance_ratio_[0]:.2%} variance)')
+        plt.ylabel(f'PC2 ({pca.explained_variance_ratio_[1]:.2%} variance)')
+        plt.title('K-Means Clustering Results (PCA Projection)')
+        plt.grid(True, alpha=0.3)
+        plt.savefig(f'{output_dir}/figures/clustering_pca.png', dpi=300, bbox_inches='tight')
+        plt.close()
     
     # Cluster characteristics plot
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     
     # Sleep outcomes by cluster
-    sleep_cols = ['SLD012', 'SLQ030', 'SLQ120', 'POOR_SLEEP']
-    for idx, col in enumerate(sleep_cols):
+    sleep_means = profile.means()[SLEEP_OUTCOMES][profile.sizes > 0]
+    sleep_means.index = sleep_by_cluster.index
+    for idx, col in enumerate(SLEEP_OUTCOMES):
         ax = axes[idx // 2, idx % 2]
-        cluster_means = df_with_clusters.groupby('CLUSTER')[col].mean()
+        cluster_means = sleep_means[col]
         cluster_means.plot(kind='bar', ax=ax, color='steelblue')
         ax.set_title(f'{col} by Cluster')
         ax.set_xlabel('Cluster')
@@ -249,10 +670,36 @@ def perform_kmeans_clustering(df, n_clusters=4, output_dir='results'):
     cluster_summary.to_csv(f'{output_dir}/tables/cluster_characteristics.csv')
     sleep_by_cluster.to_csv(f'{output_dir}/tables/sleep_by_cluster.csv')
     
+    stability = None
+    if n_bootstrap:
+        from .cluster_stability import bootstrap_cluster_stability
+        
+        logger.info(f"\nBootstrapping cluster stability ({n_bootstrap} replicates)...")
+        stability = bootstrap_cluster_stability(X_scaled, n_clusters=n_clusters,
+                                                n_replicates=n_bootstrap, reference=kmeans,
+                                                n_jobs=n_jobs)
+        stability_summary = stability['summary'].round(3)
+        if verbose:
+            logger.info("\nCluster Stability (bootstrap):")
+            logger.info("-" * 80)
+            logger.info(stability_summary.to_string())
+        stability_summary.to_csv(f'{output_dir}/tables/cluster_stability.csv')
+    
     model_path = output_path / 'models' / 'kmeans_clustering.joblib'
     scaler_path = output_path / 'models' / 'kmeans_scaler.joblib'
     joblib.dump(kmeans, model_path)
     joblib.dump(scaler, scaler_path)
+    ClusterAssigner.from_models(kmeans, scaler, feature_names).save(
+        output_path / 'models' / 'kmeans_assigner.npz')
+
+    write_metrics(output_dir, 'clustering', {
+        'n': len(df_complete),
+        'n_clusters': n_clusters,
+        'inertia': kmeans.inertia_,
+        'cluster_summary': cluster_summary.reset_index(),
+        'sleep_by_cluster': sleep_by_cluster.reset_index(),
+        'stability': stability['summary'].reset_index() if stability else None
+    })
 
     return {
         'model': kmeans,
@@ -261,5 +708,257 @@ def perform_kmeans_clustering(df, n_clusters=4, output_dir='results'):
         'df_with_clusters': df_with_clusters,
         'n_clusters': n_clusters,
         'cluster_summary': cluster_summary,
-        'sleep_by_cluster': sleep_by_cluster
+        'sleep_by_cluster': sleep_by_cluster,
+        'stability': stability
+    }
+
+
+def iter_clustering_chunks(source, chunksize=100000, extra_columns=None):
+    """
+    Stream complete-case clustering rows from the prepared store
+
+    Parameters:
+    -----------
+    source : str, Path or DataFrame
+        Prepared CSV store (read lazily in chunks) or an in-memory frame
+    chunksize : int
+        Rows read per chunk
+    extra_columns : list, optional
+        Additional columns to carry along (not used for complete cases)
+
+    Yields:
+    -------
+    tuple : (X, chunk)
+        Float feature matrix and the matching complete-case rows
+    """
+    extra_columns = [c for c in (extra_columns or []) if c not in CLUSTERING_FEATURES + ['SEQN']]
+    columns = CLUSTERING_FEATURES + ['SEQN'] + extra_columns
+
+    if isinstance(source, pd.DataFrame):
+        chunks = (source[columns].iloc[start:start + chunksize]
+                  for start in range(0, len(source), chunksize))
+    else:
+        chunks = pd.read_csv(source, usecols=columns, chunksize=chunksize)
+
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=CLUSTERING_FEATURES + ['SEQN'])
+        if chunk.empty:
+            continue
+        X = _encode_clustering_features(chunk[CLUSTERING_FEATURES].copy())
+        yield X.to_numpy(dtype=float), chunk
+
+
+def _seed_minibatch_kmeans(X_scaled, n_clusters, batch_size, random_state):
+    """Mini-batch K-means seeded by a full-batch fit on the first rows"""
+    seed = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    seed.fit(X_scaled)
+    return MiniBatchKMeans(n_clusters=n_clusters, init=seed.cluster_centers_, n_init=1,
+                           batch_size=batch_size, random_state=random_state)
+
+
+def _minibatch_updates(kmeans, X_scaled, rng, batch_size):
+    X_scaled = X_scaled[rng.permutation(len(X_scaled))]
+    for start in range(0, len(X_scaled), batch_size):
+        kmeans.partial_fit(X_scaled[start:start + batch_size])
+
+
+def fit_streaming_kmeans(source, n_clusters=4, chunksize=100000, batch_size=4096,
+                         n_epochs=3, random_state=42, pca=None):
+    """
+    Fit a scaler and mini-batch K-means out-of-core
+
+    The first pass accumulates the running mean and variance with
+    StandardScaler.partial_fit; later passes feed scaled mini-batches to
+    MiniBatchKMeans.partial_fit. The centers are seeded by a full-batch
+    fit on the first batch_size rows (chunks are held until that many
+    have been read); after that only one chunk is held in memory, plus
+    fewer than n_components rows buffered for the PCA.
+
+    Parameters:
+    -----------
+    source : str, Path or DataFrame
+        Prepared CSV store or in-memory frame
+    n_clusters : int
+        Number of clusters
+    chunksize : int
+        Rows read per chunk
+    batch_size : int
+        Rows per mini-batch update
+    n_epochs : int
+        Passes over the store for the K-means updates
+    random_state : int
+        Seed for initialization and batch order
+    pca : IncrementalPCA, optional
+        Partially fitted on the scaled chunks during the first epoch.
+        Chunks shorter than n_components are buffered until the buffered
+        rows reach n_components; fewer than n_components rows at the end
+        of the store are left out.
+
+    Returns:
+    --------
+    tuple : (kmeans, scaler)
+    """
+    scaler = StandardScaler()
+    for X, _ in iter_clustering_chunks(source, chunksize):
+        scaler.partial_fit(X)
+
+    rng = np.random.default_rng(random_state)
+    kmeans = None
+    # Rows held back until there are enough to seed the centers
+    seed_rows = max(n_clusters, batch_size)
+    unseeded = []
+    pending = []
+    for epoch in range(n_epochs):
+        for X, _ in iter_clustering_chunks(source, chunksize):
+            X_scaled = scaler.transform(X)
+            if pca is not None and epoch == 0:
+                # Short chunks (fewer rows than components) are fitted together
+                # as soon as the buffered rows are enough for one update
+                pending.append(X_scaled)
+                if sum(len(block) for block in pending) >= pca.n_components:
+                    pca.partial_fit(np.vstack(pending))
+                    pending = []
+            if kmeans is None:
+                unseeded.append(X_scaled)
+                if sum(len(block) for block in unseeded) < seed_rows:
+                    continue
+                X_scaled = np.vstack(unseeded)
+                unseeded = []
+                kmeans = _seed_minibatch_kmeans(X_scaled, n_clusters, batch_size, random_state)
+            _minibatch_updates(kmeans, X_scaled, rng, batch_size)
+        pending = []
+        if kmeans is None:
+            # The whole store is smaller than one seeding batch
+            n_rows = sum(len(block) for block in unseeded)
+            if n_rows < n_clusters:
+                raise ValueError(f"Streaming K-means needs at least n_clusters={n_clusters} "
+                                 f"complete rows, got {n_rows}")
+            X_scaled = np.vstack(unseeded)
+            unseeded = []
+            kmeans = _seed_minibatch_kmeans(X_scaled, n_clusters, batch_size, random_state)
+            _minibatch_updates(kmeans, X_scaled, rng, batch_size)
+
+    return kmeans, scaler
+
+
+def perform_streaming_kmeans_clustering(data_file, n_clusters=4, output_dir='results',
+                                        chunksize=100000, batch_size=4096, n_epochs=3,
+                                        random_state=42, quiet=False, plot=True):
+    """
+    Perform K-means clustering out-of-core with mini-batch updates
+    
+    Parameters:
+    -----------
+    data_file : str, Path or DataFrame
+        Prepared CSV store (e.g. data/processed/prepared_sleep_analysis_data.csv)
+    n_clusters : int
+        Number of clusters
+    output_dir : str
+        Directory to save results
+    chunksize : int
+        Rows read per chunk
+    batch_size : int
+        Rows per mini-batch update
+    n_epochs : int
+        Passes over the store for the K-means updates
+    random_state : int
+        Seed for initialization and batch order
+    quiet : bool
+        Skip rendering the cluster table as text
+    plot : bool
+        Save the PCA projection as a density-binned figure (incremental
+        PCA fitted during the first epoch, binned during the final pass)
+    
+    Returns:
+    --------
+    dict
+        Clustering results. Labels are written to
+        {output_dir}/tables/cluster_assignments.csv rather than returned.
+    """
+    log_section(logger, "K-MEANS CLUSTERING ANALYSIS (STREAMING)")
+    
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    (output_path / 'figures').mkdir(exist_ok=True)
+    (output_path / 'tables').mkdir(exist_ok=True)
+    (output_path / 'models').mkdir(exist_ok=True)
+    
+    pca = IncrementalPCA(n_components=2) if plot else None
+    logger.info(f"\nFitting mini-batch K-means with k={n_clusters} "
+                f"(chunksize={chunksize}, batch_size={batch_size}, epochs={n_epochs})...")
+    kmeans, scaler = fit_streaming_kmeans(data_file, n_clusters=n_clusters, chunksize=chunksize,
+                                          batch_size=batch_size, n_epochs=n_epochs,
+                                          random_state=random_state, pca=pca)
+    
+    grid = None
+    if pca is not None:
+        if not hasattr(pca, 'components_'):
+            raise ValueError(f"The PCA projection needs at least {pca.n_components} complete "
+                             f"rows; use plot=False for smaller stores")
+        # The grid must be sized before the final pass, so span +/-4 SD of each component
+        spread = 4 * np.sqrt(pca.explained_variance_)
+        grid = ClusterDensityGrid((-spread[0], spread[0]), (-spread[1], spread[1]), n_clusters)
+    
+    # Final pass: assign labels, accumulate inertia and cluster profiles
+    assignments_path = output_path / 'tables' / 'cluster_assignments.csv'
+    profile = ClusterProfileAccumulator(n_clusters, **CLUSTER_PROFILE_SPEC)
+    inertia = 0.0
+    n_rows = 0
+    with open(assignments_path, 'w') as f:
+        f.write('SEQN,CLUSTER\n')
+        for X, chunk in iter_clustering_chunks(data_file, chunksize, extra_columns=SLEEP_OUTCOMES):
+            X_scaled = scaler.transform(X)
+            labels = assign_to_centers(X_scaled, kmeans.cluster_centers_)
+            inertia += ((X_scaled - kmeans.cluster_centers_[labels]) ** 2).sum()
+            profile.update(labels, chunk)
+            n_rows += len(labels)
+            if grid is not None:
+                X_pca = pca.transform(X_scaled)
+                grid.update(X_pca[:, 0], X_pca[:, 1], labels)
+            pd.DataFrame({'SEQN': chunk['SEQN'].to_numpy(), 'CLUSTER': labels}).to_csv(
+                f, header=False, index=False)
+    
+    # partial_fit never sees the whole store at once, so record the
+    # full-data inertia here for the model viewer
+    kmeans.inertia_ = inertia
+    logger.info(f"\nComplete cases for clustering: {n_rows}",
+                extra={'fields': {'n': n_rows, 'inertia': inertia}})
+    
+    if grid is not None:
+        _save_density_projection(grid, pca, f'{output_dir}/figures/clustering_pca.png')
+    
+    cluster_summary, sleep_by_cluster = _cluster_tables(profile)
+    if not quiet and logger.isEnabledFor(logging.INFO):
+        logger.info("\nCluster Characteristics:")
+        logger.info("-" * 80)
+        logger.info(cluster_summary.to_string())
+        logger.info("\nSleep Outcomes by Cluster:")
+        logger.info("-" * 80)
+        logger.info(sleep_by_cluster.to_string())
+    cluster_summary.to_csv(f'{output_dir}/tables/cluster_characteristics.csv')
+    sleep_by_cluster.to_csv(f'{output_dir}/tables/sleep_by_cluster.csv')
+    
+    joblib.dump(kmeans, output_path / 'models' / 'kmeans_clustering.joblib')
+    joblib.dump(scaler, output_path / 'models' / 'kmeans_scaler.joblib')
+    ClusterAssigner.from_models(kmeans, scaler, CLUSTERING_FEATURES).save(
+        output_path / 'models' / 'kmeans_assigner.npz')
+    
+    write_metrics(output_dir, 'clustering', {
+        'mode': 'streaming',
+        'n': n_rows,
+        'n_clusters': n_clusters,
+        'inertia': inertia,
+        'cluster_summary': cluster_summary.reset_index(),
+        'sleep_by_cluster': sleep_by_cluster.reset_index()
+    })
+    
+    return {
+        'model': kmeans,
+        'scaler': scaler,
+        'n_clusters': n_clusters,
+        'n_rows': n_rows,
+        'inertia': inertia,
+        'cluster_summary': cluster_summary,
+        'sleep_by_cluster': sleep_by_cluster,
+        'assignments_path': assignments_path
     }
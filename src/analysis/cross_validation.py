@@ -0,0 +1,252 @@
+"""
+Cross-Validation
+K-fold estimates of held-out performance for the regression and tree models
+"""
+
+import hashlib
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from ._parallel import shared_pool, worker_array
+from .decision_trees import TREE_FEATURES
+from .design import data_hash
+from .regression import REGRESSION_MODELS, REGRESSION_VARIABLES
+from .reporting import get_logger, log_section, write_metrics
+from .tree_data import TreeDataset
+
+logger = get_logger(__name__)
+
+
+# Fold assignments already computed in this process, keyed by data hash
+_FOLD_CACHE = {}
+
+
+def _rmse(y_true, y_pred):
+    return np.sqrt(mean_squared_error(y_true, y_pred))
+
+
+SCORERS = {
+    'Accuracy': accuracy_score,
+    'R²': r2_score,
+    'RMSE': _rmse
+}
+
+
+def fold_indices(frame, n_splits=5, stratify=None, random_state=42, cache_dir=None):
+    """
+    Fold number of every row, computed once per data set
+
+    Assignments are keyed by a hash of the frame and the fold settings
+    and kept in memory; with cache_dir they are also saved as .npz files
+    and reloaded by later runs on the same data.
+
+    Parameters:
+    -----------
+    frame : DataFrame
+        Rows to split
+    n_splits : int
+        Number of folds
+    stratify : str, optional
+        Column whose classes are balanced across folds
+    random_state : int
+        Seed for the shuffle
+    cache_dir : str or Path, optional
+        Directory for saved assignments
+
+    Returns:
+    --------
+    tuple
+        (key, array of fold numbers aligned with frame)
+    """
+    key = data_hash(frame, ('folds', n_splits, stratify, random_state))
+    if key in _FOLD_CACHE:
+        return key, _FOLD_CACHE[key]
+
+    path = None if cache_dir is None else Path(cache_dir) / f'folds_{key}.npz'
+    if path is not None and path.exists():
+        with np.load(path, allow_pickle=False) as data:
+            folds = data['folds']
+    else:
+        splitter = (StratifiedKFold if stratify else KFold)(
+            n_splits=n_splits, shuffle=True, random_state=random_state)
+        folds = np.empty(len(frame), dtype=np.int64)
+        y = frame[stratify].to_numpy() if stratify else None
+        for fold, (_, test) in enumerate(splitter.split(np.zeros(len(frame)), y)):
+            folds[test] = fold
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(path, folds=folds)
+
+    _FOLD_CACHE[key] = folds
+    return key, folds
+
+
+def _cv_models(df):
+    """
+    Models evaluated by cross_validate_models, with the settings of the
+    fixed (untuned) fits in the regression and decision tree analyses
+
+    Returns:
+    --------
+    list of dict
+        model, outcome, stem, frame (rows to split), features, target,
+        estimator, metrics and stratify per model
+    """
+    specs = []
+    df_reg = df[REGRESSION_VARIABLES].dropna()
+    for model_key, _, outcome, predictors, _ in REGRESSION_MODELS:
+        specs.append({'model': 'OLS', 'outcome': outcome, 'stem': f'ols_{model_key}',
+                      'frame': df_reg, 'features': predictors, 'target': outcome,
+                      'estimator': LinearRegression(), 'metrics': ['R²', 'RMSE'],
+                      'stratify': None})
+
+    dataset = TreeDataset(df, TREE_FEATURES, ['POOR_SLEEP', 'SLD012'])
+    class_frame = dataset.frame.iloc[dataset.rows('POOR_SLEEP')]
+    reg_frame = dataset.frame.iloc[dataset.rows('SLD012')]
+    tree = {'max_depth': 5, 'min_samples_split': 50, 'min_samples_leaf': 50, 'random_state': 42}
+    specs += [
+        {'model': 'Decision Tree', 'outcome': 'POOR_SLEEP', 'stem': 'dt_classifier',
+         'frame': class_frame, 'estimator': DecisionTreeClassifier(**tree),
+         'metrics': ['Accuracy'], 'stratify': 'POOR_SLEEP'},
+        {'model': 'Random Forest', 'outcome': 'POOR_SLEEP', 'stem': 'rf_classifier',
+         'frame': class_frame,
+         'estimator': RandomForestClassifier(n_estimators=100, max_depth=5, min_samples_split=50,
+                                             random_state=42),
+         'metrics': ['Accuracy'], 'stratify': 'POOR_SLEEP'},
+        {'model': 'Decision Tree', 'outcome': 'SLD012', 'stem': 'dt_regressor',
+         'frame': reg_frame, 'estimator': DecisionTreeRegressor(**tree),
+         'metrics': ['R²', 'RMSE'], 'stratify': None}
+    ]
+    for spec in specs[len(REGRESSION_MODELS):]:
+        spec.update(features=TREE_FEATURES, target=spec['outcome'])
+    return specs
+
+
+def _fold_job(estimator, prefix, fold, metrics, path):
+    """
+    Fit one model on all folds but one and score it on the held-out fold
+
+    A model already saved at path by an earlier run is loaded instead of
+    refitted.
+    """
+    X = worker_array(f'{prefix}X')
+    y = worker_array(f'{prefix}y')
+    folds = worker_array(f'{prefix}folds')
+
+    cached = path is not None and Path(path).exists()
+    if cached:
+        model = joblib.load(path)
+    else:
+        train = folds != fold
+        model = clone(estimator).fit(X[train], y[train])
+        if path is not None:
+            joblib.dump(model, path)
+
+    test = folds == fold
+    y_pred = model.predict(X[test])
+    return {metric: float(SCORERS[metric](y[test], y_pred)) for metric in metrics}, cached
+
+
+def cross_validate_models(df, output_dir='results', n_splits=5, n_jobs=1, random_state=42,
+                          cache=True):
+    """
+    K-fold cross-validation of the OLS, decision tree and random forest models
+
+    Every (model, fold) fit runs as one job in a process pool, with each
+    model's rows in shared memory. Fold assignments and fitted fold
+    models are saved under {output_dir}/models/cv/ keyed by a hash of the
+    data and settings, so a rerun on the same data only scores them.
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Prepared data
+    output_dir : str
+        Directory to save results
+    n_splits : int
+        Number of folds (stratified on POOR_SLEEP for the classifiers)
+    n_jobs : int
+        Worker processes
+    random_state : int
+        Seed for the fold assignment
+    cache : bool
+        Save and reuse fold assignments and fitted fold models
+
+    Returns:
+    --------
+    dict
+        summary (mean, SD, min and max per model and metric), folds (one
+        row per model, fold and metric), n_splits, n_cached (fits reused)
+    """
+    log_section(logger, "CROSS-VALIDATION")
+
+    output_path = Path(output_dir)
+    (output_path / 'tables').mkdir(parents=True, exist_ok=True)
+    cache_dir = output_path / 'models' / 'cv' if cache else None
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    specs = _cv_models(df)
+    arrays = {}
+    jobs = []
+    for i, spec in enumerate(specs):
+        key, folds = fold_indices(spec['frame'], n_splits, spec['stratify'], random_state,
+                                  cache_dir)
+        prefix = f'm{i}_'
+        arrays[f'{prefix}X'] = spec['frame'][spec['features']].to_numpy(dtype=float)
+        arrays[f'{prefix}y'] = spec['frame'][spec['target']].to_numpy()
+        arrays[f'{prefix}folds'] = folds
+
+        estimator = spec['estimator']
+        model_key = hashlib.sha1(repr((key, spec['features'], spec['target'],
+                                       type(estimator).__name__,
+                                       sorted(estimator.get_params().items()))).encode())
+        for fold in range(n_splits):
+            path = None
+            if cache_dir is not None:
+                path = cache_dir / f"{spec['stem']}_{model_key.hexdigest()[:16]}_fold{fold}.joblib"
+            jobs.append((i, prefix, fold, path))
+
+    with shared_pool(arrays, n_jobs) as pool:
+        scored = pool.map(_fold_job, [specs[i]['estimator'] for i, _, _, _ in jobs],
+                          [prefix for _, prefix, _, _ in jobs], [fold for _, _, fold, _ in jobs],
+                          [specs[i]['metrics'] for i, _, _, _ in jobs],
+                          [path for _, _, _, path in jobs])
+
+    records = []
+    for (i, _, fold, _), (scores, _) in zip(jobs, scored):
+        spec = specs[i]
+        for metric, value in scores.items():
+            records.append({'Model': spec['model'], 'Outcome': spec['outcome'],
+                            'N': len(spec['frame']), 'Fold': fold + 1, 'Metric': metric,
+                            'Value': value})
+    fold_table = pd.DataFrame(records)
+    summary = (fold_table.groupby(['Model', 'Outcome', 'N', 'Metric'], sort=False)['Value']
+               .agg(Mean='mean', SD='std', Min='min', Max='max').reset_index())
+    n_cached = sum(cached for _, cached in scored)
+
+    logger.info(f"{len(specs)} models x {n_splits} folds ({n_cached} fits reused from cache)",
+                extra={'fields': {'n_splits': n_splits, 'n_fits': len(jobs),
+                                  'n_cached': n_cached}})
+    logger.info(summary.to_string(index=False))
+
+    summary.to_csv(f'{output_dir}/tables/cross_validation.csv', index=False)
+    fold_table.to_csv(f'{output_dir}/tables/cross_validation_folds.csv', index=False)
+    write_metrics(output_dir, 'cross_validation', {'n_splits': n_splits, 'summary': summary,
+                                                   'folds': fold_table})
+
+    return {
+        'summary': summary,
+        'folds': fold_table,
+        'n_splits': n_splits,
+        'n_cached': n_cached
+    }
@@ -3,11 +3,13 @@ Decision Tree Analysis
 Identify key predictors and decision rules for sleep outcomes
 """
 
+import logging
+import time
 import numpy as np
 import pandas as pd
 from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor, plot_tree
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import (HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
 from sklearn.metrics import (accuracy_score, classification_report, confusion_matrix,
                             r2_score, mean_squared_error)
 import matplotlib
@@ -17,8 +19,60 @@ import seaborn as sns
 from pathlib import Path
 import joblib
 
+from .design import CATEGORICAL_REFERENCES
+from .reporting import get_logger, log_section, write_metrics
+from .tree_data import TreeDataset
+from .tree_explain import permutation_importance, shap_summary, tree_shap
+from .tree_inference import CompiledTreeEnsemble
+from .tree_tuning import DEFAULT_FOREST_GRID, DEFAULT_TREE_GRID, successive_halving
 
-def perform_decision_tree_analysis(df, output_dir='results'):
+logger = get_logger(__name__)
+
+
+# Features shared by every tree model
+TREE_FEATURES = [
+    'SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY', 
+    'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR'
+]
+
+
+def _fit_boosting(dataset, target, classifier):
+    """
+    Histogram gradient boosting on every row with the target observed
+
+    Missing feature values are routed natively by the trees, so rows are
+    only dropped for a missing target. Categorical features are split on
+    their levels directly when the dataset is categorical.
+
+    Returns:
+    --------
+    dict
+        model, n, fit_time, train_score and test_score (accuracy or R²)
+    """
+    train, test = dataset.split(target, stratify=classifier, complete=False)
+    X_train, X_test = dataset.features(train, encode=False), dataset.features(test, encode=False)
+    y_train, y_test = dataset.target(target, train), dataset.target(target, test)
+    
+    estimator = HistGradientBoostingClassifier if classifier else HistGradientBoostingRegressor
+    model = estimator(max_iter=200, learning_rate=0.1, min_samples_leaf=50,
+                      categorical_features=([c in CATEGORICAL_REFERENCES for c in dataset.feature_cols]
+                                            if dataset.categorical else None),
+                      random_state=42)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    
+    return {
+        'model': model,
+        'n': len(train) + len(test),
+        'fit_time': fit_time,
+        'train_score': model.score(X_train, y_train),
+        'test_score': model.score(X_test, y_test)
+    }
+
+
+def perform_decision_tree_analysis(df, output_dir='results', quiet=False, categorical=False,
+                                   tune=False, n_jobs=1, boosting=False, explain=False):
     """
     Perform decision tree analysis
     
@@ -28,15 +82,37 @@ def perform_decision_tree_analysis(df, output_dir='results'):
         Input dataframe
     output_dir : str
         Directory to save results
+    quiet : bool
+        Skip building the classification report and importance tables.
+        Metrics are still written to {output_dir}/metrics/decision_trees.json.
+    categorical : bool
+        Fit on a sparse design with SMOKING_STATUS, ALCOHOL_STATUS and
+        RIAGENDR expanded into indicator columns instead of raw codes
+    tune : bool
+        Choose max_depth and min_samples_leaf (and the forest's
+        n_estimators) by successive halving with 3-fold CV on the training
+        split instead of the fixed settings. The search is saved to
+        {output_dir}/tables/tree_tuning.csv.
+    n_jobs : int
+        Worker processes for the random forest, the tuning search and
+        the explanations
+    boosting : bool
+        Also fit histogram gradient boosting models. They keep rows with
+        missing features (only the target must be observed) and are
+        compared with the trees in {output_dir}/tables/tree_model_comparison.csv,
+        which always lists test accuracy or R² and fit time per model.
+    explain : bool
+        Explain the decision trees and the forest on their test splits:
+        permutation importance (10 repeats) and mean absolute TreeSHAP
+        attributions, saved to {output_dir}/tables/permutation_importance.csv
+        and {output_dir}/tables/shap_summary.csv.
     
     Returns:
     --------
     dict
         Decision tree results
     """
-    print("\n" + "="*80)
-    print("DECISION TREE ANALYSIS")
-    print("="*80)
+    log_section(logger, "DECISION TREE ANALYSIS")
     
     results = {}
     output_path = Path(output_dir)
@@ -45,32 +121,36 @@ def perform_decision_tree_analysis(df, output_dir='results'):
     (output_path / 'tables').mkdir(exist_ok=True)
     (output_path / 'models').mkdir(exist_ok=True)
     
-    # Prepare features
-    feature_cols = [
-        'SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY', 
-        'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR'
-    ]
-    
     # Model 1: Classification Tree - Poor Sleep
-    print("\n" + "-"*80)
-    print("MODEL 1: Classification Tree - Poor Sleep (Binary)")
-    print("-"*80)
+    log_section(logger, "MODEL 1: Classification Tree - Poor Sleep (Binary)", char='-')
     
-    df_class = df[feature_cols + ['POOR_SLEEP']].dropna()
-    print(f"Complete cases for classification: {len(df_class)}")
+    # Features, complete-case masks and seeded splits are shared by every model;
+    # split indices are saved so reruns on the same data reuse them
+    dataset = TreeDataset(df, TREE_FEATURES, ['POOR_SLEEP', 'SLD012'], categorical=categorical,
+                          split_path=output_path / 'models' / 'tree_splits.npz')
     
-    X_class = df_class[feature_cols]
-    y_class = df_class['POOR_SLEEP']
+    train_c, test_c = dataset.split('POOR_SLEEP', stratify=True)
+    n_class = len(train_c) + len(test_c)
+    logger.info(f"Complete cases for classification: {n_class}")
     
-    # Split data
-    X_train_c, X_test_c, y_train_c, y_test_c = train_test_split(
-        X_class, y_class, test_size=0.3, random_state=42, stratify=y_class
-    )
+    class_features = dataset.feature_names
+    X_train_c, X_test_c = dataset.features(train_c), dataset.features(test_c)
+    y_train_c, y_test_c = dataset.target('POOR_SLEEP', train_c), dataset.target('POOR_SLEEP', test_c)
     
     # Decision Tree
-    dt_classifier = DecisionTreeClassifier(max_depth=5, min_samples_split=50, 
-                                          min_samples_leaf=50, random_state=42)
-    dt_classifier.fit(X_train_c, y_train_c)
+    tuning = {}
+    fit_times = {}
+    start = time.perf_counter()
+    if tune:
+        tuning['dt_classifier'] = successive_halving(
+            DecisionTreeClassifier(min_samples_split=50, random_state=42), DEFAULT_TREE_GRID,
+            X_train_c, y_train_c, resource='n_samples', n_jobs=n_jobs)
+        dt_classifier = tuning['dt_classifier']['best_estimator']
+    else:
+        dt_classifier = DecisionTreeClassifier(max_depth=5, min_samples_split=50, 
+                                              min_samples_leaf=50, random_state=42)
+        dt_classifier.fit(X_train_c, y_train_c)
+    fit_times['dt_classifier'] = time.perf_counter() - start
     
     y_pred_train = dt_classifier.predict(X_train_c)
     y_pred_test = dt_classifier.predict(X_test_c)
@@ -78,35 +158,51 @@ def perform_decision_tree_analysis(df, output_dir='results'):
     train_accuracy = accuracy_score(y_train_c, y_pred_train)
     test_accuracy = accuracy_score(y_test_c, y_pred_test)
     
-    print(f"Training Accuracy: {train_accuracy:.4f}")
-    print(f"Test Accuracy: {test_accuracy:.4f}")
+    logger.info(f"Training Accuracy: {train_accuracy:.4f}",
+                extra={'fields': {'model': 'dt_classifier', 'train_accuracy': train_accuracy}})
+    logger.info(f"Test Accuracy: {test_accuracy:.4f}",
+                extra={'fields': {'model': 'dt_classifier', 'test_accuracy': test_accuracy}})
     
     # Feature importance
     feature_importance = pd.DataFrame({
-        'Feature': feature_cols,
+        'Feature': class_features,
         'Importance': dt_classifier.feature_importances_
     }).sort_values('Importance', ascending=False)
     
-    print("\nFeature Importance:")
-    print(feature_importance)
-    
-    # Classification report
-    print("\nClassification Report (Test Set):")
-    print(classification_report(y_test_c, y_pred_test))
+    verbose = not quiet and logger.isEnabledFor(logging.INFO)
+    if verbose:
+        logger.info("\nFeature Importance:")
+        logger.info(feature_importance.to_string())
+        
+        # Classification report
+        logger.info("\nClassification Report (Test Set):")
+        logger.info(classification_report(y_test_c, y_pred_test))
     
     # Random Forest for comparison
-    rf_classifier = RandomForestClassifier(n_estimators=100, max_depth=5, 
-                                          min_samples_split=50, random_state=42)
-    rf_classifier.fit(X_train_c, y_train_c)
+    start = time.perf_counter()
+    if tune:
+        tuning['rf_classifier'] = successive_halving(
+            RandomForestClassifier(min_samples_split=50, random_state=42),
+            DEFAULT_FOREST_GRID, X_train_c, y_train_c, resource='n_estimators', n_jobs=n_jobs)
+        rf_classifier = tuning['rf_classifier']['best_estimator']
+    else:
+        rf_classifier = RandomForestClassifier(n_estimators=100, max_depth=5, 
+                                              min_samples_split=50, random_state=42,
+                                              n_jobs=n_jobs)
+        rf_classifier.fit(X_train_c, y_train_c)
+    fit_times['rf_classifier'] = time.perf_counter() - start
     rf_pred_test = rf_classifier.predict(X_test_c)
     rf_accuracy = accuracy_score(y_test_c, rf_pred_test)
     
-    print(f"\nRandom Forest Test Accuracy: {rf_accuracy:.4f}")
+    logger.info(f"\nRandom Forest Test Accuracy: {rf_accuracy:.4f}",
+                extra={'fields': {'model': 'rf_classifier', 'test_accuracy': rf_accuracy}})
     
     dt_class_path = output_path / 'models' / 'decision_tree_classifier_poor_sleep.joblib'
     rf_class_path = output_path / 'models' / 'random_forest_classifier_poor_sleep.joblib'
     joblib.dump(dt_classifier, dt_class_path)
     joblib.dump(rf_classifier, rf_class_path)
+    CompiledTreeEnsemble.from_model(dt_classifier, class_features).save(dt_class_path.with_suffix('.npz'))
+    CompiledTreeEnsemble.from_model(rf_classifier, class_features).save(rf_class_path.with_suffix('.npz'))
 
     results['classification'] = {
         'dt_model': dt_classifier,
@@ -118,24 +214,28 @@ def perform_decision_tree_analysis(df, output_dir='results'):
     }
     
     # Model 2: Regression Tree - Sleep Duration
-    print("\n" + "-"*80)
-    print("MODEL 2: Regression Tree - Sleep Duration (SLD012)")
-    print("-"*80)
+    log_section(logger, "MODEL 2: Regression Tree - Sleep Duration (SLD012)", char='-')
     
-    df_reg = df[feature_cols + ['SLD012']].dropna()
-    print(f"Complete cases for regression: {len(df_reg)}")
+    train_r, test_r = dataset.split('SLD012')
+    n_reg = len(train_r) + len(test_r)
+    logger.info(f"Complete cases for regression: {n_reg}")
     
-    X_reg = df_reg[feature_cols]
-    y_reg = df_reg['SLD012']
-    
-    X_train_r, X_test_r, y_train_r, y_test_r = train_test_split(
-        X_reg, y_reg, test_size=0.3, random_state=42
-    )
+    reg_features = dataset.feature_names
+    X_train_r, X_test_r = dataset.features(train_r), dataset.features(test_r)
+    y_train_r, y_test_r = dataset.target('SLD012', train_r), dataset.target('SLD012', test_r)
     
     # Decision Tree Regressor
-    dt_regressor = DecisionTreeRegressor(max_depth=5, min_samples_split=50, 
-                                        min_samples_leaf=50, random_state=42)
-    dt_regressor.fit(X_train_r, y_train_r)
+    start = time.perf_counter()
+    if tune:
+        tuning['dt_regressor'] = successive_halving(
+            DecisionTreeRegressor(min_samples_split=50, random_state=42), DEFAULT_TREE_GRID,
+            X_train_r, y_train_r, resource='n_samples', n_jobs=n_jobs)
+        dt_regressor = tuning['dt_regressor']['best_estimator']
+    else:
+        dt_regressor = DecisionTreeRegressor(max_depth=5, min_samples_split=50, 
+                                            min_samples_leaf=50, random_state=42)
+        dt_regressor.fit(X_train_r, y_train_r)
+    fit_times['dt_regressor'] = time.perf_counter() - start
     
     y_pred_train_r = dt_regressor.predict(X_train_r)
     y_pred_test_r = dt_regressor.predict(X_test_r)
@@ -144,21 +244,26 @@ def perform_decision_tree_analysis(df, output_dir='results'):
     test_r2 = r2_score(y_test_r, y_pred_test_r)
     test_rmse = np.sqrt(mean_squared_error(y_test_r, y_pred_test_r))
     
-    print(f"Training R²: {train_r2:.4f}")
-    print(f"Test R²: {test_r2:.4f}")
-    print(f"Test RMSE: {test_rmse:.4f}")
+    logger.info(f"Training R²: {train_r2:.4f}",
+                extra={'fields': {'model': 'dt_regressor', 'train_r2': train_r2}})
+    logger.info(f"Test R²: {test_r2:.4f}",
+                extra={'fields': {'model': 'dt_regressor', 'test_r2': test_r2}})
+    logger.info(f"Test RMSE: {test_rmse:.4f}",
+                extra={'fields': {'model': 'dt_regressor', 'test_rmse': test_rmse}})
     
     # Feature importance
     feature_importance_reg = pd.DataFrame({
-        'Feature': feature_cols,
+        'Feature': reg_features,
         'Importance': dt_regressor.feature_importances_
     }).sort_values('Importance', ascending=False)
     
-    print("\nFeature Importance:")
-    print(feature_importance_reg)
+    if verbose:
+        logger.info("\nFeature Importance:")
+        logger.info(feature_importance_reg.to_string())
     
     dt_reg_path = output_path / 'models' / 'decision_tree_regressor_sleep_duration.joblib'
     joblib.dump(dt_regressor, dt_reg_path)
+    CompiledTreeEnsemble.from_model(dt_regressor, reg_features).save(dt_reg_path.with_suffix('.npz'))
 
     results['regression'] = {
         'dt_model': dt_regressor,
@@ -168,10 +273,86 @@ def perform_decision_tree_analysis(df, output_dir='results'):
         'feature_importance': feature_importance_reg
     }
     
+    comparison = [
+        ('Classification (Poor Sleep)', 'Decision Tree', n_class, 'Test Accuracy',
+         test_accuracy, fit_times['dt_classifier']),
+        ('Classification (Poor Sleep)', 'Random Forest', n_class, 'Test Accuracy',
+         rf_accuracy, fit_times['rf_classifier']),
+        ('Regression (Sleep Hours)', 'Decision Tree', n_reg, 'Test R²',
+         test_r2, fit_times['dt_regressor'])
+    ]
+    
+    # Model 3: Histogram Gradient Boosting (rows with missing features kept)
+    if boosting:
+        log_section(logger, "MODEL 3: Histogram Gradient Boosting", char='-')
+        
+        hgb_class = _fit_boosting(dataset, 'POOR_SLEEP', classifier=True)
+        hgb_reg = _fit_boosting(dataset, 'SLD012', classifier=False)
+        
+        logger.info(f"Classification rows: {hgb_class['n']} (vs {n_class} complete cases)")
+        logger.info(f"Test Accuracy: {hgb_class['test_score']:.4f}",
+                    extra={'fields': {'model': 'hgb_classifier',
+                                      'test_accuracy': hgb_class['test_score']}})
+        logger.info(f"Regression rows: {hgb_reg['n']} (vs {n_reg} complete cases)")
+        logger.info(f"Test R²: {hgb_reg['test_score']:.4f}",
+                    extra={'fields': {'model': 'hgb_regressor', 'test_r2': hgb_reg['test_score']}})
+        
+        joblib.dump(hgb_class['model'],
+                    output_path / 'models' / 'hist_gradient_boosting_classifier_poor_sleep.joblib')
+        joblib.dump(hgb_reg['model'],
+                    output_path / 'models' / 'hist_gradient_boosting_regressor_sleep_duration.joblib')
+        
+        comparison += [
+            ('Classification (Poor Sleep)', 'Histogram Gradient Boosting', hgb_class['n'],
+             'Test Accuracy', hgb_class['test_score'], hgb_class['fit_time']),
+            ('Regression (Sleep Hours)', 'Histogram Gradient Boosting', hgb_reg['n'],
+             'Test R²', hgb_reg['test_score'], hgb_reg['fit_time'])
+        ]
+        results['boosting'] = {'classifier': hgb_class, 'regressor': hgb_reg}
+    
+    # Explanations on the held-out rows
+    if explain:
+        log_section(logger, "MODEL EXPLANATIONS", char='-')
+        
+        explained = [
+            ('Decision Tree Classifier', dt_classifier, class_features, X_test_c, y_test_c),
+            ('Random Forest Classifier', rf_classifier, class_features, X_test_c, y_test_c),
+            ('Decision Tree Regressor', dt_regressor, reg_features, X_test_r, y_test_r)
+        ]
+        permutation_tables = []
+        shap_tables = []
+        for name, model, features, X_test, y_test in explained:
+            permutation = permutation_importance(model, X_test, y_test, features, n_jobs=n_jobs)
+            permutation_tables.append(permutation.assign(Model=name))
+            attributions, _ = tree_shap(CompiledTreeEnsemble.from_model(model, features),
+                                        X_test, n_jobs=n_jobs)
+            shap_tables.append(shap_summary(attributions, features).assign(Model=name))
+        
+        columns = ['Model', 'Feature']
+        permutation_table = pd.concat(permutation_tables, ignore_index=True)
+        permutation_table = permutation_table[columns + [c for c in permutation_table
+                                                          if c not in columns]]
+        shap_table = pd.concat(shap_tables, ignore_index=True)
+        shap_table = shap_table[columns + [c for c in shap_table if c not in columns]]
+        results['explanations'] = {'permutation_importance': permutation_table,
+                                   'shap_summary': shap_table}
+        if verbose:
+            logger.info("\nPermutation Importance (Test Set):")
+            logger.info(permutation_table.to_string(index=False))
+            logger.info("\nMean |SHAP| (Test Set):")
+            logger.info(shap_table.to_string(index=False))
+    
+    comparison = pd.DataFrame(comparison, columns=['Task', 'Model', 'N', 'Metric', 'Value',
+                                                   'Fit Time (s)'])
+    results['comparison'] = comparison
+    if verbose:
+        logger.info("\nModel Comparison:")
+        logger.info(comparison.to_string(index=False))
+    
     # Visualizations
     # Decision Tree Visualization (Classification)
     plt.figure(figsize=(20, 10))
-    plot_tree(dt_classifier, feature_names=feature_cols, 
+    plot_tree(dt_classifier, feature_names=class_features, 
               class_names=['Good Sleep', 'Poor Sleep'], 
               filled=True, rounded=True, fontsize=10)
     plt.title('Decision Tree - Poor Sleep Classification', fontsize=16)
@@ -181,7 +362,7 @@ def perform_decision_tree_analysis(df, output_dir='results'):
     
     # Decision Tree Visualization (Regression)
     plt.figure(figsize=(20, 10))
-    plot_tree(dt_regressor, feature_names=feature_cols, 
+    plot_tree(dt_regressor, feature_names=reg_features, 
               filled=True, rounded=True, fontsize=10)
     plt.title('Decision Tree - Sleep Duration Regression', fontsize=16)
     plt.savefig(f'{output_dir}/figures/decision_tree_regression.png', 
@@ -232,5 +413,40 @@ def perform_decision_tree_analysis(df, output_dir='results'):
         'Value': [test_accuracy, test_r2]
     })
     summary.to_csv(f'{output_dir}/tables/decision_tree_summary.csv', index=False)
+    comparison.to_csv(f'{output_dir}/tables/tree_model_comparison.csv', index=False)
+    if explain:
+        permutation_table.to_csv(f'{output_dir}/tables/permutation_importance.csv', index=False)
+        shap_table.to_csv(f'{output_dir}/tables/shap_summary.csv', index=False)
+    
+    if tuning:
+        pd.concat([search['results'].assign(Model=name) for name, search in tuning.items()],
+                  ignore_index=True).to_csv(f'{output_dir}/tables/tree_tuning.csv', index=False)
+        results['tuning'] = {name: {'best_params': search['best_params'],
+                                    'best_score': search['best_score']}
+                             for name, search in tuning.items()}
+    
+    metrics = {
+        'classification': {
+            'n': n_class,
+            'train_accuracy': train_accuracy,
+            'test_accuracy': test_accuracy,
+            'rf_accuracy': rf_accuracy,
+            'confusion_matrix': cm,
+            'feature_importance': feature_importance
+        },
+        'regression': {
+            'n': n_reg,
+            'train_r2': train_r2,
+            'test_r2': test_r2,
+            'test_rmse': test_rmse,
+            'feature_importance': feature_importance_reg
+        }
+    }
+    if tuning:
+        metrics['tuning'] = results['tuning']
+    metrics['comparison'] = comparison
+    if explain:
+        metrics['explanations'] = results['explanations']
+    write_metrics(output_dir, 'decision_trees', metrics)
     
     return results
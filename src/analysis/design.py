@@ -0,0 +1,202 @@
+"""
+Design Matrices
+Sparse one-hot encoding of categorical predictors with a data-hash cache
+"""
+
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+# Categorical predictors and their reference (omitted) level
+CATEGORICAL_REFERENCES = {
+    'SMOKING_STATUS': 3,   # Never
+    'ALCOHOL_STATUS': 0,   # Never
+    'RIAGENDR': 1,         # Male
+    'RIDRETH1': 3,         # Non-Hispanic White
+    'DMDEDUC2': 1          # Less than 9th grade
+}
+
+# Encoded matrices kept in memory, keyed by data hash and specification
+DESIGN_CACHE_SIZE = 16
+_DESIGN_CACHE = OrderedDict()
+
+
+class DesignMatrix:
+    """
+    Sparse encoded predictors with their column names
+
+    Parameters:
+    -----------
+    matrix : scipy.sparse matrix
+        CSR matrix, one row per observation
+    columns : list of str
+        Encoded column names; indicators are named '<column>_<level>'
+    levels : dict
+        Categorical column -> levels in encoding order (reference first)
+    index : Index
+        Row labels of the source frame
+    """
+
+    def __init__(self, matrix, columns, levels, index):
+        self.matrix = sparse.csr_matrix(matrix)
+        self.columns = list(columns)
+        self.levels = dict(levels)
+        self.index = index
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def take(self, rows):
+        """Subset of rows by position"""
+        return DesignMatrix(self.matrix[rows], self.columns, self.levels, self.index[rows])
+
+
+def _level_name(column, level):
+    if isinstance(level, (float, np.floating)) and float(level).is_integer():
+        level = int(level)
+    return f'{column}_{level}'
+
+
+def data_hash(frame, spec=None):
+    """Stable hash of a frame's values, index and an optional specification"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(repr(list(frame.columns)).encode())
+    if spec is not None:
+        digest.update(repr(spec).encode())
+    return digest.hexdigest()
+
+
+def build_design_matrix(df, numeric=(), categorical=None, levels=None, cache=True,
+                        cache_dir=None):
+    """
+    Encode predictors as a sparse matrix, expanding categoricals to indicators
+
+    Each categorical column becomes one indicator per non-reference level;
+    numeric columns are kept as they are. Rows should be complete cases.
+    Results are cached in memory (and optionally on disk) by a hash of the
+    input data and the specification, so repeated fits on the same data
+    reuse one encoding.
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Source data
+    numeric : list of str
+        Columns used as they are
+    categorical : dict or list
+        Column -> reference level (a list uses CATEGORICAL_REFERENCES,
+        falling back to the lowest level)
+    levels : dict, optional
+        Column -> levels to encode (e.g. from a training DesignMatrix) so
+        test data gets the same columns; unseen levels get all-zero rows
+    cache : bool
+        Use the in-memory cache
+    cache_dir : str or Path, optional
+        Also persist encodings as .npz files in this directory
+
+    Returns:
+    --------
+    DesignMatrix
+    """
+    numeric = list(numeric)
+    if categorical is None:
+        categorical = {}
+    elif not isinstance(categorical, dict):
+        categorical = {col: CATEGORICAL_REFERENCES.get(col) for col in categorical}
+
+    frame = df[numeric + [c for c in categorical if c not in numeric]]
+    spec = (numeric, sorted(categorical.items(), key=str),
+            sorted((levels or {}).items(), key=str))
+    key = data_hash(frame, spec) if cache or cache_dir else None
+
+    if cache and key in _DESIGN_CACHE:
+        _DESIGN_CACHE.move_to_end(key)
+        return _DESIGN_CACHE[key]
+    if cache_dir is not None:
+        path = Path(cache_dir) / f'design_{key}.npz'
+        if path.exists():
+            design = _load_design(path, frame.index)
+            _remember(key, design, cache)
+            return design
+
+    blocks = []
+    columns = []
+    encoded_levels = {}
+    n = len(frame)
+
+    if numeric:
+        blocks.append(sparse.csr_matrix(frame[numeric].to_numpy(dtype=float)))
+        columns += numeric
+
+    for column, reference in categorical.items():
+        values = frame[column]
+        if levels is not None and column in levels:
+            column_levels = list(levels[column])
+        else:
+            observed = sorted(pd.unique(values.dropna()))
+            if reference is None or reference not in observed:
+                reference = observed[0] if observed else reference
+            else:
+                # Keep the data's own dtype (e.g. 3.0 for float-coded columns)
+                reference = observed[observed.index(reference)]
+            column_levels = [reference] + [v for v in observed if v != reference]
+        encoded_levels[column] = column_levels
+
+        codes = pd.Categorical(values, categories=column_levels).codes
+        # Reference level (code 0), missing and unseen levels (-1) stay zero
+        rows = np.flatnonzero(codes > 0)
+        blocks.append(sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, codes[rows] - 1)),
+            shape=(n, max(len(column_levels) - 1, 0))))
+        columns += [_level_name(column, level) for level in column_levels[1:]]
+
+    matrix = sparse.hstack(blocks, format='csr') if blocks else sparse.csr_matrix((n, 0))
+    design = DesignMatrix(matrix, columns, encoded_levels, frame.index)
+
+    _remember(key, design, cache)
+    if cache_dir is not None:
+        _save_design(design, Path(cache_dir) / f'design_{key}.npz')
+    return design
+
+
+def _remember(key, design, cache):
+    if not cache:
+        return
+    _DESIGN_CACHE[key] = design
+    _DESIGN_CACHE.move_to_end(key)
+    while len(_DESIGN_CACHE) > DESIGN_CACHE_SIZE:
+        _DESIGN_CACHE.popitem(last=False)
+
+
+def _save_design(design, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    matrix = design.matrix
+    level_columns = list(design.levels)
+    np.savez(path, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+             shape=np.array(matrix.shape), columns=np.array(design.columns),
+             level_columns=np.array(level_columns, dtype=str),
+             **{f'levels_{i}': np.asarray(design.levels[c])
+                for i, c in enumerate(level_columns)})
+
+
+def _load_design(path, index):
+    with np.load(path, allow_pickle=False) as data:
+        matrix = sparse.csr_matrix((data['data'], data['indices'], data['indptr']),
+                                   shape=tuple(data['shape']))
+        level_columns = data['level_columns'].tolist()
+        levels = {c: data[f'levels_{i}'].tolist() for i, c in enumerate(level_columns)}
+        return DesignMatrix(matrix, data['columns'].tolist(), levels, index)
+
+
+def clear_design_cache():
+    """Drop all in-memory encodings"""
+    _DESIGN_CACHE.clear()
@@ -0,0 +1,360 @@
+"""
+Logistic Regression Analysis
+Batched IRLS fits of poor sleep overall and across subgroups
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy import sparse, stats
+from scipy.special import expit
+
+from .design import CATEGORICAL_REFERENCES, build_design_matrix
+from .reporting import get_logger, log_section, write_metrics
+
+logger = get_logger(__name__)
+
+
+LOGISTIC_FEATURES = [
+    'SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY',
+    'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR'
+]
+
+LOGISTIC_SUBGROUPS = ['AGE_GROUP', 'RIAGENDR', 'RIDRETH1']
+
+# Relative within-group variance below which a predictor is treated as constant
+CONSTANT_TOLERANCE = 1e-10
+
+
+def _group_sums(groups, n_groups, values):
+    return np.bincount(groups, weights=values, minlength=n_groups)
+
+
+def _column_group_sums(X, weights, groups, n_groups):
+    """Per-group sums of weights * X for every column, shape (n_groups, p)"""
+    if sparse.issparse(X):
+        indicator = sparse.csr_matrix((weights, (groups, np.arange(len(groups)))),
+                                      shape=(n_groups, len(groups)))
+        return (indicator @ X).toarray()
+    return np.column_stack([_group_sums(groups, n_groups, weights * X[:, j])
+                            for j in range(X.shape[1])])
+
+
+def _linear_predictor(X, beta, groups):
+    """x_i' beta_g(i) for every row"""
+    if sparse.issparse(X):
+        # Row-wise products with each row's own coefficients, never n x n_groups
+        return np.asarray(X.multiply(beta[groups]).sum(axis=1)).ravel()
+    return np.einsum('ij,ij->i', X, beta[groups])
+
+
+def _group_blocks(X, groups, n_groups):
+    """Rows of a sparse X sorted by group once: (sorted X, row order, group boundaries)"""
+    order = np.argsort(groups, kind='stable')
+    bounds = np.searchsorted(groups[order], np.arange(n_groups + 1))
+    return X[order], order, bounds
+
+
+def _grouped_gram(X, weights, groups, n_groups, blocks=None):
+    """Per-group X' diag(weights) X, shape (n_groups, p, p), by one bincount per entry"""
+    p = X.shape[1]
+    if sparse.issparse(X):
+        # Sparse designs: one X' W_g X product per group on its contiguous
+        # block of rows, never densifying X
+        X_sorted, order, bounds = blocks or _group_blocks(X, groups, n_groups)
+        w_sorted = weights[order]
+        gram = np.empty((n_groups, p, p))
+        for g in range(n_groups):
+            block = X_sorted[bounds[g]:bounds[g + 1]]
+            weighted = block.multiply(w_sorted[bounds[g]:bounds[g + 1]][:, None])
+            gram[g] = (block.T @ weighted).toarray()
+        return gram
+    gram = np.empty((n_groups, p, p))
+    weighted = X * weights[:, None]
+    for a in range(p):
+        for b in range(a, p):
+            gram[:, a, b] = gram[:, b, a] = _group_sums(groups, n_groups, weighted[:, a] * X[:, b])
+    return gram
+
+
+def _grouped_deviance(y, mu, groups, n_groups):
+    eps = np.finfo(float).tiny
+    loglik = y * np.log(np.maximum(mu, eps)) + (1 - y) * np.log(np.maximum(1 - mu, eps))
+    return -2 * _group_sums(groups, n_groups, loglik)
+
+
+def fit_logistic_batched(X, y, groups=None, max_iter=25, tol=1e-8, l2=0.0):
+    """
+    Fit one logistic regression per group with stacked Newton (IRLS) steps
+
+    Every iteration computes all groups' gradients and Hessians with
+    bincount reductions over the rows and solves the (n_groups, p, p)
+    systems in one batched call. Groups stop updating once their step
+    is below tol; steps that increase a group's deviance are halved, and
+    a group whose deviance still increases after 10 halvings keeps its
+    previous coefficients for that iteration.
+    Predictors that are constant within a group are held at zero and
+    reported as NaN.
+
+    Parameters:
+    -----------
+    X : DataFrame, array or DesignMatrix
+        Predictors (complete cases); an intercept is added. A sparse
+        DesignMatrix (analysis.design) stays sparse throughout.
+    y : array
+        Binary outcome (0/1)
+    groups : array of int, optional
+        Group code per row (0..n_groups-1); one model when omitted
+    max_iter : int
+        Maximum Newton iterations
+    tol : float
+        Convergence threshold on the largest absolute coefficient step
+    l2 : float
+        Ridge penalty on the slopes (0 for maximum likelihood)
+
+    Returns:
+    --------
+    dict
+        coefficients, std_errors (n_groups x params arrays), names,
+        converged, n_iter, deviance, n (per group), probabilities (per row)
+    """
+    names = ['const'] + ([str(c) for c in X.columns] if hasattr(X, 'columns')
+                         else [f'x{i+1}' for i in range(np.shape(X)[1])])
+    if hasattr(X, 'matrix'):
+        X = sparse.hstack([np.ones((X.shape[0], 1)), X.matrix], format='csr')
+        squared = X.power(2)
+    else:
+        X = np.asarray(X, dtype=float)
+        X = np.column_stack([np.ones(len(X)), X])
+        squared = X ** 2
+    n = X.shape[0]
+    y = np.asarray(y, dtype=float)
+    groups = np.zeros(n, dtype=np.intp) if groups is None else np.asarray(groups, dtype=np.intp)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    p = X.shape[1]
+    blocks = _group_blocks(X, groups, n_groups) if sparse.issparse(X) else None
+
+    ones = np.ones(n)
+    counts = _group_sums(groups, n_groups, ones)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = _column_group_sums(X, ones, groups, n_groups) / counts[:, None]
+        second = _column_group_sums(squared, ones, groups, n_groups) / counts[:, None]
+    variance = second - means ** 2
+    active = variance > CONSTANT_TOLERANCE * np.maximum(second, 1.0)
+    active[:, 0] = counts > 0
+    inactive = ~active
+
+    penalty = np.full(p, l2)
+    penalty[0] = 0.0
+    beta = np.zeros((n_groups, p))
+    mu = expit(_linear_predictor(X, beta, groups))
+    deviance = _grouped_deviance(y, mu, groups, n_groups) + (penalty * beta ** 2).sum(axis=1)
+    converged = np.zeros(n_groups, dtype=bool)
+    n_iter = np.zeros(n_groups, dtype=int)
+
+    for _ in range(max_iter):
+        w = mu * (1 - mu)
+        hessian = _grouped_gram(X, w, groups, n_groups, blocks) + 2 * np.diag(penalty)
+        gradient = _column_group_sums(X, y - mu, groups, n_groups) - 2 * penalty * beta
+        # Inactive columns get a unit diagonal and zero gradient: their step is zero
+        hessian[inactive[:, :, None] | inactive[:, None, :]] = 0.0
+        hessian[:, np.arange(p), np.arange(p)] += inactive
+        gradient[inactive] = 0.0
+        step = np.linalg.solve(hessian, gradient[:, :, None])[:, :, 0]
+        step[converged] = 0.0
+
+        scale = np.ones(n_groups)
+        for _ in range(10):
+            candidate = beta + step * scale[:, None]
+            mu_new = expit(_linear_predictor(X, candidate, groups))
+            new_deviance = (_grouped_deviance(y, mu_new, groups, n_groups)
+                            + (penalty * candidate ** 2).sum(axis=1))
+            worse = new_deviance > deviance + 1e-12 * np.abs(deviance)
+            if not worse.any():
+                break
+            scale[worse] /= 2
+
+        # Groups still worse after the last halving keep their previous fit
+        # and stay unconverged
+        accepted = ~worse
+        beta = np.where(accepted[:, None], candidate, beta)
+        mu = np.where(accepted[groups], mu_new, mu)
+        deviance = np.where(accepted, new_deviance, deviance)
+        n_iter[~converged] += 1
+        converged |= accepted & (np.abs(step * scale[:, None]).max(axis=1) < tol)
+        if converged.all():
+            break
+
+    w = mu * (1 - mu)
+    hessian = _grouped_gram(X, w, groups, n_groups, blocks) + 2 * np.diag(penalty)
+    hessian[inactive[:, :, None] | inactive[:, None, :]] = 0.0
+    hessian[:, np.arange(p), np.arange(p)] += inactive
+    std_errors = np.sqrt(np.diagonal(np.linalg.inv(hessian), axis1=1, axis2=2)).copy()
+    beta = beta.copy()
+    beta[inactive] = np.nan
+    std_errors[inactive] = np.nan
+
+    return {
+        'coefficients': beta,
+        'std_errors': std_errors,
+        'names': names,
+        'converged': converged,
+        'n_iter': n_iter,
+        'deviance': deviance,
+        'n': counts.astype(int),
+        'probabilities': mu
+    }
+
+
+def grouped_auc(y, scores, groups, n_groups):
+    """
+    ROC AUC per group from within-group average ranks (Mann-Whitney U)
+
+    Returns NaN for groups with a single outcome class.
+    """
+    y = np.asarray(y, dtype=float)
+    ranks = pd.Series(scores).groupby(np.asarray(groups)).rank(method='average').to_numpy()
+    positives = _group_sums(groups, n_groups, y)
+    negatives = _group_sums(groups, n_groups, 1 - y)
+    rank_sums = _group_sums(groups, n_groups, ranks * y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (rank_sums - positives * (positives + 1) / 2) / (positives * negatives)
+
+
+def odds_ratio_table(fit, labels, alpha=0.05):
+    """
+    Tidy odds-ratio table for a batched fit
+
+    Parameters:
+    -----------
+    fit : dict
+        Result of fit_logistic_batched
+    labels : DataFrame
+        One row per group with identifying columns (e.g. Subgroup, Level)
+    alpha : float
+        Wald intervals cover 1 - alpha
+
+    Returns:
+    --------
+    DataFrame
+        Group labels, Variable, Coefficient, Std Error, Odds Ratio,
+        OR CI Lower, OR CI Upper, P-value
+    """
+    n_groups, p = fit['coefficients'].shape
+    z = stats.norm.ppf(1 - alpha / 2)
+    beta = fit['coefficients'].ravel()
+    se = fit['std_errors'].ravel()
+    table = labels.loc[labels.index.repeat(p)].reset_index(drop=True)
+    table['Variable'] = np.tile(fit['names'], n_groups)
+    table['Coefficient'] = beta
+    table['Std Error'] = se
+    table['Odds Ratio'] = np.exp(beta)
+    table['OR CI Lower'] = np.exp(beta - z * se)
+    table['OR CI Upper'] = np.exp(beta + z * se)
+    table['P-value'] = 2 * stats.norm.sf(np.abs(beta / se))
+    return table
+
+
+def _stack_subgroups(df, subgroups):
+    """Row indices and group codes for the full sample plus every subgroup level"""
+    rows = [np.arange(len(df))]
+    codes = [np.zeros(len(df), dtype=np.intp)]
+    labels = [('All', 'All')]
+    for column in subgroups:
+        level_codes, levels = pd.factorize(df[column], sort=True)
+        valid = level_codes >= 0
+        rows.append(np.flatnonzero(valid))
+        codes.append(level_codes[valid] + len(labels))
+        labels += [(column, level) for level in levels]
+    return (np.concatenate(rows), np.concatenate(codes),
+            pd.DataFrame(labels, columns=['Subgroup', 'Level']))
+
+
+def perform_logistic_analysis(df, output_dir='results', subgroups=None, quiet=False,
+                              outcome='POOR_SLEEP', features=None, categorical=False):
+    """
+    Perform logistic regression of poor sleep, overall and by subgroup
+
+    All subgroup models are fitted together: rows are stacked once per
+    group they belong to and every Newton step is a batched solve.
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Input dataframe
+    output_dir : str
+        Directory to save results
+    subgroups : list of str
+        Columns whose levels get their own model (default: AGE_GROUP,
+        RIAGENDR, RIDRETH1; [] for the overall model only)
+    quiet : bool
+        Skip logging the odds-ratio table
+    outcome : str
+        Binary outcome column
+    features : list of str
+        Predictors (default: the decision-tree feature set)
+    categorical : bool
+        Expand categorical features (CATEGORICAL_REFERENCES) into sparse
+        indicators instead of using their raw codes
+
+    Returns:
+    --------
+    dict
+        odds_ratios (tidy table), groups (N, AUC, convergence per group), fit.
+        Tables are saved to {output_dir}/tables/logistic_{outcome}_*.csv and
+        metrics to {output_dir}/metrics/logistic_{outcome}.json (lowercase).
+    """
+    log_section(logger, f"LOGISTIC REGRESSION ANALYSIS ({outcome})")
+
+    features = list(features or LOGISTIC_FEATURES)
+    subgroups = list(LOGISTIC_SUBGROUPS if subgroups is None else subgroups)
+    extra = [c for c in subgroups if c not in features]
+    df_logit = df[features + [outcome] + extra].dropna(subset=features + [outcome])
+    logger.info(f"Complete cases for logistic regression: {len(df_logit)}")
+
+    rows, groups, labels = _stack_subgroups(df_logit, subgroups)
+    y = df_logit[outcome].to_numpy(dtype=float)[rows]
+    if categorical:
+        design = build_design_matrix(
+            df_logit, numeric=[c for c in features if c not in CATEGORICAL_REFERENCES],
+            categorical=[c for c in features if c in CATEGORICAL_REFERENCES])
+        X = design.take(rows)
+    else:
+        X = pd.DataFrame(df_logit[features].to_numpy(dtype=float)[rows], columns=features)
+
+    fit = fit_logistic_batched(X, y, groups)
+    auc = grouped_auc(y, fit['probabilities'], groups, len(labels))
+
+    group_table = labels.assign(N=fit['n'], AUC=auc, Deviance=fit['deviance'],
+                                Converged=fit['converged'], Iterations=fit['n_iter'])
+    odds_ratios = odds_ratio_table(fit, labels)
+
+    if not fit['converged'].all():
+        logger.warning(f"{(~fit['converged']).sum()} group model(s) did not converge")
+    overall = group_table.iloc[0]
+    logger.info(f"Overall AUC: {overall['AUC']:.4f} ({len(labels)} models fitted)",
+                extra={'fields': {'model': 'logistic', 'auc': overall['AUC'],
+                                  'n_models': len(labels)}})
+    if not quiet:
+        logger.info("\nOdds Ratios (overall model):")
+        logger.info(odds_ratios[odds_ratios['Subgroup'] == 'All'].drop(
+            columns=['Subgroup', 'Level']).to_string(index=False))
+        logger.info("\nModels by subgroup:")
+        logger.info(group_table.to_string(index=False))
+
+    # Files are named after the outcome (logistic_poor_sleep_* for POOR_SLEEP)
+    stem = f'logistic_{outcome.lower()}'
+    output_path = Path(output_dir)
+    (output_path / 'tables').mkdir(parents=True, exist_ok=True)
+    odds_ratios.to_csv(output_path / 'tables' / f'{stem}_odds_ratios.csv', index=False)
+    group_table.to_csv(output_path / 'tables' / f'{stem}_groups.csv', index=False)
+
+    write_metrics(output_dir, stem, {
+        'outcome': outcome,
+        'n': int(overall['N']),
+        'auc': overall['AUC'],
+        'groups': group_table,
+        'odds_ratios': odds_ratios[odds_ratios['Subgroup'] == 'All']
+    })
+
+    return {'odds_ratios': odds_ratios, 'groups': group_table, 'fit': fit}
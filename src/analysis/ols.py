@@ -0,0 +1,304 @@
+"""
+OLS Engine
+Ordinary least squares for several outcomes that share one design matrix
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import linalg, sparse, stats
+
+
+def _design(X, add_constant=True):
+    """Return the design matrix and its column names, constant first"""
+    if hasattr(X, 'matrix'):
+        # DesignMatrix from analysis.design: keep it sparse
+        names = list(X.columns)
+        values = X.matrix
+        if add_constant:
+            values = sparse.hstack([np.ones((values.shape[0], 1)), values], format='csr')
+            names = ['const'] + names
+        return values, names
+    if hasattr(X, 'columns'):
+        names = [str(c) for c in X.columns]
+        values = X.to_numpy(dtype=float)
+    else:
+        values = np.asarray(X, dtype=float)
+        names = [f'x{i+1}' for i in range(values.shape[1])]
+    if add_constant:
+        values = np.column_stack([np.ones(len(values)), values])
+        names = ['const'] + names
+    return values, names
+
+
+def _outcomes(Y):
+    if hasattr(Y, 'columns'):
+        return Y.to_numpy(dtype=float), [str(c) for c in Y.columns]
+    if hasattr(Y, 'name'):
+        return Y.to_numpy(dtype=float)[:, None], [str(Y.name)]
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    return Y, [f'y{i+1}' for i in range(Y.shape[1])]
+
+
+def ols_inference(coefficients, cov_unscaled, rss, n, names, outcome_names):
+    """
+    Classical OLS inference from shared factors
+
+    Parameters:
+    -----------
+    coefficients : array
+        Coefficients, shape (n_params, n_outcomes)
+    cov_unscaled : array
+        (X'X)^-1, shape (n_params, n_params)
+    rss : array
+        Residual sum of squares per outcome
+    n : int
+        Number of observations
+    names, outcome_names : list
+        Row and column labels
+
+    Returns:
+    --------
+    dict
+        coefficients, std_errors, tvalues, pvalues (DataFrames, params x
+        outcomes), sigma2 (Series), df_resid
+    """
+    n_params = coefficients.shape[0]
+    df_resid = n - n_params
+    sigma2 = rss / df_resid
+    std_errors = np.sqrt(np.outer(np.diag(cov_unscaled), sigma2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tvalues = coefficients / std_errors
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), df_resid)
+
+    def frame(values):
+        return pd.DataFrame(values, index=names, columns=outcome_names)
+
+    return {
+        'coefficients': frame(coefficients),
+        'std_errors': frame(std_errors),
+        'tvalues': frame(tvalues),
+        'pvalues': frame(pvalues),
+        'sigma2': pd.Series(sigma2, index=outcome_names),
+        'df_resid': df_resid
+    }
+
+
+def fit_multi_outcome_ols(X, Y, add_constant=True):
+    """
+    Fit OLS for every outcome column from one QR factorization of X
+
+    X = QR is computed once; all outcomes are solved together from
+    R B = Q'Y, and standard errors for every outcome share (X'X)^-1 =
+    R^-1 R^-T. Results match statsmodels OLS with a constant.
+    
+    A sparse DesignMatrix (analysis.design) is solved through the
+    Cholesky factor of X'X instead, so indicator columns are never
+    expanded to a dense matrix.
+
+    Parameters:
+    -----------
+    X : DataFrame, array or DesignMatrix
+        Shared predictors (complete cases)
+    Y : DataFrame, Series or array
+        One or more outcome columns aligned with X
+    add_constant : bool
+        Prepend an intercept column named 'const'
+
+    Returns:
+    --------
+    dict
+        coefficients, std_errors, tvalues, pvalues (params x outcomes),
+        r2, rmse, mae (Series per outcome), fitted and residuals
+        (n x outcomes arrays), cov_unscaled, n, df_resid, sigma2
+    """
+    design, names = _design(X, add_constant)
+    Y, outcome_names = _outcomes(Y)
+    n = design.shape[0]
+
+    if sparse.issparse(design):
+        factor = linalg.cho_factor((design.T @ design).toarray())
+        coefficients = linalg.cho_solve(factor, design.T @ Y)
+        cov_unscaled = linalg.cho_solve(factor, np.eye(len(names)))
+    else:
+        Q, R = np.linalg.qr(design)
+        coefficients = linalg.solve_triangular(R, Q.T @ Y)
+        R_inv = linalg.solve_triangular(R, np.eye(R.shape[0]))
+        cov_unscaled = R_inv @ R_inv.T
+
+    fitted = design @ coefficients
+    residuals = Y - fitted
+    rss = (residuals ** 2).sum(axis=0)
+    tss = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+
+    results = ols_inference(coefficients, cov_unscaled, rss, n, names, outcome_names)
+    results.update({
+        'r2': pd.Series(1 - rss / tss, index=outcome_names),
+        'rmse': pd.Series(np.sqrt(rss / n), index=outcome_names),
+        'mae': pd.Series(np.abs(residuals).mean(axis=0), index=outcome_names),
+        'fitted': fitted,
+        'residuals': residuals,
+        'cov_unscaled': pd.DataFrame(cov_unscaled, index=names, columns=names),
+        'n': n
+    })
+    return results
+
+
+def coefficient_table(fit, outcome):
+    """
+    Coefficient table for one outcome in the layout of the regression CSVs
+
+    Parameters:
+    -----------
+    fit : dict
+        Result of fit_multi_outcome_ols (or another engine with the same keys)
+    outcome : str
+        Outcome column
+
+    Returns:
+    --------
+    DataFrame
+        Variable, Coefficient, P-value, Std Error
+    """
+    return pd.DataFrame({
+        'Variable': fit['coefficients'].index,
+        'Coefficient': fit['coefficients'][outcome].values,
+        'P-value': fit['pvalues'][outcome].values,
+        'Std Error': fit['std_errors'][outcome].values
+    })
+
+
+class OLSMoments:
+    """
+    Mergeable sufficient statistics for OLS on a fixed set of columns
+
+    Keeps n, the column means and the centered cross-product matrix
+    C = (Z - mean)'(Z - mean), which together determine X'X, X'y and y'y
+    for any split of the columns into predictors and outcomes. Blocks are
+    combined with the pairwise update of Chan et al., so partial results
+    from chunks or worker processes merge exactly and stay well
+    conditioned when the raw columns have large means.
+
+    Parameters:
+    -----------
+    columns : list of str
+        Variables tracked (predictors and outcomes)
+    """
+
+    def __init__(self, columns):
+        self.columns = [str(c) for c in columns]
+        p = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(p)
+        self.comoment = np.zeros((p, p))
+
+    def _combine(self, n, mean, comoment):
+        if n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.comoment = n, mean.copy(), comoment.copy()
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (self.n * n / total)
+        self.mean += delta * (n / total)
+        self.n = total
+        return self
+
+    def update(self, data):
+        """
+        Add a block of complete-case rows
+
+        Parameters:
+        -----------
+        data : DataFrame or array
+            Frames are selected by column name; arrays must be in columns order
+        """
+        if hasattr(data, 'columns'):
+            data = data[self.columns]
+        Z = np.asarray(data, dtype=float)
+        if len(Z) == 0:
+            return self
+        mean = Z.mean(axis=0)
+        centered = Z - mean
+        return self._combine(len(Z), mean, centered.T @ centered)
+
+    def merge(self, other):
+        """Combine the statistics of another accumulator over the same columns"""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge OLS moments over different columns")
+        return self._combine(other.n, other.mean, other.comoment)
+
+    def solve(self, predictors, outcomes):
+        """
+        Array-level OLS solve with an intercept
+
+        Parameters:
+        -----------
+        predictors, outcomes : list of str
+            Columns to use
+
+        Returns:
+        --------
+        tuple : (coefficients, cov_unscaled, rss, tss)
+            Coefficients (1 + n_predictors, n_outcomes) with the intercept
+            first, (X'X)^-1, residual and total sums of squares per outcome
+        """
+        ix = [self.columns.index(c) for c in predictors]
+        iy = [self.columns.index(c) for c in outcomes]
+
+        Cxx = self.comoment[np.ix_(ix, ix)]
+        Cxy = self.comoment[np.ix_(ix, iy)]
+        tss = np.diag(self.comoment)[iy]
+        mean_x = self.mean[ix]
+
+        factor = linalg.cho_factor(Cxx)
+        slopes = linalg.cho_solve(factor, Cxy)
+        intercept = self.mean[iy] - mean_x @ slopes
+        coefficients = np.vstack([intercept, slopes])
+
+        # (X'X)^-1 with the constant, from the inverse of the centered block
+        Cxx_inv = linalg.cho_solve(factor, np.eye(len(ix)))
+        shifted = Cxx_inv @ mean_x
+        cov_unscaled = np.empty((len(ix) + 1, len(ix) + 1))
+        cov_unscaled[0, 0] = 1.0 / self.n + mean_x @ shifted
+        cov_unscaled[0, 1:] = cov_unscaled[1:, 0] = -shifted
+        cov_unscaled[1:, 1:] = Cxx_inv
+
+        rss = np.maximum(tss - (Cxy * slopes).sum(axis=0), 0.0)
+        return coefficients, cov_unscaled, rss, tss
+
+    def fit(self, predictors, outcomes):
+        """
+        Solve OLS with an intercept from the accumulated statistics
+
+        Parameters:
+        -----------
+        predictors : list of str
+            Predictor columns
+        outcomes : str or list of str
+            One or more outcome columns sharing the predictors
+
+        Returns:
+        --------
+        dict
+            Same keys as fit_multi_outcome_ols except fitted and residuals.
+            mae is NaN: it needs a pass over the residuals.
+        """
+        if isinstance(outcomes, str):
+            outcomes = [outcomes]
+        names = ['const'] + [str(c) for c in predictors]
+        outcome_names = [str(c) for c in outcomes]
+
+        coefficients, cov_unscaled, rss, tss = self.solve(predictors, outcomes)
+
+        results = ols_inference(coefficients, cov_unscaled, rss, self.n, names, outcome_names)
+        results.update({
+            'r2': pd.Series(1 - rss / tss, index=outcome_names),
+            'rmse': pd.Series(np.sqrt(rss / self.n), index=outcome_names),
+            'mae': pd.Series(np.nan, index=outcome_names),
+            'cov_unscaled': pd.DataFrame(cov_unscaled, index=names, columns=names),
+            'n': self.n
+        })
+        return results
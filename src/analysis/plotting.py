@@ -0,0 +1,194 @@
+"""
+Plotting Helpers
+Binned renderings whose cost does not grow with the number of rows
+"""
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
+
+
+class ClusterDensityGrid:
+    """
+    2D histogram of points per cluster, filled chunk by chunk
+
+    Points outside the grid range are clipped into the edge bins.
+
+    Parameters:
+    -----------
+    x_range, y_range : tuple
+        (min, max) extent of the grid
+    n_clusters : int
+        Number of cluster labels
+    bins : int
+        Bins per axis
+    """
+
+    def __init__(self, x_range, y_range, n_clusters, bins=300):
+        self.x_range = (float(x_range[0]), float(x_range[1]))
+        self.y_range = (float(y_range[0]), float(y_range[1]))
+        self.n_clusters = n_clusters
+        self.bins = bins
+        self.counts = np.zeros((bins, bins, n_clusters), dtype=np.int64)
+
+    def _bin(self, values, value_range):
+        low, high = value_range
+        width = (high - low) or 1.0
+        idx = ((np.asarray(values, dtype=float) - low) / width * self.bins).astype(np.int64)
+        return np.clip(idx, 0, self.bins - 1)
+
+    def update(self, x, y, labels):
+        """Add points with their cluster labels"""
+        flat = ((self._bin(y, self.y_range) * self.bins + self._bin(x, self.x_range))
+                * self.n_clusters + np.asarray(labels, dtype=np.int64))
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+        return self
+
+    def render(self, ax, cmap='viridis'):
+        """
+        Draw the grid colored by the dominant cluster in each bin
+
+        Opacity follows log density so sparse regions stay visible.
+
+        Returns:
+        --------
+        ScalarMappable
+            Mappable for a cluster colorbar
+        """
+        total = self.counts.sum(axis=2)
+        dominant = self.counts.argmax(axis=2)
+        norm = Normalize(vmin=0, vmax=max(self.n_clusters - 1, 1))
+        colormap = plt.get_cmap(cmap)
+
+        image = colormap(norm(dominant))
+        peak = np.log1p(total.max()) or 1.0
+        image[..., 3] = np.where(total > 0, 0.25 + 0.75 * np.log1p(total) / peak, 0.0)
+
+        ax.imshow(image, origin='lower', aspect='auto', interpolation='nearest',
+                  extent=(*self.x_range, *self.y_range))
+        return ScalarMappable(norm=norm, cmap=colormap)
+
+
+class ResidualDensityGrid:
+    """
+    Binned regression diagnostics, filled chunk by chunk
+
+    Keeps 2D histograms of (fitted, actual) and (fitted, residual) plus
+    exact residual sums per fitted-value bin, so predicted-vs-actual and
+    residual plots cost the same whatever the number of rows. Points
+    outside the grid range are clipped into the edge bins.
+
+    Parameters:
+    -----------
+    fitted_range, actual_range, residual_range : tuple
+        (min, max) extent of each axis
+    bins : int
+        Bins per axis
+    """
+
+    def __init__(self, fitted_range, actual_range, residual_range, bins=100):
+        self.fitted_range = (float(fitted_range[0]), float(fitted_range[1]))
+        self.actual_range = (float(actual_range[0]), float(actual_range[1]))
+        self.residual_range = (float(residual_range[0]), float(residual_range[1]))
+        self.bins = bins
+        self.actual_counts = np.zeros((bins, bins), dtype=np.int64)
+        self.residual_counts = np.zeros((bins, bins), dtype=np.int64)
+        self.residual_sums = np.zeros((bins, 2))
+
+    def _bin(self, values, value_range):
+        low, high = value_range
+        width = (high - low) or 1.0
+        idx = ((np.asarray(values, dtype=float) - low) / width * self.bins).astype(np.int64)
+        return np.clip(idx, 0, self.bins - 1)
+
+    def _edges(self, value_range):
+        return np.linspace(value_range[0], value_range[1], self.bins + 1)
+
+    def update(self, fitted, actual):
+        """Add predictions with their observed outcomes"""
+        fitted = np.asarray(fitted, dtype=float)
+        actual = np.asarray(actual, dtype=float)
+        residuals = actual - fitted
+        column = self._bin(fitted, self.fitted_range)
+        size = self.bins * self.bins
+        self.actual_counts += np.bincount(self._bin(actual, self.actual_range) * self.bins + column,
+                                          minlength=size).reshape(self.bins, self.bins)
+        self.residual_counts += np.bincount(
+            self._bin(residuals, self.residual_range) * self.bins + column,
+            minlength=size).reshape(self.bins, self.bins)
+        self.residual_sums[:, 0] += np.bincount(column, weights=residuals, minlength=self.bins)
+        self.residual_sums[:, 1] += np.bincount(column, weights=residuals ** 2, minlength=self.bins)
+        return self
+
+    def merge(self, other):
+        """Add the counts of a grid with the same ranges (e.g. from another store)"""
+        self.actual_counts += other.actual_counts
+        self.residual_counts += other.residual_counts
+        self.residual_sums += other.residual_sums
+        return self
+
+    def binned_summary(self, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9)):
+        """
+        Residual summary per fitted-value bin
+
+        Means and standard deviations are exact; quantiles are
+        interpolated within the residual histogram bins.
+
+        Returns:
+        --------
+        DataFrame
+            Fitted (bin center), N, Mean Residual, SD Residual and one
+            column per quantile (e.g. Q50); empty bins are dropped
+        """
+        counts = self.residual_counts.sum(axis=0)
+        edges = self._edges(self.residual_range)
+        fitted_edges = self._edges(self.fitted_range)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self.residual_sums[:, 0] / counts
+            sd = np.sqrt(np.maximum(self.residual_sums[:, 1] / counts - mean ** 2, 0.0)
+                         * counts / (counts - 1))
+            cdf = np.cumsum(self.residual_counts, axis=0) / counts
+
+        summary = pd.DataFrame({
+            'Fitted': (fitted_edges[:-1] + fitted_edges[1:]) / 2,
+            'N': counts,
+            'Mean Residual': mean,
+            'SD Residual': sd
+        })
+        for q in quantiles:
+            idx = np.minimum((cdf < q).sum(axis=0), self.bins - 1)
+            below = np.where(idx > 0, cdf[np.maximum(idx - 1, 0), np.arange(self.bins)], 0.0)
+            within = cdf[idx, np.arange(self.bins)] - below
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraction = np.clip(np.where(within > 0, (q - below) / within, 0.5), 0.0, 1.0)
+            summary[f'Q{round(q * 100):g}'] = edges[idx] + fraction * (edges[1] - edges[0])
+        return summary[counts > 0].reset_index(drop=True)
+
+    def _render_density(self, ax, counts, y_range, cmap):
+        image = np.where(counts > 0, np.log1p(counts), np.nan)
+        return ax.imshow(image, origin='lower', aspect='auto', interpolation='nearest',
+                         cmap=cmap, extent=(*self.fitted_range, *y_range))
+
+    def render_actual(self, ax, cmap='Blues'):
+        """Draw predicted-vs-actual density (log counts) with the identity line"""
+        image = self._render_density(ax, self.actual_counts, self.actual_range, cmap)
+        low = max(self.fitted_range[0], self.actual_range[0])
+        high = min(self.fitted_range[1], self.actual_range[1])
+        ax.plot([low, high], [low, high], 'r--', lw=2)
+        return image
+
+    def render_residuals(self, ax, cmap='Blues'):
+        """Draw residual density (log counts) with the binned mean and 10-90% band"""
+        image = self._render_density(ax, self.residual_counts, self.residual_range, cmap)
+        summary = self.binned_summary(quantiles=(0.1, 0.5, 0.9))
+        ax.fill_between(summary['Fitted'], summary['Q10'], summary['Q90'],
+                        color='orange', alpha=0.25, label='10-90%')
+        ax.plot(summary['Fitted'], summary['Q50'], color='orange', lw=1.5, label='Median')
+        ax.plot(summary['Fitted'], summary['Mean Residual'], color='black', lw=1.5, label='Mean')
+        ax.axhline(y=0, color='r', linestyle='--', lw=2)
+        ax.legend(loc='upper right', fontsize=8)
+        return image
@@ -3,6 +3,8 @@ Linear Regression Analysis
 Quantify relationships between smoking, alcohol, and sleep outcomes
 """
 
+import copy
+import logging
 import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression
@@ -14,10 +16,129 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 import statsmodels.api as sm
-import joblib
 
+from ._parallel import shared_pool
+from .design import CATEGORICAL_REFERENCES, build_design_matrix
+from .ols import OLSMoments, coefficient_table, fit_multi_outcome_ols
+from .plotting import ResidualDensityGrid
+from .regression_scoring import RegressionArtifact
+from .resampling import bootstrap_ols, cluster_robust_ols
+from .survey import (SURVEY_INTERVIEW_DESIGN, SURVEY_PSU, SURVEY_STRATUM, SURVEY_WEIGHT,
+                     SurveyDesign, survey_ols)
+from .reporting import get_logger, log_section, write_metrics
 
-def perform_regression_analysis(df, output_dir='results'):
+logger = get_logger(__name__)
+
+
+# (results key, title, outcome, predictors, artifact file stem)
+REGRESSION_MODELS = [
+    ('model1', 'MODEL 1: Sleep Duration (SLD012)', 'SLD012',
+     ['SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY',
+      'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR'],
+     'regression_model1_sleep_duration'),
+    ('model2', 'MODEL 2: Sleep Quality (SLQ030)', 'SLQ030',
+     ['SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY',
+      'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR'],
+     'regression_model2_sleep_quality'),
+    ('model3', 'MODEL 3: Daytime Sleepiness (SLQ120)', 'SLQ120',
+     ['SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY',
+      'AVG_DRINKS_DAY', 'SLD012', 'RIDAGEYR', 'RIAGENDR'],
+     'regression_model3_daytime_sleepiness'),
+]
+
+
+DIAGNOSTIC_MODEL_NAMES = ['Sleep Duration', 'Sleep Quality', 'Daytime Sleepiness']
+
+# Above this many rows the diagnostics figure is drawn from binned summaries
+BINNED_DIAGNOSTICS_MIN_N = 50000
+
+
+# Complete cases are taken over every variable used by any model
+REGRESSION_VARIABLES = [
+    'SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY', 
+    'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR',
+    'SLD012', 'SLQ030', 'SLQ120'
+]
+
+
+def _group_by_design():
+    """Map each distinct predictor set to the outcomes modelled on it"""
+    groups = {}
+    for _, _, outcome, predictors, _ in REGRESSION_MODELS:
+        groups.setdefault(tuple(predictors), []).append(outcome)
+    return groups
+
+
+def _shared_design(df_reg, predictors):
+    """Sparse design with categorical predictors expanded to indicators"""
+    return build_design_matrix(
+        df_reg, numeric=[c for c in predictors if c not in CATEGORICAL_REFERENCES],
+        categorical=[c for c in predictors if c in CATEGORICAL_REFERENCES])
+
+
+def _residual_grid(fitted, actual):
+    """Diagnostics grid spanning the observed fitted, actual and residual values"""
+    residuals = actual - fitted
+    grid = ResidualDensityGrid((fitted.min(), fitted.max()), (actual.min(), actual.max()),
+                               (residuals.min(), residuals.max()))
+    return grid.update(fitted, actual)
+
+
+def _plot_binned_diagnostics(grids, output_dir):
+    """Draw binned predicted-vs-actual and residual plots and save the bin summaries"""
+    fig, axes = plt.subplots(3, 2, figsize=(14, 12))
+    summaries = []
+    
+    for idx, (grid, name) in enumerate(zip(grids, DIAGNOSTIC_MODEL_NAMES)):
+        image = grid.render_actual(axes[idx, 0])
+        fig.colorbar(image, ax=axes[idx, 0], label='log(1 + count)')
+        axes[idx, 0].set_xlabel('Predicted')
+        axes[idx, 0].set_ylabel('Actual')
+        axes[idx, 0].set_title(f'{name} - Predicted vs Actual')
+        axes[idx, 0].grid(True, alpha=0.3)
+        
+        image = grid.render_residuals(axes[idx, 1])
+        fig.colorbar(image, ax=axes[idx, 1], label='log(1 + count)')
+        axes[idx, 1].set_xlabel('Predicted')
+        axes[idx, 1].set_ylabel('Residuals')
+        axes[idx, 1].set_title(f'{name} - Residual Plot')
+        axes[idx, 1].grid(True, alpha=0.3)
+        
+        summaries.append(grid.binned_summary().assign(Model=name))
+    
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/figures/regression_diagnostics.png', dpi=300, bbox_inches='tight')
+    plt.close()
+    
+    table = pd.concat(summaries, ignore_index=True)
+    table = table[['Model'] + [c for c in table.columns if c != 'Model']]
+    table.to_csv(f'{output_dir}/tables/regression_residual_bins.csv', index=False)
+
+
+def _plot_coefficients(results, output_dir):
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    
+    for idx, (model_key, ax) in enumerate(zip(['model1', 'model2', 'model3'], axes)):
+        coeffs = results[model_key]['coefficients']
+        # Exclude constant
+        coeffs_plot = coeffs[coeffs['Variable'] != 'const'].copy()
+        coeffs_plot = coeffs_plot.sort_values('Coefficient')
+        
+        colors = ['red' if p < 0.05 else 'gray' for p in coeffs_plot['P-value']]
+        ax.barh(coeffs_plot['Variable'], coeffs_plot['Coefficient'], color=colors)
+        ax.axvline(x=0, color='black', linestyle='--', linewidth=0.5)
+        ax.set_xlabel('Coefficient')
+        ax.set_title(f'Model {idx+1} Coefficients')
+        ax.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/figures/regression_coefficients.png', dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def perform_regression_analysis(df, output_dir='results', quiet=False, engine='statsmodels',
+                                n_bootstrap=0, bootstrap_by='row', cluster_se=False, n_jobs=1,
+                                random_state=42, categorical=False, diagnostics='auto'):
     """
     Perform linear regression analysis on sleep outcomes
     
@@ -27,27 +148,55 @@ def perform_regression_analysis(df, output_dir='results'):
         Input dataframe
     output_dir : str
         Directory to save results
+    quiet : bool
+        Skip building the statsmodels summary text. Metrics are still
+        written to {output_dir}/metrics/regression.json.
+    engine : str
+        'statsmodels' fits one statsmodels OLS per model.
+        'shared' solves every outcome of a shared design from one QR
+        factorization (Models 1 and 2) and skips the statsmodels objects.
+        'survey' fits WTINT2YR-weighted OLS with Taylor-linearized standard
+        errors over SDMVSTRA/SDMVPSU (rows missing design variables are dropped).
+    n_bootstrap : int
+        Bootstrap replicates for percentile CIs (0 to skip). Adds Bootstrap
+        SE and Bootstrap CI Lower/Upper columns to the coefficient tables.
+    bootstrap_by : str
+        'row' resamples respondents; 'psu' resamples SDMVPSU within
+        SDMVSTRA (Rao-Wu rescaling)
+    cluster_se : bool
+        Add a Cluster SE column (CR1, clustered on stratum x PSU)
+    n_jobs : int
+        Worker processes for the bootstrap
+    random_state : int
+        Seed for the bootstrap
+    categorical : bool
+        Expand SMOKING_STATUS, ALCOHOL_STATUS and RIAGENDR into sparse
+        indicator columns (reference levels in analysis.design) instead of
+        using their raw codes. Requires engine='shared'.
+    diagnostics : str
+        'scatter' (one marker per respondent), 'binned' (density images
+        with per-bin residual mean and quantiles, also saved to
+        tables/regression_residual_bins.csv) or 'auto' (scatter up to
+        BINNED_DIAGNOSTICS_MIN_N rows)
     
     Returns:
     --------
     dict
-        Regression results for all models
+        Regression results for all models. Each model is also saved as a
+        compact RegressionArtifact in {output_dir}/models/{stem}.json.
     """
-    print("\n" + "="*80)
-    print("LINEAR REGRESSION ANALYSIS")
-    print("="*80)
+    log_section(logger, "LINEAR REGRESSION ANALYSIS")
     
     results = {}
     
     # Prepare data
-    regression_vars = [
-        'SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY', 
-        'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR',
-        'SLD012', 'SLQ030', 'SLQ120'
-    ]
-    
-    df_reg = df[regression_vars].dropna()
-    print(f"\nComplete cases for regression: {len(df_reg)}")
+    if engine == 'survey':
+        df_reg = df[REGRESSION_VARIABLES + SURVEY_INTERVIEW_DESIGN].dropna()
+    elif cluster_se or (n_bootstrap and bootstrap_by == 'psu'):
+        df_reg = df[REGRESSION_VARIABLES + [SURVEY_STRATUM, SURVEY_PSU]].dropna()
+    else:
+        df_reg = df[REGRESSION_VARIABLES].dropna()
+    logger.info(f"\nComplete cases for regression: {len(df_reg)}")
     
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
@@ -55,180 +204,354 @@ def perform_regression_analysis(df, output_dir='results'):
     (output_path / 'tables').mkdir(exist_ok=True)
     (output_path / 'models').mkdir(exist_ok=True)
     
-    # Model 1: Sleep Duration (SLD012)
-    print("\n" + "-"*80)
-    print("MODEL 1: Sleep Duration (SLD012)")
-    print("-"*80)
-    
-    X1 = df_reg[['SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY', 
-                 'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR']]
-    y1 = df_reg['SLD012']
-    
-    # Add constant for statsmodels
-    X1_sm = sm.add_constant(X1)
-    model1_sm = sm.OLS(y1, X1_sm).fit()
-    
-    print(model1_sm.summary())
-    
-    # Predictions
-    y1_pred = model1_sm.predict(X1_sm)
-    r2_1 = r2_score(y1, y1_pred)
-    rmse_1 = np.sqrt(mean_squared_error(y1, y1_pred))
-    mae_1 = mean_absolute_error(y1, y1_pred)
-    
-    print(f"\nR² = {r2_1:.4f}")
-    print(f"RMSE = {rmse_1:.4f}")
-    print(f"MAE = {mae_1:.4f}")
-    
-    # Save coefficients
-    coeffs1 = pd.DataFrame({
-        'Variable': model1_sm.params.index,
-        'Coefficient': model1_sm.params.values,
-        'P-value': model1_sm.pvalues.values,
-        'Std Error': model1_sm.bse.values
-    })
-    coeffs1.to_csv(f'{output_dir}/tables/regression_model1_coefficients.csv', index=False)
-    
-    model1_path = output_path / 'models' / 'regression_model1_sleep_duration.joblib'
-    joblib.dump(model1_sm, model1_path)
-    results['model1'] = {
-        'model': model1_sm,
-        'r2': r2_1,
-        'rmse': rmse_1,
-        'mae': mae_1,
-        'coefficients': coeffs1
-    }
-    
-    # Model 2: Sleep Quality (SLQ030)
-    print("\n" + "-"*80)
-    print("MODEL 2: Sleep Quality (SLQ030)")
-    print("-"*80)
-    
-    X2 = df_reg[['SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY', 
-                 'AVG_DRINKS_DAY', 'RIDAGEYR', 'RIAGENDR', 'INDFMPIR']]
-    y2 = df_reg['SLQ030']
-    
-    X2_sm = sm.add_constant(X2)
-    model2_sm = sm.OLS(y2, X2_sm).fit()
-    
-    print(model2_sm.summary())
-    
-    y2_pred = model2_sm.predict(X2_sm)
-    r2_2 = r2_score(y2, y2_pred)
-    rmse_2 = np.sqrt(mean_squared_error(y2, y2_pred))
-    mae_2 = mean_absolute_error(y2, y2_pred)
-    
-    print(f"\nR² = {r2_2:.4f}")
-    print(f"RMSE = {rmse_2:.4f}")
-    print(f"MAE = {mae_2:.4f}")
-    
-    coeffs2 = pd.DataFrame({
-        'Variable': model2_sm.params.index,
-        'Coefficient': model2_sm.params.values,
-        'P-value': model2_sm.pvalues.values,
-        'Std Error': model2_sm.bse.values
-    })
-    coeffs2.to_csv(f'{output_dir}/tables/regression_model2_coefficients.csv', index=False)
-    
-    model2_path = output_path / 'models' / 'regression_model2_sleep_quality.joblib'
-    joblib.dump(model2_sm, model2_path)
-    results['model2'] = {
-        'model': model2_sm,
-        'r2': r2_2,
-        'rmse': rmse_2,
-        'mae': mae_2,
-        'coefficients': coeffs2
-    }
-    
-    # Model 3: Daytime Sleepiness (SLQ120)
-    print("\n" + "-"*80)
-    print("MODEL 3: Daytime Sleepiness (SLQ120)")
-    print("-"*80)
-    
-    X3 = df_reg[['SMOKING_STATUS', 'ALCOHOL_STATUS', 'CIGARETTES_PER_DAY', 
-                 'AVG_DRINKS_DAY', 'SLD012', 'RIDAGEYR', 'RIAGENDR']]
-    y3 = df_reg['SLQ120']
-    
-    X3_sm = sm.add_constant(X3)
-    model3_sm = sm.OLS(y3, X3_sm).fit()
-    
-    print(model3_sm.summary())
-    
-    y3_pred = model3_sm.predict(X3_sm)
-    r2_3 = r2_score(y3, y3_pred)
-    rmse_3 = np.sqrt(mean_squared_error(y3, y3_pred))
-    mae_3 = mean_absolute_error(y3, y3_pred)
-    
-    print(f"\nR² = {r2_3:.4f}")
-    print(f"RMSE = {rmse_3:.4f}")
-    print(f"MAE = {mae_3:.4f}")
-    
-    coeffs3 = pd.DataFrame({
-        'Variable': model3_sm.params.index,
-        'Coefficient': model3_sm.params.values,
-        'P-value': model3_sm.pvalues.values,
-        'Std Error': model3_sm.bse.values
+    if categorical and (engine != 'shared' or n_bootstrap or cluster_se):
+        raise ValueError("categorical=True is only supported by engine='shared' "
+                         "without bootstrap or cluster-robust SEs")
+    
+    if engine == 'shared':
+        # Models that share a design are solved together from one factorization
+        shared_fits = {
+            predictors: fit_multi_outcome_ols(
+                _shared_design(df_reg, predictors) if categorical else df_reg[list(predictors)],
+                df_reg[outcomes])
+            for predictors, outcomes in _group_by_design().items()
+        }
+    elif engine == 'survey':
+        design = SurveyDesign.from_frame(df_reg)
+        logger.info(f"Survey design: {design.n_strata} strata, {design.n_psu} PSUs, df={design.df}")
+        shared_fits = {
+            predictors: survey_ols(df_reg[list(predictors)], df_reg[outcomes], design)
+            for predictors, outcomes in _group_by_design().items()
+        }
+    elif engine != 'statsmodels':
+        raise ValueError(f"Unknown regression engine: {engine}")
+    if bootstrap_by not in ('row', 'psu'):
+        raise ValueError(f"Unknown bootstrap unit: {bootstrap_by}")
+    if diagnostics not in ('auto', 'scatter', 'binned'):
+        raise ValueError(f"Unknown diagnostics mode: {diagnostics}")
+    
+    # Resampling and cluster-robust inference, shared by models with one design
+    weights = df_reg[SURVEY_WEIGHT].to_numpy() if engine == 'survey' else None
+    psu = None
+    if SURVEY_PSU in df_reg.columns:
+        psu = [df_reg[SURVEY_STRATUM].to_numpy(), df_reg[SURVEY_PSU].to_numpy()]
+    bootstrap_fits, robust_fits = {}, {}
+    for predictors, outcomes in _group_by_design().items():
+        X_group, Y_group = df_reg[list(predictors)], df_reg[outcomes]
+        if n_bootstrap:
+            by_psu = bootstrap_by == 'psu'
+            bootstrap_fits[predictors] = bootstrap_ols(
+                X_group, Y_group, weights=weights, clusters=psu if by_psu else None,
+                strata=psu[0] if by_psu else None, n_replicates=n_bootstrap,
+                n_jobs=n_jobs, random_state=random_state)
+        if cluster_se:
+            robust_fits[predictors] = cluster_robust_ols(X_group, Y_group, psu, weights=weights)
+    if n_bootstrap:
+        logger.info(f"Bootstrap: {n_bootstrap} replicates by {bootstrap_by}")
+    
+    for idx, (model_key, title, outcome, predictors, artifact_stem) in enumerate(REGRESSION_MODELS):
+        log_section(logger, title, char='-')
+        
+        X = df_reg[predictors]
+        y = df_reg[outcome]
+        
+        if engine in ('shared', 'survey'):
+            fit = shared_fits[tuple(predictors)]
+            model_sm = None
+            y_pred = fit['fitted'][:, fit['coefficients'].columns.get_loc(outcome)]
+            r2 = fit['r2'][outcome]
+            rmse = fit['rmse'][outcome]
+            mae = fit['mae'][outcome]
+            coeffs = coefficient_table(fit, outcome)
+            artifact = RegressionArtifact.from_fit(fit, outcome)
+        else:
+            # Add constant for statsmodels
+            X_sm = sm.add_constant(X)
+            model_sm = sm.OLS(y, X_sm).fit()
+            
+            if not quiet and logger.isEnabledFor(logging.INFO):
+                logger.info(model_sm.summary())
+            
+            # Predictions
+            y_pred = model_sm.predict(X_sm)
+            r2 = r2_score(y, y_pred)
+            rmse = np.sqrt(mean_squared_error(y, y_pred))
+            mae = mean_absolute_error(y, y_pred)
+            
+            coeffs = pd.DataFrame({
+                'Variable': model_sm.params.index,
+                'Coefficient': model_sm.params.values,
+                'P-value': model_sm.pvalues.values,
+                'Std Error': model_sm.bse.values
+            })
+            artifact = RegressionArtifact.from_statsmodels(model_sm, mae=mae)
+        
+        if n_bootstrap:
+            boot = bootstrap_fits[tuple(predictors)]
+            coeffs['Bootstrap SE'] = boot['std_errors'][outcome].values
+            coeffs['Bootstrap CI Lower'] = boot['ci_lower'][outcome].values
+            coeffs['Bootstrap CI Upper'] = boot['ci_upper'][outcome].values
+        if cluster_se:
+            coeffs['Cluster SE'] = robust_fits[tuple(predictors)]['std_errors'][outcome].values
+        
+        # Compact artifact: coefficients, covariance and fit statistics only
+        artifact.save(output_path / 'models' / f'{artifact_stem}.json')
+        
+        logger.info(f"\nR² = {r2:.4f}", extra={'fields': {'model': model_key, 'r2': r2}})
+        logger.info(f"RMSE = {rmse:.4f}", extra={'fields': {'model': model_key, 'rmse': rmse}})
+        logger.info(f"MAE = {mae:.4f}", extra={'fields': {'model': model_key, 'mae': mae}})
+        
+        # Save coefficients
+        coeffs.to_csv(f'{output_dir}/tables/regression_model{idx+1}_coefficients.csv', index=False)
+        
+        results[model_key] = {
+            'model': model_sm,
+            'artifact': artifact,
+            'r2': r2,
+            'rmse': rmse,
+            'mae': mae,
+            'coefficients': coeffs,
+            'fitted': np.asarray(y_pred)
+        }
+    
+    write_metrics(output_dir, 'regression', {
+        model_key: {
+            'outcome': outcome,
+            'n': len(df_reg),
+            'r2': results[model_key]['r2'],
+            'rmse': results[model_key]['rmse'],
+            'mae': results[model_key]['mae'],
+            'coefficients': results[model_key]['coefficients']
+        }
+        for model_key, _, outcome, _, _ in REGRESSION_MODELS
     })
-    coeffs3.to_csv(f'{output_dir}/tables/regression_model3_coefficients.csv', index=False)
-    
-    model3_path = output_path / 'models' / 'regression_model3_daytime_sleepiness.joblib'
-    joblib.dump(model3_sm, model3_path)
-    results['model3'] = {
-        'model': model3_sm,
-        'r2': r2_3,
-        'rmse': rmse_3,
-        'mae': mae_3,
-        'coefficients': coeffs3
-    }
     
     # Visualization: Coefficient plots
-    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    _plot_coefficients(results, output_dir)
     
-    for idx, (model_key, ax) in enumerate(zip(['model1', 'model2', 'model3'], axes)):
-        coeffs = results[model_key]['coefficients']
-        # Exclude constant
-        coeffs_plot = coeffs[coeffs['Variable'] != 'const'].copy()
-        coeffs_plot = coeffs_plot.sort_values('Coefficient')
+    # Residual plots
+    fitted = [results[key]['fitted'] for key, _, _, _, _ in REGRESSION_MODELS]
+    outcomes = [df_reg[outcome] for _, _, outcome, _, _ in REGRESSION_MODELS]
+    
+    if diagnostics == 'auto':
+        diagnostics = 'scatter' if len(df_reg) <= BINNED_DIAGNOSTICS_MIN_N else 'binned'
+    if diagnostics == 'binned':
+        grids = [_residual_grid(y_pred, y.to_numpy(dtype=float))
+                 for y_pred, y in zip(fitted, outcomes)]
+        _plot_binned_diagnostics(grids, output_dir)
+    else:
+        fig, axes = plt.subplots(3, 2, figsize=(14, 12))
         
-        colors = ['red' if p < 0.05 else 'gray' for p in coeffs_plot['P-value']]
-        ax.barh(coeffs_plot['Variable'], coeffs_plot['Coefficient'], color=colors)
-        ax.axvline(x=0, color='black', linestyle='--', linewidth=0.5)
-        ax.set_xlabel('Coefficient')
-        ax.set_title(f'Model {idx+1} Coefficients')
-        ax.grid(True, alpha=0.3)
+        for idx, (y_pred, y, name) in enumerate(zip(fitted, outcomes, DIAGNOSTIC_MODEL_NAMES)):
+            # Predicted vs Actual
+            axes[idx, 0].scatter(y_pred, y, alpha=0.5)
+            axes[idx, 0].plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
+            axes[idx, 0].set_xlabel('Predicted')
+            axes[idx, 0].set_ylabel('Actual')
+            axes[idx, 0].set_title(f'{name} - Predicted vs Actual')
+            axes[idx, 0].grid(True, alpha=0.3)
+        
+            # Residuals
+            residuals = y - y_pred
+            axes[idx, 1].scatter(y_pred, residuals, alpha=0.5)
+            axes[idx, 1].axhline(y=0, color='r', linestyle='--', lw=2)
+            axes[idx, 1].set_xlabel('Predicted')
+            axes[idx, 1].set_ylabel('Residuals')
+            axes[idx, 1].set_title(f'{name} - Residual Plot')
+            axes[idx, 1].grid(True, alpha=0.3)
+        
+        plt.tight_layout()
+        plt.savefig(f'{output_dir}/figures/regression_diagnostics.png', dpi=300, bbox_inches='tight')
+        plt.close()
     
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/figures/regression_coefficients.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    return results
+
+
+def iter_regression_chunks(source, chunksize=100000):
+    """
+    Stream complete-case regression rows from the prepared store
+
+    Parameters:
+    -----------
+    source : str, Path or DataFrame
+        Prepared CSV store (read lazily in chunks) or an in-memory frame
+    chunksize : int
+        Rows read per chunk
+
+    Yields:
+    -------
+    DataFrame
+        Complete cases over REGRESSION_VARIABLES
+    """
+    if isinstance(source, pd.DataFrame):
+        chunks = (source[REGRESSION_VARIABLES].iloc[start:start + chunksize]
+                  for start in range(0, len(source), chunksize))
+    else:
+        chunks = pd.read_csv(source, usecols=REGRESSION_VARIABLES, chunksize=chunksize)
+
+    for chunk in chunks:
+        chunk = chunk.dropna()
+        if not chunk.empty:
+            yield chunk
+
+
+def _moments_job(source, chunksize):
+    """Accumulate OLS sufficient statistics over one store"""
+    moments = OLSMoments(REGRESSION_VARIABLES)
+    for chunk in iter_regression_chunks(source, chunksize):
+        moments.update(chunk)
+    return moments
+
+
+def _residual_job(source, chunksize, models, grids):
+    """
+    Residual pass over one store: absolute residual sums per
+    (predictors, outcome, coefficients) model and, when grids are
+    given, their binned diagnostics
+    """
+    sums = np.zeros(len(models))
+    for chunk in iter_regression_chunks(source, chunksize):
+        for i, (predictors, outcome, beta) in enumerate(models):
+            fitted = beta[0] + chunk[predictors].to_numpy(dtype=float) @ beta[1:]
+            actual = chunk[outcome].to_numpy(dtype=float)
+            sums[i] += np.abs(actual - fitted).sum()
+            if grids is not None:
+                grids[i].update(fitted, actual)
+    return sums, grids
+
+
+def _streaming_grid(moments, fit, outcome):
+    """
+    Diagnostics grid sized from the sufficient statistics before the
+    residual pass: +/-4 SD around the outcome mean for fitted and
+    actual values and +/-4 RMSE for residuals
+    """
+    j = moments.columns.index(outcome)
+    mean = moments.mean[j]
+    sd = np.sqrt(moments.comoment[j, j] / moments.n)
+    fitted_sd = sd * np.sqrt(max(fit['r2'][outcome], 0.0))
+    spread = 4 * fit['rmse'][outcome]
+    return ResidualDensityGrid((mean - 4 * fitted_sd, mean + 4 * fitted_sd),
+                               (mean - 4 * sd, mean + 4 * sd), (-spread, spread))
+
+
+def perform_streaming_regression_analysis(data_file, output_dir='results', chunksize=100000,
+                                          n_jobs=1, mae=True, diagnostics=True):
+    """
+    Perform linear regression analysis out-of-core from sufficient statistics
     
-    # Residual plots
-    fig, axes = plt.subplots(3, 2, figsize=(14, 12))
+    One scan accumulates n, means and the centered cross-product matrix
+    of every regression variable (OLSMoments); all three models are then
+    solved from sub-blocks of it, with the same coefficients and classical
+    standard errors as the in-memory analysis.
     
-    models = [model1_sm, model2_sm, model3_sm]
-    outcomes = [y1, y2, y3]
-    model_names = ['Sleep Duration', 'Sleep Quality', 'Daytime Sleepiness']
+    Parameters:
+    -----------
+    data_file : str, Path, DataFrame or list of these
+        Prepared store(s), e.g. one CSV per survey cycle
+    output_dir : str
+        Directory to save results
+    chunksize : int
+        Rows read per chunk
+    n_jobs : int
+        Worker processes. Each store is scanned by one worker and the
+        partial statistics are merged.
+    mae : bool
+        Make a second pass for the mean absolute error, which is not a
+        function of the sufficient statistics
+    diagnostics : bool
+        Draw binned predicted-vs-actual and residual plots, filled during
+        the residual pass (which is then made even when mae is False)
     
-    for idx, (model, y, name) in enumerate(zip(models, outcomes, model_names)):
-        # Predicted vs Actual
-        y_pred = model.fittedvalues
-        axes[idx, 0].scatter(y_pred, y, alpha=0.5)
-        axes[idx, 0].plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
-        axes[idx, 0].set_xlabel('Predicted')
-        axes[idx, 0].set_ylabel('Actual')
-        axes[idx, 0].set_title(f'{name} - Predicted vs Actual')
-        axes[idx, 0].grid(True, alpha=0.3)
+    Returns:
+    --------
+    dict
+        Regression results for all models (without model objects or fitted values)
+    """
+    log_section(logger, "LINEAR REGRESSION ANALYSIS (STREAMING)")
+    
+    sources = list(data_file) if isinstance(data_file, (list, tuple)) else [data_file]
+    
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    (output_path / 'figures').mkdir(exist_ok=True)
+    (output_path / 'tables').mkdir(exist_ok=True)
+    (output_path / 'models').mkdir(exist_ok=True)
+    
+    with shared_pool({}, n_jobs) as pool:
+        partials = pool.map(_moments_job, sources, [chunksize] * len(sources))
+        moments = OLSMoments(REGRESSION_VARIABLES)
+        for partial in partials:
+            moments.merge(partial)
+        logger.info(f"\nComplete cases for regression: {moments.n}")
         
-        # Residuals
-        residuals = y - y_pred
-        axes[idx, 1].scatter(y_pred, residuals, alpha=0.5)
-        axes[idx, 1].axhline(y=0, color='r', linestyle='--', lw=2)
-        axes[idx, 1].set_xlabel('Predicted')
-        axes[idx, 1].set_ylabel('Residuals')
-        axes[idx, 1].set_title(f'{name} - Residual Plot')
-        axes[idx, 1].grid(True, alpha=0.3)
+        fits = {predictors: moments.fit(list(predictors), outcomes)
+                for predictors, outcomes in _group_by_design().items()}
+        
+        mae_values = [np.nan] * len(REGRESSION_MODELS)
+        grids = None
+        if mae or diagnostics:
+            models = [(predictors, outcome,
+                       fits[tuple(predictors)]['coefficients'][outcome].to_numpy())
+                      for _, _, outcome, predictors, _ in REGRESSION_MODELS]
+            empty = ([_streaming_grid(moments, fits[tuple(predictors)], outcome)
+                      for _, _, outcome, predictors, _ in REGRESSION_MODELS]
+                     if diagnostics else None)
+            # Every store fills its own grids (the inline pool updates them in place)
+            passes = pool.map(_residual_job, sources, [chunksize] * len(sources),
+                              [models] * len(sources),
+                              [copy.deepcopy(empty) for _ in sources])
+            if mae:
+                mae_values = list(np.sum([sums for sums, _ in passes], axis=0) / moments.n)
+            if diagnostics:
+                grids = passes[0][1]
+                for _, partial in passes[1:]:
+                    for grid, other in zip(grids, partial):
+                        grid.merge(other)
     
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/figures/regression_diagnostics.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    results = {}
+    for idx, (model_key, title, outcome, predictors, artifact_stem) in enumerate(REGRESSION_MODELS):
+        log_section(logger, title, char='-')
+        
+        fit = fits[tuple(predictors)]
+        r2 = fit['r2'][outcome]
+        rmse = fit['rmse'][outcome]
+        coeffs = coefficient_table(fit, outcome)
+        
+        logger.info(f"\nR² = {r2:.4f}", extra={'fields': {'model': model_key, 'r2': r2}})
+        logger.info(f"RMSE = {rmse:.4f}", extra={'fields': {'model': model_key, 'rmse': rmse}})
+        if mae:
+            logger.info(f"MAE = {mae_values[idx]:.4f}",
+                        extra={'fields': {'model': model_key, 'mae': mae_values[idx]}})
+        
+        coeffs.to_csv(f'{output_dir}/tables/regression_model{idx+1}_coefficients.csv', index=False)
+        artifact = RegressionArtifact.from_fit(fit, outcome, mae=mae_values[idx])
+        artifact.save(output_path / 'models' / f'{artifact_stem}.json')
+        
+        results[model_key] = {
+            'model': None,
+            'artifact': artifact,
+            'r2': r2,
+            'rmse': rmse,
+            'mae': mae_values[idx],
+            'coefficients': coeffs
+        }
+    
+    write_metrics(output_dir, 'regression', {
+        model_key: {
+            'outcome': outcome,
+            'n': moments.n,
+            'r2': results[model_key]['r2'],
+            'rmse': results[model_key]['rmse'],
+            'mae': results[model_key]['mae'],
+            'coefficients': results[model_key]['coefficients']
+        }
+        for model_key, _, outcome, _, _ in REGRESSION_MODELS
+    })
+    
+    _plot_coefficients(results, output_dir)
+    if grids is not None:
+        _plot_binned_diagnostics(grids, output_dir)
     
+    results['moments'] = moments
     return results
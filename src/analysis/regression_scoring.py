@@ -0,0 +1,196 @@
+"""
+Regression Scoring
+Compact OLS artifacts that load and predict without statsmodels or the training data
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+class RegressionArtifact:
+    """
+    Coefficients, covariance and fit statistics of one linear model
+
+    A pickled statsmodels result carries the design matrix and outcome, so
+    it grows with N. This holds only the p x p quantities and a few
+    scalars, and round-trips through a small JSON file.
+
+    Parameters:
+    -----------
+    outcome : str
+        Outcome column
+    variables : list of str
+        Parameter names in order, 'const' first when there is an intercept
+    coefficients : array
+        Estimates, shape (n_params,)
+    covariance : array
+        Parameter covariance matrix, shape (n_params, n_params)
+    statistics : dict
+        Fit statistics: n, df_resid, r2, r2_adj, rmse, mae, sigma2, and
+        df_design for design-based fits
+    pvalues : array, optional
+        Two-sided p-values (t distribution on df_resid, or df_design when
+        present, when omitted)
+    """
+
+    def __init__(self, outcome, variables, coefficients, covariance, statistics, pvalues=None):
+        self.outcome = str(outcome)
+        self.variables = [str(v) for v in variables]
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.covariance = np.asarray(covariance, dtype=float)
+        self.statistics = {key: (None if value is None
+                                 else int(value) if key in ('n', 'df_resid', 'df_design')
+                                 else float(value))
+                           for key, value in statistics.items()}
+        self.std_errors = np.sqrt(np.diag(self.covariance))
+        if pvalues is None:
+            tvalues = self.coefficients / self.std_errors
+            pvalues = 2 * stats.t.sf(np.abs(tvalues), self.df_inference)
+        self.pvalues = np.asarray(pvalues, dtype=float)
+
+    @property
+    def df_inference(self):
+        """Degrees of freedom for t statistics: the design df for survey fits"""
+        return self.statistics.get('df_design', self.statistics['df_resid'])
+
+    @property
+    def feature_names(self):
+        """Predictor columns expected by predict()"""
+        return [v for v in self.variables if v != 'const']
+
+    @property
+    def has_constant(self):
+        return 'const' in self.variables
+
+    @staticmethod
+    def _statistics(n, df_resid, r2, rmse, mae, sigma2, df_design=None):
+        statistics = {
+            'n': n,
+            'df_resid': df_resid,
+            'r2': r2,
+            'r2_adj': 1 - (1 - r2) * (n - 1) / df_resid,
+            'rmse': rmse,
+            'mae': mae,
+            'sigma2': sigma2
+        }
+        if df_design is not None:
+            statistics['df_design'] = df_design
+        return statistics
+
+    @classmethod
+    def from_statsmodels(cls, results, mae=None):
+        """Build from a fitted statsmodels OLS result"""
+        n = results.nobs
+        statistics = cls._statistics(n, results.df_resid, results.rsquared,
+                                     np.sqrt(results.ssr / n), mae, results.scale)
+        return cls(results.model.endog_names, results.params.index, results.params.values,
+                   results.cov_params().values, statistics, results.pvalues.values)
+
+    @classmethod
+    def from_fit(cls, fit, outcome, mae=None):
+        """
+        Build from one outcome of an analysis.ols or analysis.survey fit dict
+
+        Fits with per-outcome covariances (e.g. design-based) use them
+        directly; classical fits scale (X'X)^-1 by sigma².
+        """
+        sigma2 = fit['sigma2'][outcome]
+        if mae is None:
+            mae = fit['mae'][outcome]
+        if 'covariances' in fit:
+            covariance = fit['covariances'][outcome].values
+        else:
+            covariance = fit['cov_unscaled'].values * sigma2
+        statistics = cls._statistics(fit['n'], fit['df_resid'], fit['r2'][outcome],
+                                     fit['rmse'][outcome], mae, sigma2,
+                                     df_design=fit.get('df_design'))
+        return cls(outcome, fit['coefficients'].index, fit['coefficients'][outcome].values,
+                   covariance, statistics, fit['pvalues'][outcome].values)
+
+    def to_dict(self):
+        return {
+            'outcome': self.outcome,
+            'variables': self.variables,
+            'coefficients': self.coefficients.tolist(),
+            'covariance': self.covariance.tolist(),
+            'pvalues': self.pvalues.tolist(),
+            'statistics': {key: (None if value is None or not np.isfinite(value) else value)
+                           for key, value in self.statistics.items()}
+        }
+
+    def save(self, path):
+        """Save the artifact as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Load an artifact written by save()"""
+        with open(path) as f:
+            data = json.load(f)
+        statistics = {key: (np.nan if value is None else value)
+                      for key, value in data['statistics'].items()}
+        return cls(data['outcome'], data['variables'], data['coefficients'],
+                   data['covariance'], statistics, data['pvalues'])
+
+    def summary_frame(self, alpha=0.05):
+        """
+        Coefficient table with standard errors, p-values and confidence intervals
+
+        Returns:
+        --------
+        DataFrame
+            Indexed by variable: coef, std_err, t, p_value, ci_lower, ci_upper
+        """
+        t_critical = stats.t.ppf(1 - alpha / 2, self.df_inference)
+        return pd.DataFrame({
+            'coef': self.coefficients,
+            'std_err': self.std_errors,
+            't': self.coefficients / self.std_errors,
+            'p_value': self.pvalues,
+            'ci_lower': self.coefficients - t_critical * self.std_errors,
+            'ci_upper': self.coefficients + t_critical * self.std_errors
+        }, index=pd.Index(self.variables, name='Variable'))
+
+    def _design(self, batch):
+        names = self.feature_names
+        if hasattr(batch, 'matrix'):
+            # DesignMatrix: pick the encoded columns this model was fitted on
+            X = batch.matrix[:, [batch.columns.index(name) for name in names]].toarray()
+        elif hasattr(batch, 'columns') or isinstance(batch, dict):
+            X = np.column_stack([np.asarray(batch[name], dtype=float) for name in names])
+        else:
+            X = np.asarray(batch, dtype=float)
+            if X.ndim != 2 or X.shape[1] != len(names):
+                raise ValueError(
+                    f"Expected an array with {len(names)} columns ({', '.join(names)})"
+                )
+        if self.has_constant:
+            X = np.column_stack([np.ones(len(X)), X])
+        return X
+
+    def predict(self, batch, return_std=False):
+        """
+        Predict the outcome for a batch of respondents
+
+        Parameters:
+        -----------
+        batch : DataFrame, dict of arrays, DesignMatrix or 2D array
+            Predictor values. Frames, dicts and design matrices are selected
+            by name; arrays must be in feature_names order. Rows with a missing value give NaN.
+        return_std : bool
+            Also return the standard error of the predicted mean
+
+        Returns:
+        --------
+        array, or tuple of arrays (prediction, std_error)
+        """
+        X = self._design(batch)
+        prediction = X @ self.coefficients
+        if not return_std:
+            return prediction
+        std_error = np.sqrt(np.einsum('ij,jk,ik->i', X, self.covariance, X))
+        return prediction, std_error
@@ -0,0 +1,135 @@
+"""
+Reporting Utilities
+Structured logging and machine-readable metric output for the analysis steps
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+LOGGER_NAME = 'sleep_analysis'
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            payload.update(to_builtin(fields))
+        return json.dumps(payload)
+
+
+def configure_logging(level=logging.INFO, fmt='text', stream=None):
+    """
+    Configure the analysis logger
+
+    Parameters:
+    -----------
+    level : int or str
+        Minimum level to emit (e.g. logging.INFO, 'WARNING')
+    fmt : str
+        'text' for plain messages, 'json' for one JSON record per line
+    stream : file-like, optional
+        Output stream (defaults to stdout)
+
+    Returns:
+    --------
+    Logger
+        The configured package logger
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+def get_logger(name):
+    """
+    Get a child of the analysis logger, configuring defaults on first use
+
+    Parameters:
+    -----------
+    name : str
+        Module name (usually __name__)
+
+    Returns:
+    --------
+    Logger
+    """
+    if not logging.getLogger(LOGGER_NAME).handlers:
+        configure_logging()
+    return logging.getLogger(f"{LOGGER_NAME}.{name.rsplit('.', 1)[-1]}")
+
+
+def log_section(logger, title, char='=', width=80):
+    """Log a section heading framed by rule lines"""
+    logger.info("\n" + char * width)
+    logger.info(title)
+    logger.info(char * width)
+
+
+def to_builtin(value):
+    """Convert numpy/pandas values into JSON-serializable Python objects"""
+    if isinstance(value, dict):
+        return {str(k): to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        return to_builtin(value.to_dict(orient='records'))
+    if isinstance(value, pd.Series):
+        return to_builtin(value.to_dict())
+    if isinstance(value, np.ndarray):
+        return to_builtin(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def write_metrics(output_dir, name, metrics):
+    """
+    Write machine-readable metrics to {output_dir}/metrics/{name}.json
+
+    Parameters:
+    -----------
+    output_dir : str or Path
+        Analysis output directory
+    name : str
+        Metrics file stem (e.g. 'regression')
+    metrics : dict
+        Metrics to serialize
+
+    Returns:
+    --------
+    Path
+        Path of the written file
+    """
+    metrics_dir = Path(output_dir) / 'metrics'
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    path = metrics_dir / f'{name}.json'
+    with open(path, 'w') as f:
+        json.dump(to_builtin(metrics), f, indent=2)
+    return path
@@ -0,0 +1,248 @@
+"""
+Resampling Inference
+Batched bootstrap and cluster-robust standard errors for OLS
+"""
+
+import numpy as np
+import pandas as pd
+
+from ._parallel import shared_pool, worker_array
+
+
+def _design_arrays(X, Y, add_constant=True):
+    names = ['const'] + [str(c) for c in X.columns] if add_constant else [str(c) for c in X.columns]
+    design = X.to_numpy(dtype=float)
+    if add_constant:
+        design = np.column_stack([np.ones(len(design)), design])
+    if isinstance(Y, pd.Series):
+        Y = Y.to_frame()
+    return design, names, Y.to_numpy(dtype=float), [str(c) for c in Y.columns]
+
+
+def ols_contributions(design, Y, weights=None):
+    """
+    Per-row contributions to the normal equations
+
+    Row i contributes w_i x_i x_i' to X'WX and w_i x_i y_i' to X'WY, so
+    any reweighting of rows (a bootstrap replicate) is a weighted sum of
+    these rows followed by a p x p solve.
+
+    Returns:
+    --------
+    array
+        Shape (n, p * p + p * k): vec(x x') then vec(x y') per row
+    """
+    weighted = design if weights is None else design * np.asarray(weights, dtype=float)[:, None]
+    n, p = design.shape
+    xx = (weighted[:, :, None] * design[:, None, :]).reshape(n, p * p)
+    xy = (weighted[:, :, None] * Y[:, None, :]).reshape(n, -1)
+    return np.hstack([xx, xy])
+
+
+def _unit_codes(clusters, n):
+    """Integer unit per row (rows themselves when clusters is None) and unit count"""
+    if clusters is None:
+        return np.arange(n), n
+    codes, uniques = pd.factorize(pd.MultiIndex.from_arrays(clusters)
+                                  if isinstance(clusters, (list, tuple)) else np.asarray(clusters))
+    return codes, len(uniques)
+
+
+def _unit_totals(values, codes, n_units):
+    order = np.argsort(codes, kind='stable')
+    starts = np.searchsorted(codes[order], np.arange(n_units))
+    return np.add.reduceat(values[order], starts, axis=0)
+
+
+def _solve_batch(sums, p, k):
+    """Solve a batch of normal equations; singular replicates give NaN"""
+    xx = sums[:, :p * p].reshape(-1, p, p)
+    xy = sums[:, p * p:].reshape(-1, p, k)
+    try:
+        return np.linalg.solve(xx, xy)
+    except np.linalg.LinAlgError:
+        solved = np.full(xy.shape, np.nan)
+        for b in range(len(xx)):
+            try:
+                solved[b] = np.linalg.solve(xx[b], xy[b])
+            except np.linalg.LinAlgError:
+                pass
+        return solved
+
+
+def _replicate_weights(rng, n_replicates, unit_strata, n_units):
+    """
+    Bootstrap weights per unit, shape (n_replicates, n_units)
+
+    Without strata, n units are drawn with replacement from n. With
+    strata, n_h - 1 PSUs are drawn within each stratum and rescaled by
+    n_h / (n_h - 1) (Rao-Wu), which keeps the bootstrap variance
+    unbiased when strata hold only two PSUs as in NHANES.
+    """
+    if unit_strata is None:
+        return rng.multinomial(n_units, np.full(n_units, 1.0 / n_units),
+                               size=n_replicates).astype(float)
+    weights = np.zeros((n_replicates, n_units))
+    for stratum in np.unique(unit_strata):
+        members = np.flatnonzero(unit_strata == stratum)
+        n_h = len(members)
+        if n_h == 1:
+            weights[:, members] = 1.0
+            continue
+        counts = rng.multinomial(n_h - 1, np.full(n_h, 1.0 / n_h), size=n_replicates)
+        weights[:, members] = counts * (n_h / (n_h - 1))
+    return weights
+
+
+def _bootstrap_job(n_replicates, seed, p, k, stratified, max_memory_mb):
+    """Fit a batch of replicates as W @ C followed by batched solves"""
+    contributions = worker_array('contributions')
+    unit_strata = worker_array('strata') if stratified else None
+    rng = np.random.default_rng(seed)
+    n_units = len(contributions)
+
+    # Bound the (replicates x units) weight block
+    block = max(1, int(max_memory_mb * 2 ** 20 / 8 / max(n_units, 1)))
+    solved = []
+    for start in range(0, n_replicates, block):
+        size = min(block, n_replicates - start)
+        W = _replicate_weights(rng, size, unit_strata, n_units)
+        solved.append(_solve_batch(W @ contributions, p, k))
+    return np.concatenate(solved)
+
+
+def bootstrap_ols(X, Y, weights=None, clusters=None, strata=None, n_replicates=1000,
+                  n_jobs=1, batch_size=100, alpha=0.05, max_memory_mb=64,
+                  random_state=42, add_constant=True):
+    """
+    Bootstrap OLS coefficients from precomputed normal-equation contributions
+
+    Rows (or clusters) are reduced once to their contributions to X'WX
+    and X'WY. A batch of replicates is then a matrix product of
+    resampling weights with those contributions and a batched p x p
+    solve, so no replicate touches the raw data. Batches run in a
+    process pool that reads the contributions from shared memory.
+
+    Parameters:
+    -----------
+    X : DataFrame
+        Predictors (complete cases)
+    Y : DataFrame or Series
+        One or more outcomes sharing X
+    weights : array, optional
+        Sampling weights (weighted least squares)
+    clusters : array or list of arrays, optional
+        Resampling unit per row, e.g. [SDMVSTRA, SDMVPSU] for NHANES PSUs.
+        Rows are resampled when omitted.
+    strata : array, optional
+        Stratum per row; units are resampled within strata (Rao-Wu)
+    n_replicates : int
+        Number of bootstrap replicates
+    n_jobs : int
+        Worker processes
+    batch_size : int
+        Replicates per job
+    alpha : float
+        Percentile intervals cover 1 - alpha
+    max_memory_mb : float
+        Bound on the replicate-weight block held at once by a job
+    random_state : int
+        Seed for the resampling
+
+    Returns:
+    --------
+    dict
+        replicates (n_replicates x params x outcomes), std_errors,
+        ci_lower, ci_upper (DataFrames, params x outcomes), n_units
+    """
+    design, names, Y, outcome_names = _design_arrays(X, Y, add_constant)
+    p, k = len(names), len(outcome_names)
+
+    codes, n_units = _unit_codes(clusters, len(design))
+    contributions = ols_contributions(design, Y, weights)
+    if clusters is not None:
+        contributions = _unit_totals(contributions, codes, n_units)
+
+    arrays = {'contributions': contributions}
+    stratified = strata is not None
+    if stratified:
+        unit_strata = np.empty(n_units, dtype=np.int64)
+        unit_strata[codes] = pd.factorize(np.asarray(strata))[0]
+        arrays['strata'] = unit_strata
+
+    sizes = [batch_size] * (n_replicates // batch_size)
+    if n_replicates % batch_size:
+        sizes.append(n_replicates % batch_size)
+    seeds = [int(s.generate_state(1)[0])
+             for s in np.random.SeedSequence(random_state).spawn(len(sizes))]
+
+    with shared_pool(arrays, n_jobs) as pool:
+        batches = pool.map(_bootstrap_job, sizes, seeds, [p] * len(sizes), [k] * len(sizes),
+                           [stratified] * len(sizes), [max_memory_mb] * len(sizes))
+    replicates = np.concatenate(batches)
+
+    def frame(values):
+        return pd.DataFrame(values, index=names, columns=outcome_names)
+
+    return {
+        'replicates': replicates,
+        'std_errors': frame(np.nanstd(replicates, axis=0, ddof=1)),
+        'ci_lower': frame(np.nanpercentile(replicates, 100 * alpha / 2, axis=0)),
+        'ci_upper': frame(np.nanpercentile(replicates, 100 * (1 - alpha / 2), axis=0)),
+        'n_units': n_units
+    }
+
+
+def cluster_robust_ols(X, Y, clusters, weights=None, add_constant=True):
+    """
+    Cluster-robust (CR1) sandwich standard errors for OLS
+
+    V = c * A^-1 (sum_g u_g u_g') A^-1 with A = X'WX, u_g the cluster
+    totals of w_i x_i e_i and c = G/(G-1) * (N-1)/(N-p), matching the
+    Stata and statsmodels small-sample adjustment.
+
+    Parameters:
+    -----------
+    X : DataFrame
+        Predictors (complete cases)
+    Y : DataFrame or Series
+        One or more outcomes sharing X
+    clusters : array or list of arrays
+        Cluster per row, e.g. [SDMVSTRA, SDMVPSU]
+    weights : array, optional
+        Sampling weights
+
+    Returns:
+    --------
+    dict
+        coefficients, std_errors (DataFrames, params x outcomes),
+        covariances (outcome -> DataFrame), n_clusters
+    """
+    design, names, Y, outcome_names = _design_arrays(X, Y, add_constant)
+    n, p = design.shape
+    w = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+
+    weighted = design * w[:, None]
+    A_inv = np.linalg.inv(weighted.T @ design)
+    coefficients = A_inv @ (weighted.T @ Y)
+    residuals = Y - design @ coefficients
+
+    codes, n_clusters = _unit_codes(clusters, n)
+    scores = (weighted[:, :, None] * residuals[:, None, :]).reshape(n, -1)
+    totals = _unit_totals(scores, codes, n_clusters)
+    correction = n_clusters / (n_clusters - 1) * (n - 1) / (n - p)
+
+    covariances = {}
+    std_errors = np.empty((p, len(outcome_names)))
+    for j, outcome in enumerate(outcome_names):
+        u = totals[:, j::len(outcome_names)]
+        cov = correction * A_inv @ (u.T @ u) @ A_inv
+        covariances[outcome] = pd.DataFrame(cov, index=names, columns=names)
+        std_errors[:, j] = np.sqrt(np.diag(cov))
+
+    return {
+        'coefficients': pd.DataFrame(coefficients, index=names, columns=outcome_names),
+        'std_errors': pd.DataFrame(std_errors, index=names, columns=outcome_names),
+        'covariances': covariances,
+        'n_clusters': n_clusters
+    }
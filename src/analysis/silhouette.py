@@ -0,0 +1,171 @@
+"""
+Silhouette Scoring
+Memory-bounded exact and stratified-sample silhouette estimates for large N
+"""
+
+import numpy as np
+from scipy import stats
+
+
+def _block_sizes(n_rows, n_cols, max_memory_mb):
+    """Row/column block sizes keeping one float64 distance block under budget"""
+    budget = max(int(max_memory_mb * 2 ** 20 // 8), 1)
+    col_block = min(n_cols, budget)
+    row_block = max(min(n_rows, budget // col_block), 1)
+    return row_block, col_block
+
+
+def silhouette_samples_chunked(X, labels, rows=None, max_memory_mb=64):
+    """
+    Exact silhouette values computed from bounded pairwise-distance blocks
+
+    Parameters:
+    -----------
+    X : array
+        Feature matrix, shape (n_samples, n_features)
+    labels : array
+        Cluster label for every row of X
+    rows : array of int, optional
+        Rows to score (default all). Each is scored against the full X.
+    max_memory_mb : float
+        Ceiling on the size of any single distance block
+
+    Returns:
+    --------
+    array
+        Silhouette value for each scored row
+    """
+    X = np.asarray(X, dtype=float)
+    _, codes = np.unique(labels, return_inverse=True)
+    codes = codes.ravel()
+    n_clusters = codes.max() + 1
+    counts = np.bincount(codes, minlength=n_clusters)
+    if n_clusters < 2 or n_clusters >= len(X):
+        raise ValueError(
+            f"Number of labels is {n_clusters}. Valid values are 2 to n_samples - 1 (inclusive)"
+        )
+
+    rows = np.arange(len(X)) if rows is None else np.asarray(rows)
+    sq_norms = (X ** 2).sum(axis=1)
+    row_block, col_block = _block_sizes(len(rows), len(X), max_memory_mb)
+
+    # Distance sums from every scored row to every cluster
+    cluster_sums = np.zeros((len(rows), n_clusters))
+    for c_start in range(0, len(X), col_block):
+        c_stop = min(c_start + col_block, len(X))
+        col_codes = codes[c_start:c_stop]
+        one_hot = np.zeros((c_stop - c_start, n_clusters))
+        one_hot[np.arange(c_stop - c_start), col_codes] = 1.0
+        for r_start in range(0, len(rows), row_block):
+            r_idx = rows[r_start:r_start + row_block]
+            d2 = (sq_norms[r_idx, None] + sq_norms[None, c_start:c_stop]
+                  - 2 * X[r_idx] @ X[c_start:c_stop].T)
+            np.maximum(d2, 0, out=d2)
+            # Zero self-distances that rounding would leave slightly positive
+            own = (r_idx >= c_start) & (r_idx < c_stop)
+            d2[np.flatnonzero(own), r_idx[own] - c_start] = 0.0
+            cluster_sums[r_start:r_start + len(r_idx)] += np.sqrt(d2) @ one_hot
+
+    row_codes = codes[rows]
+    own_counts = counts[row_codes]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = cluster_sums[np.arange(len(rows)), row_codes] / (own_counts - 1)
+        mean_other = cluster_sums / counts
+        mean_other[np.arange(len(rows)), row_codes] = np.inf
+        b = mean_other.min(axis=1)
+        sil = (b - a) / np.maximum(a, b)
+    # Singleton clusters get 0, matching sklearn
+    sil[own_counts == 1] = 0.0
+    return np.nan_to_num(sil)
+
+
+def silhouette_score_chunked(X, labels, max_memory_mb=64):
+    """
+    Exact mean silhouette with a fixed memory ceiling
+
+    Parameters:
+    -----------
+    X : array
+        Feature matrix
+    labels : array
+        Cluster labels
+    max_memory_mb : float
+        Ceiling on the size of any single distance block
+
+    Returns:
+    --------
+    float
+        Mean silhouette coefficient
+    """
+    return float(silhouette_samples_chunked(X, labels, max_memory_mb=max_memory_mb).mean())
+
+
+def silhouette_score_sampled(X, labels, sample_size=10000, confidence=0.95,
+                             random_state=None, max_memory_mb=64):
+    """
+    Stratified-sample estimate of the mean silhouette with a confidence interval
+
+    Rows are sampled within each cluster in proportion to cluster size and
+    scored exactly against the full data, so the estimate is unbiased and
+    costs O(sample_size * n) instead of O(n²).
+
+    Parameters:
+    -----------
+    X : array
+        Feature matrix
+    labels : array
+        Cluster labels
+    sample_size : int
+        Total rows to score
+    confidence : float
+        Confidence level of the interval
+    random_state : int, optional
+        Seed for the sample
+    max_memory_mb : float
+        Ceiling on the size of any single distance block
+
+    Returns:
+    --------
+    dict
+        score, std_error, ci_lower, ci_upper, sample_size
+    """
+    labels = np.asarray(labels)
+    n = len(labels)
+    if sample_size >= n:
+        score = silhouette_score_chunked(X, labels, max_memory_mb=max_memory_mb)
+        return {'score': score, 'std_error': 0.0, 'ci_lower': score,
+                'ci_upper': score, 'sample_size': n}
+
+    rng = np.random.default_rng(random_state)
+    _, codes = np.unique(labels, return_inverse=True)
+    codes = codes.ravel()
+    counts = np.bincount(codes)
+    weights = counts / n
+
+    # Proportional allocation, at least two rows per stratum for a variance
+    alloc = np.minimum(np.maximum(np.round(weights * sample_size).astype(int), 2), counts)
+    order = np.argsort(codes, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rows = np.concatenate([
+        order[start + rng.choice(count, size=m, replace=False)]
+        for start, count, m in zip(starts, counts, alloc)
+    ])
+    row_strata = np.repeat(np.arange(len(counts)), alloc)
+
+    sil = silhouette_samples_chunked(X, labels, rows=rows, max_memory_mb=max_memory_mb)
+
+    stratum_means = np.bincount(row_strata, weights=sil) / alloc
+    stratum_ss = np.bincount(row_strata, weights=(sil - stratum_means[row_strata]) ** 2)
+    stratum_var = np.where(alloc > 1, stratum_ss / np.maximum(alloc - 1, 1), 0.0)
+
+    score = float((weights * stratum_means).sum())
+    fpc = 1 - alloc / counts
+    std_error = float(np.sqrt((weights ** 2 * fpc * stratum_var / alloc).sum()))
+    z = float(stats.norm.ppf(0.5 + confidence / 2))
+    return {
+        'score': score,
+        'std_error': std_error,
+        'ci_lower': score - z * std_error,
+        'ci_upper': score + z * std_error,
+        'sample_size': int(alloc.sum())
+    }
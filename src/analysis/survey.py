@@ -0,0 +1,345 @@
+"""
+Survey-Weighted Estimation
+Design-based means, proportions and OLS with Taylor-linearized standard errors
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy import linalg, stats
+
+from .reporting import get_logger, log_section, write_metrics
+
+logger = get_logger(__name__)
+
+
+# NHANES interview weight, masked variance pseudo-stratum and pseudo-PSU
+# (data_prep.clean_data.SURVEY_DESIGN_VARIABLES also lists the exam weight)
+SURVEY_WEIGHT = 'WTINT2YR'
+SURVEY_STRATUM = 'SDMVSTRA'
+SURVEY_PSU = 'SDMVPSU'
+SURVEY_INTERVIEW_DESIGN = [SURVEY_WEIGHT, SURVEY_STRATUM, SURVEY_PSU]
+
+SURVEY_MEAN_COLUMNS = ['SLD012', 'SLD013', 'AVG_SLEEP', 'SLQ030', 'SLQ120']
+
+SURVEY_PROPORTIONS = {
+    'POOR_SLEEP': ('POOR_SLEEP', 1),
+    'POOR_SLEEP_DIAGNOSIS': ('SLQ050', 1),
+    'CURRENT_SMOKER': ('SMOKING_STATUS', 1),
+    'HEAVY_DRINKER': ('ALCOHOL_STATUS', 3)
+}
+
+
+class SurveyDesign:
+    """
+    Stratified, clustered sample design with one weight per row
+
+    Rows are sorted by (stratum, PSU) once, so PSU totals of any number of
+    score columns are a single np.add.reduceat and stratum means of PSU
+    totals a second one. Variances follow the with-replacement
+    (ultimate cluster) Taylor linearization used for NHANES:
+
+        V = sum_h n_h / (n_h - 1) * sum_i (z_hi - zbar_h)(z_hi - zbar_h)'
+
+    where z_hi are PSU totals of the linearized scores. Strata with a
+    single PSU contribute nothing.
+
+    Parameters:
+    -----------
+    weights, strata, psu : array
+        Per-row sampling weight, stratum and PSU (within stratum) codes
+    """
+
+    def __init__(self, weights, strata, psu):
+        self.weights = np.asarray(weights, dtype=float)
+        strata = np.asarray(strata)
+        psu = np.asarray(psu)
+
+        self._order = np.lexsort((psu, strata))
+        sorted_strata = strata[self._order]
+        sorted_psu = psu[self._order]
+        new_psu = np.ones(len(self._order), dtype=bool)
+        new_psu[1:] = (sorted_strata[1:] != sorted_strata[:-1]) | (sorted_psu[1:] != sorted_psu[:-1])
+        self._psu_starts = np.flatnonzero(new_psu)
+
+        psu_strata = sorted_strata[self._psu_starts]
+        new_stratum = np.ones(len(psu_strata), dtype=bool)
+        new_stratum[1:] = psu_strata[1:] != psu_strata[:-1]
+        self._stratum_starts = np.flatnonzero(new_stratum)
+        self.psu_per_stratum = np.diff(np.append(self._stratum_starts, len(psu_strata)))
+        self._psu_stratum = np.repeat(np.arange(len(self._stratum_starts)), self.psu_per_stratum)
+
+    @classmethod
+    def from_frame(cls, df, weight=SURVEY_WEIGHT, strata=SURVEY_STRATUM, psu=SURVEY_PSU):
+        """Build from the NHANES design columns of a frame"""
+        return cls(df[weight].to_numpy(dtype=float), df[strata].to_numpy(), df[psu].to_numpy())
+
+    def __len__(self):
+        return len(self.weights)
+
+    @property
+    def n_psu(self):
+        return len(self._psu_starts)
+
+    @property
+    def n_strata(self):
+        return len(self._stratum_starts)
+
+    @property
+    def df(self):
+        """Design degrees of freedom: number of PSUs minus number of strata"""
+        return self.n_psu - self.n_strata
+
+    def psu_totals(self, scores):
+        """Sum score columns within each PSU, shape (n_psu, n_columns)"""
+        scores = np.asarray(scores, dtype=float)
+        if scores.ndim == 1:
+            scores = scores[:, None]
+        return np.add.reduceat(scores[self._order], self._psu_starts, axis=0)
+
+    def variance(self, scores):
+        """
+        Linearized covariance of the totals of the score columns
+
+        Parameters:
+        -----------
+        scores : array
+            Weighted per-row scores, shape (n,) or (n, k)
+
+        Returns:
+        --------
+        array
+            Covariance matrix, shape (k, k)
+        """
+        totals = self.psu_totals(scores)
+        stratum_means = (np.add.reduceat(totals, self._stratum_starts, axis=0)
+                         / self.psu_per_stratum[:, None])
+        centered = totals - stratum_means[self._psu_stratum]
+        n_h = self.psu_per_stratum[self._psu_stratum]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = np.where(n_h > 1, n_h / (n_h - 1), 0.0)
+        return (centered * factor[:, None]).T @ centered
+
+
+def _confidence_frame(estimates, std_errors, df, index, alpha=0.05):
+    t_critical = stats.t.ppf(1 - alpha / 2, df)
+    return pd.DataFrame({
+        'Estimate': estimates,
+        'Std Error': std_errors,
+        'CI Lower': estimates - t_critical * std_errors,
+        'CI Upper': estimates + t_critical * std_errors
+    }, index=index)
+
+
+def survey_means(df, columns, design=None, alpha=0.05):
+    """
+    Weighted means of several columns with linearized standard errors
+
+    Rows missing a column are treated as outside that column's domain
+    (weight zero) rather than dropped from the design, so every column
+    keeps the full set of PSUs.
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Data with the design columns
+    columns : list of str
+        Columns to average
+    design : SurveyDesign, optional
+        Built from the NHANES columns of df when omitted
+    alpha : float
+        Confidence level is 1 - alpha (t on the design degrees of freedom)
+
+    Returns:
+    --------
+    DataFrame
+        Estimate, Std Error, CI Lower, CI Upper, N, Weighted N per column
+    """
+    design = design or SurveyDesign.from_frame(df)
+    values = df[columns].to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    weights = np.where(valid, design.weights[:, None], 0.0)
+    values = np.where(valid, values, 0.0)
+
+    weight_totals = weights.sum(axis=0)
+    means = (weights * values).sum(axis=0) / weight_totals
+    # Influence of each row on the ratio estimator sum(wy) / sum(w)
+    scores = weights * (values - means) / weight_totals
+    std_errors = np.sqrt(np.diag(design.variance(scores)))
+
+    table = _confidence_frame(means, std_errors, design.df, pd.Index(columns, name='Variable'),
+                              alpha)
+    table['N'] = valid.sum(axis=0)
+    table['Weighted N'] = weight_totals
+    return table
+
+
+def survey_proportions(df, proportions=None, design=None, alpha=0.05):
+    """
+    Weighted prevalences with linearized standard errors
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Data with the design columns
+    proportions : dict
+        Output name -> (column, value): weighted share of non-missing rows
+        equal to value (default: SURVEY_PROPORTIONS present in df)
+    design : SurveyDesign, optional
+        Built from the NHANES columns of df when omitted
+
+    Returns:
+    --------
+    DataFrame
+        As survey_means, one row per prevalence
+    """
+    if proportions is None:
+        proportions = {name: spec for name, spec in SURVEY_PROPORTIONS.items()
+                       if spec[0] in df.columns}
+    indicators = pd.DataFrame({
+        name: np.where(df[column].isna(), np.nan, (df[column] == value).astype(float))
+        for name, (column, value) in proportions.items()
+    }, index=df.index)
+    for column in SURVEY_INTERVIEW_DESIGN:
+        if column in df.columns:
+            indicators[column] = df[column]
+    return survey_means(indicators, list(proportions), design=design, alpha=alpha)
+
+
+def survey_ols(X, Y, design, add_constant=True):
+    """
+    Design-weighted OLS for one or more outcomes
+
+    Coefficients solve X'WX b = X'Wy. The sandwich covariance
+    A^-1 V(U) A^-1 uses A = X'WX and the design variance of the score
+    totals U = sum_i w_i x_i e_i, computed for all outcomes in one
+    reduceat pass.
+
+    Parameters:
+    -----------
+    X : DataFrame
+        Predictors (complete cases)
+    Y : DataFrame or Series
+        Outcome column(s) aligned with X
+    design : SurveyDesign
+        Design for the same rows
+    add_constant : bool
+        Prepend an intercept column named 'const'
+
+    Returns:
+    --------
+    dict
+        coefficients, std_errors, tvalues, pvalues (params x outcomes),
+        covariances (outcome -> DataFrame), r2, rmse, mae (weighted,
+        Series per outcome), fitted, residuals, n, df_resid (n - n_params),
+        df_design (design df, used for the t statistics)
+    """
+    names = ['const'] + [str(c) for c in X.columns] if add_constant else [str(c) for c in X.columns]
+    design_matrix = X.to_numpy(dtype=float)
+    if add_constant:
+        design_matrix = np.column_stack([np.ones(len(design_matrix)), design_matrix])
+    if isinstance(Y, pd.Series):
+        Y = Y.to_frame()
+    outcome_names = [str(c) for c in Y.columns]
+    Y = Y.to_numpy(dtype=float)
+
+    w = design.weights
+    weighted = design_matrix * w[:, None]
+    factor = linalg.cho_factor(weighted.T @ design_matrix)
+    coefficients = linalg.cho_solve(factor, weighted.T @ Y)
+    A_inv = linalg.cho_solve(factor, np.eye(len(names)))
+
+    fitted = design_matrix @ coefficients
+    residuals = Y - fitted
+
+    # Scores for every outcome side by side: (n, n_params * n_outcomes)
+    n_params, n_outcomes = len(names), len(outcome_names)
+    scores = (weighted[:, :, None] * residuals[:, None, :]).reshape(len(Y), -1)
+    V = design.variance(scores).reshape(n_params, n_outcomes, n_params, n_outcomes)
+
+    covariances = {}
+    std_errors = np.empty((n_params, n_outcomes))
+    for j, outcome in enumerate(outcome_names):
+        cov = A_inv @ V[:, j, :, j] @ A_inv
+        covariances[outcome] = pd.DataFrame(cov, index=names, columns=names)
+        std_errors[:, j] = np.sqrt(np.diag(cov))
+
+    tvalues = coefficients / std_errors
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), design.df)
+
+    total = w.sum()
+    y_mean = (w @ Y) / total
+    rss = w @ residuals ** 2
+    tss = w @ (Y - y_mean) ** 2
+
+    def frame(values):
+        return pd.DataFrame(values, index=names, columns=outcome_names)
+
+    return {
+        'coefficients': frame(coefficients),
+        'std_errors': frame(std_errors),
+        'tvalues': frame(tvalues),
+        'pvalues': frame(pvalues),
+        'covariances': covariances,
+        'sigma2': pd.Series(rss / total, index=outcome_names),
+        'r2': pd.Series(1 - rss / tss, index=outcome_names),
+        'rmse': pd.Series(np.sqrt(rss / total), index=outcome_names),
+        'mae': pd.Series((w @ np.abs(residuals)) / total, index=outcome_names),
+        'fitted': fitted,
+        'residuals': residuals,
+        'n': len(Y),
+        'df_resid': len(Y) - n_params,
+        'df_design': design.df
+    }
+
+
+def perform_survey_descriptives(df, output_dir='results', columns=None, proportions=None):
+    """
+    Survey-weighted sleep means and prevalences
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Prepared data including WTINT2YR, SDMVSTRA and SDMVPSU
+    output_dir : str
+        Directory to save results
+    columns : list, optional
+        Columns to average (default: SURVEY_MEAN_COLUMNS present in df)
+    proportions : dict, optional
+        See survey_proportions
+
+    Returns:
+    --------
+    dict
+        means and prevalences tables
+    """
+    log_section(logger, "SURVEY-WEIGHTED ESTIMATES")
+
+    df_design = df.dropna(subset=SURVEY_INTERVIEW_DESIGN)
+    design = SurveyDesign.from_frame(df_design)
+    logger.info(f"\nRows with design information: {len(df_design)} "
+                f"({design.n_strata} strata, {design.n_psu} PSUs, df={design.df})")
+
+    columns = columns or [c for c in SURVEY_MEAN_COLUMNS if c in df_design.columns]
+    means = survey_means(df_design, columns, design=design)
+    prevalences = survey_proportions(df_design, proportions, design=design)
+    logger.info("\nWeighted means:")
+    logger.info(means.to_string())
+    logger.info("\nWeighted prevalences:")
+    logger.info(prevalences.to_string())
+
+    output_path = Path(output_dir)
+    (output_path / 'tables').mkdir(parents=True, exist_ok=True)
+    means.to_csv(output_path / 'tables' / 'survey_weighted_means.csv')
+    prevalences.to_csv(output_path / 'tables' / 'survey_weighted_prevalences.csv')
+
+    write_metrics(output_dir, 'survey', {
+        'n': len(df_design),
+        'n_strata': design.n_strata,
+        'n_psu': design.n_psu,
+        'df': design.df,
+        'means': means.reset_index(),
+        'prevalences': prevalences.reset_index()
+    })
+
+    return {'means': means, 'prevalences': prevalences, 'design': design}
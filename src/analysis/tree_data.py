@@ -0,0 +1,138 @@
+"""
+Tree Data
+Feature matrix, complete-case masks and seeded splits shared by the tree models
+"""
+
+from pathlib import Path
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from .design import CATEGORICAL_REFERENCES, build_design_matrix, data_hash
+
+
+class TreeDataset:
+    """
+    Prepared inputs for every tree, forest and boosting model on one frame
+
+    Feature columns are selected once; row masks and the seeded
+    train/test split of each task are computed on first use and reused
+    by every model. Splits are stored as row positions and, with
+    split_path, saved to disk under a hash of the data and split
+    settings, so reruns on the same data load them instead of
+    recomputing.
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Prepared data
+    feature_cols : list of str
+        Model features
+    targets : list of str
+        Target columns the dataset will be split for
+    categorical : bool
+        Expand categorical features (CATEGORICAL_REFERENCES) into sparse
+        indicators for the complete-case models
+    test_size : float
+        Fraction of rows held out
+    random_state : int
+        Seed for the splits
+    split_path : str or Path, optional
+        .npz file the split indices are saved to and loaded from
+    """
+
+    def __init__(self, df, feature_cols, targets, categorical=False, test_size=0.3,
+                 random_state=42, split_path=None):
+        self.feature_cols = list(feature_cols)
+        self.targets = list(targets)
+        self.frame = df[self.feature_cols + [t for t in self.targets if t not in self.feature_cols]]
+        self.categorical = categorical
+        self.test_size = test_size
+        self.random_state = random_state
+        self.split_path = None if split_path is None else Path(split_path)
+        self.key = data_hash(self.frame, (test_size, random_state))
+
+        self.X = self.frame[self.feature_cols]
+        self.complete_features = self.X.notna().all(axis=1).to_numpy()
+        self._design = None
+        self._splits = {}
+        if self.split_path is not None and self.split_path.exists():
+            self._load_splits()
+
+    @property
+    def feature_names(self):
+        return self.design.columns if self.categorical else self.feature_cols
+
+    @property
+    def design(self):
+        """Sparse design over the complete-feature rows, built on first use"""
+        if self._design is None:
+            self._design = build_design_matrix(
+                self.X[self.complete_features],
+                numeric=[c for c in self.feature_cols if c not in CATEGORICAL_REFERENCES],
+                categorical=[c for c in self.feature_cols if c in CATEGORICAL_REFERENCES])
+            self._design_rows = np.cumsum(self.complete_features) - 1
+        return self._design
+
+    def rows(self, target, complete=True):
+        """Positions of rows with the target observed (and every feature, when complete)"""
+        mask = self.frame[target].notna().to_numpy()
+        if complete:
+            mask = mask & self.complete_features
+        return np.flatnonzero(mask)
+
+    def split(self, target, stratify=False, complete=True):
+        """
+        Seeded train/test row positions for a task, computed once
+
+        Matches train_test_split on the task's rows with the dataset's
+        test_size and random_state.
+
+        Returns:
+        --------
+        tuple of arrays
+            (train, test) row positions
+        """
+        name = f"{target}_{'complete' if complete else 'observed'}{'_stratified' if stratify else ''}"
+        if name not in self._splits:
+            rows = self.rows(target, complete)
+            y = self.frame[target].to_numpy()[rows]
+            self._splits[name] = tuple(train_test_split(
+                rows, test_size=self.test_size, random_state=self.random_state,
+                stratify=y if stratify else None))
+            if self.split_path is not None:
+                self._save_splits()
+        return self._splits[name]
+
+    def features(self, rows, encode=True):
+        """
+        Features for the given row positions
+
+        Returns the feature frame, or the sparse indicator matrix when the
+        dataset is categorical and encode is True (rows must then have
+        every feature observed).
+        """
+        if self.categorical and encode:
+            return self.design.matrix[self._design_rows[rows]]
+        return self.X.iloc[rows]
+
+    def target(self, target, rows):
+        return self.frame[target].iloc[rows]
+
+    def _save_splits(self):
+        self.split_path.parent.mkdir(parents=True, exist_ok=True)
+        index = self.frame.index.to_numpy()
+        arrays = {'key': np.array(self.key),
+                  'index': index.astype(str) if index.dtype == object else index}
+        for name, (train, test) in self._splits.items():
+            arrays[f'{name}__train'] = train
+            arrays[f'{name}__test'] = test
+        np.savez(self.split_path, **arrays)
+
+    def _load_splits(self):
+        with np.load(self.split_path, allow_pickle=False) as data:
+            # Splits saved for other data or settings are ignored
+            if str(data['key']) != self.key:
+                return
+            for name in {f.rsplit('__', 1)[0] for f in data.files if '__' in f}:
+                self._splits[name] = (data[f'{name}__train'], data[f'{name}__test'])
@@ -0,0 +1,273 @@
+"""
+Tree Explanations
+Permutation importance and exact TreeSHAP attributions for the tree models
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from ._parallel import shared_pool, worker_array
+from .tree_inference import CompiledTreeEnsemble
+
+# Trees of an ensemble are explained in this many fixed groups, so the
+# order attributions are summed in does not depend on n_jobs
+SHAP_TREE_GROUPS = 8
+
+# Leaves with more path features than log2 of this get contribution
+# tables only for the agreement patterns present in the batch
+SHAP_MAX_PATTERNS = 4096
+
+
+def _dense_features(X):
+    if sparse.issparse(X):
+        return X.toarray()
+    return np.asarray(X, dtype=float)
+
+
+def _score(model, X, y):
+    # Models fitted on frames are scored on frames, as they were trained
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        X = pd.DataFrame(X, columns=names)
+    return model.score(X, y)
+
+
+def _permutation_job(model, column, seed, n_repeats):
+    """Score the model n_repeats times with one column shuffled"""
+    X = np.array(worker_array('X'))
+    y = worker_array('y')
+    original = X[:, column].copy()
+    rng = np.random.default_rng(seed)
+    scores = np.empty(n_repeats)
+    for repeat in range(n_repeats):
+        X[:, column] = rng.permutation(original)
+        scores[repeat] = _score(model, X, y)
+    return scores
+
+
+def permutation_importance(model, X, y, feature_names=None, n_repeats=10, n_jobs=1,
+                           random_state=42):
+    """
+    Drop in test score when each feature is shuffled
+
+    Each feature's repeats run as one job in a process pool; the test
+    rows are placed in shared memory once and read by every worker.
+    Every feature gets its own seed, so results do not depend on n_jobs.
+
+    Parameters:
+    -----------
+    model : fitted sklearn estimator
+        Scored with model.score (accuracy or R²)
+    X : DataFrame, array or sparse matrix
+        Held-out features
+    y : Series or array
+        Held-out target
+    feature_names : list of str, optional
+        Defaults to the frame's columns
+    n_repeats : int
+        Shuffles per feature
+    n_jobs : int
+        Worker processes
+    random_state : int
+        Seed for the shuffles
+
+    Returns:
+    --------
+    DataFrame
+        Feature, Importance Mean and Importance Std, largest first
+    """
+    if feature_names is None:
+        feature_names = list(getattr(X, 'columns', [f'x{i}' for i in range(X.shape[1])]))
+    X = _dense_features(X)
+    y = np.asarray(y)
+    baseline = _score(model, X, y)
+
+    seeds = np.random.SeedSequence(random_state).spawn(X.shape[1])
+    n_features = X.shape[1]
+    with shared_pool({'X': X, 'y': y}, n_jobs) as pool:
+        scores = pool.map(_permutation_job, [model] * n_features, range(n_features), seeds,
+                          [n_repeats] * n_features)
+    drops = baseline - np.vstack(scores)
+
+    return pd.DataFrame({
+        'Feature': list(feature_names),
+        'Importance Mean': drops.mean(axis=1),
+        'Importance Std': drops.std(axis=1)
+    }).sort_values('Importance Mean', ascending=False, ignore_index=True)
+
+
+def _extend(path, zero, one):
+    """Add a feature to the path, updating the subset-size weights of every element"""
+    zeros, ones, weights = path
+    depth = len(zeros)
+    zeros, ones = zeros + [zero], ones + [one]
+    weights = weights + [np.ones_like(one) if depth == 0 else np.zeros_like(one)]
+    for i in range(depth - 1, -1, -1):
+        weights[i + 1] = weights[i + 1] + one * weights[i] * (i + 1) / (depth + 1)
+        weights[i] = zero * weights[i] * (depth - i) / (depth + 1)
+    return zeros, ones, weights
+
+
+def _unwound_sum(path, i):
+    """Total weight of the path with element i removed, without rebuilding it"""
+    zeros, ones, weights = path
+    depth = len(weights) - 1
+    one, zero = ones[i], zeros[i]
+    hot = one != 0
+    one = np.where(hot, one, 1.0)
+    total = 0.0
+    carry = weights[depth]
+    for j in range(depth - 1, -1, -1):
+        scaled = carry * (depth + 1) / ((j + 1) * one)
+        total = total + np.where(hot, scaled, weights[j] * (depth + 1) / (zero * (depth - j)))
+        carry = weights[j] - scaled * zero * (depth - j) / (depth + 1)
+    return total
+
+
+def _leaf_table(zeros, bits, value):
+    """
+    TreeSHAP contribution of one leaf to each of its path features
+
+    zeros are the cover fractions of the leaf's path per feature; each
+    row of bits is a pattern of which features the explained row agrees
+    with (the "one fractions"). Returns shape (n_features, n_patterns).
+    """
+    path = _extend(([], [], []), 1.0, np.ones(len(bits)))
+    for i, zero in enumerate(zeros):
+        path = _extend(path, zero, bits[:, i])
+    return np.vstack([_unwound_sum(path, i + 1) * (bits[:, i] - zero) * value
+                      for i, zero in enumerate(zeros)])
+
+
+def _tree_shap(ensemble, root, X, output, phi):
+    """
+    Add one tree's exact path-dependent TreeSHAP values to phi (n_features, n_rows)
+
+    A row's contribution from a leaf depends only on which of the leaf's
+    path features it agrees with, so each leaf's contributions are
+    computed once per agreement pattern and gathered for all rows by
+    their pattern code.
+    """
+    has_missing = np.isnan(X).any()
+    cover = ensemble.cover
+
+    def recurse(node, conditions):
+        left, right = ensemble.left[node], ensemble.right[node]
+        if left == node:
+            if not conditions:
+                return
+            features = list(conditions)
+            zeros = [conditions[f][0] for f in features]
+            codes = np.zeros(len(X), dtype=np.intp)
+            for i, f in enumerate(features):
+                codes |= conditions[f][1].astype(np.intp) << i
+            if 2 ** len(features) <= SHAP_MAX_PATTERNS:
+                patterns = np.arange(2 ** len(features))
+            else:
+                patterns, codes = np.unique(codes, return_inverse=True)
+            bits = (patterns[:, None] >> np.arange(len(features))) & 1
+            table = _leaf_table(zeros, bits, ensemble.value[node, output])
+            for i, f in enumerate(features):
+                phi[f] += table[i][codes]
+            return
+
+        split = int(ensemble.feature[node])
+        x = X[:, split]
+        go_right = x > ensemble.threshold[node]
+        if has_missing:
+            go_right = np.where(np.isnan(x), not ensemble.missing_left[node], go_right)
+
+        # Repeated splits on a feature combine into one path element
+        zero, agrees = conditions.get(split, (1.0, True))
+        recurse(left, {**conditions, split: (zero * cover[left] / cover[node],
+                                             agrees & ~go_right)})
+        recurse(right, {**conditions, split: (zero * cover[right] / cover[node],
+                                              agrees & go_right)})
+
+    recurse(root, {})
+
+
+def _shap_job(ensemble, trees, output, start, stop):
+    X = worker_array('X')[start:stop]
+    phi = np.zeros((X.shape[1], len(X)))
+    for tree in trees:
+        _tree_shap(ensemble, ensemble.roots[tree], X, output, phi)
+    return phi
+
+
+def tree_shap(model, batch, output=None, chunk_size=65536, n_jobs=1):
+    """
+    Exact TreeSHAP attributions for a decision tree or random forest
+
+    Uses the path-dependent algorithm (Lundberg et al.), with node covers
+    as the background distribution. Each leaf is evaluated once per
+    pattern of agreement with its path, so the work per row is a gather. Attributions
+    of each row add up to its prediction minus the expected value. Row
+    chunks and groups of trees run as jobs in a process pool over the
+    batch in shared memory.
+
+    Parameters:
+    -----------
+    model : CompiledTreeEnsemble or fitted DecisionTree/RandomForest
+        Saved artifacts must include node covers (models compiled by
+        CompiledTreeEnsemble.from_model)
+    batch : DataFrame, dict of arrays, 2D array or sparse matrix
+        Rows to explain, as accepted by CompiledTreeEnsemble
+    output : int, optional
+        Class column explained for classifiers (default: the last class,
+        POOR_SLEEP = 1); ignored for regressors
+    chunk_size : int
+        Rows per job, bounding the per-row path arrays
+    n_jobs : int
+        Worker processes
+
+    Returns:
+    --------
+    tuple
+        (attributions of shape (n_rows, n_features), expected value)
+    """
+    ensemble = model if isinstance(model, CompiledTreeEnsemble) else \
+        CompiledTreeEnsemble.from_model(model)
+    if ensemble.cover is None:
+        raise ValueError("TreeSHAP needs node covers; recompile the model with "
+                         "CompiledTreeEnsemble.from_model")
+    if output is None:
+        output = ensemble.value.shape[1] - 1
+
+    X = ensemble._features(batch)
+    if sparse.issparse(X):
+        X = X.toarray()
+    X = np.asarray(X, dtype=np.float32)
+    n_rows = len(X)
+
+    groups = np.array_split(np.arange(ensemble.n_trees),
+                            min(ensemble.n_trees, SHAP_TREE_GROUPS))
+    jobs = [(trees, start, min(start + chunk_size, n_rows))
+            for start in range(0, n_rows, chunk_size) for trees in groups]
+    phi = np.zeros((X.shape[1], n_rows))
+    with shared_pool({'X': X}, n_jobs) as pool:
+        parts = pool.map(_shap_job, [ensemble] * len(jobs), [trees for trees, _, _ in jobs],
+                         [output] * len(jobs), [start for _, start, _ in jobs],
+                         [stop for _, _, stop in jobs])
+    for (_, start, stop), part in zip(jobs, parts):
+        phi[:, start:stop] += part
+
+    expected_value = float(ensemble.value[ensemble.roots, output].mean())
+    return phi.T / ensemble.n_trees, expected_value
+
+
+def shap_summary(attributions, feature_names):
+    """
+    Per-feature summary of TreeSHAP attributions
+
+    Returns:
+    --------
+    DataFrame
+        Feature, Mean |SHAP| and Mean SHAP, largest mean absolute first
+    """
+    return pd.DataFrame({
+        'Feature': list(feature_names),
+        'Mean |SHAP|': np.abs(attributions).mean(axis=0),
+        'Mean SHAP': attributions.mean(axis=0)
+    }).sort_values('Mean |SHAP|', ascending=False, ignore_index=True)
@@ -0,0 +1,266 @@
+"""
+Tree Inference
+Score decision trees and random forests from flat NumPy arrays
+"""
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+
+# Fitted tree models written by the decision tree analysis
+TREE_MODEL_STEMS = [
+    'decision_tree_classifier_poor_sleep',
+    'random_forest_classifier_poor_sleep',
+    'decision_tree_regressor_sleep_duration'
+]
+
+
+class CompiledTreeEnsemble:
+    """
+    One or more fitted trees flattened into contiguous node arrays
+
+    Nodes of all trees are concatenated; roots gives each tree's first
+    node. Leaves point to themselves, so a batch is evaluated by
+    advancing every (row, tree) pair one level per step for max_depth
+    steps, with no branching on leaves. Features are cast to float32
+    and compared with the float64 thresholds as sklearn does, so
+    predictions match the source model exactly.
+
+    Parameters:
+    -----------
+    feature_names : list of str
+        Column order expected by the model
+    feature, threshold : array
+        Split feature and threshold per node (0 for leaves)
+    left, right : array
+        Child node per node (the node itself for leaves)
+    missing_left : array of bool
+        Whether a missing value goes to the left child
+    value : array
+        Per-node output, shape (n_nodes, n_classes) for classifiers
+        (class fractions) or (n_nodes, 1) for regressors
+    roots : array
+        Root node of each tree
+    max_depth : int
+        Depth of the deepest tree
+    classes : array, optional
+        Class labels for classifiers; None for regressors
+    cover : array, optional
+        Weighted training samples per node (needed for TreeSHAP)
+    """
+
+    def __init__(self, feature_names, feature, threshold, left, right, missing_left, value,
+                 roots, max_depth, classes=None, cover=None):
+        self.feature_names = [str(name) for name in feature_names]
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.missing_left = np.asarray(missing_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.classes = None if classes is None else np.asarray(classes)
+        self.cover = None if cover is None else np.asarray(cover, dtype=np.float64)
+
+        # Children interleaved so the next node is one gather: child[2 * node + go_right]
+        self._children = np.column_stack([self.left, self.right]).ravel()
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def is_classifier(self):
+        return self.classes is not None
+
+    @classmethod
+    def from_model(cls, model, feature_names=None):
+        """
+        Build from a fitted DecisionTree or RandomForest (classifier or regressor)
+
+        feature_names defaults to the model's feature_names_in_ (models
+        fitted on arrays or sparse matrices need it passed explicitly).
+        scikit-learn before 1.4 stores weighted class counts in classifier
+        nodes and normalizes them in predict_proba, so those are divided by
+        their sum here; before 1.3 trees have no missing-value routing and
+        missing values go left.
+        """
+        from sklearn import __version__ as sklearn_version
+        from sklearn.utils.fixes import parse_version
+
+        counts = parse_version(sklearn_version) < parse_version('1.4')
+        if feature_names is None:
+            feature_names = getattr(model, 'feature_names_in_',
+                                    [f'x{i}' for i in range(model.n_features_in_)])
+        trees = [est.tree_ for est in getattr(model, 'estimators_', [model])]
+        classes = getattr(model, 'classes_', None)
+        n_outputs = len(classes) if classes is not None else 1
+
+        parts = {name: [] for name in ('feature', 'threshold', 'left', 'right',
+                                       'missing_left', 'value', 'cover')}
+        roots = []
+        offset = 0
+        for tree in trees:
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            parts['feature'].append(np.where(leaf, 0, tree.feature))
+            parts['threshold'].append(np.where(leaf, 0.0, tree.threshold))
+            parts['left'].append(np.where(leaf, nodes, tree.children_left) + offset)
+            parts['right'].append(np.where(leaf, nodes, tree.children_right) + offset)
+            parts['missing_left'].append(
+                np.asarray(getattr(tree, 'missing_go_to_left', np.ones(tree.node_count)),
+                           dtype=bool))
+            value = tree.value[:, 0, :n_outputs]
+            if counts and classes is not None:
+                normalizer = value.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            parts['value'].append(value)
+            parts['cover'].append(tree.weighted_n_node_samples)
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(feature_names, roots=roots, max_depth=max(t.max_depth for t in trees),
+                   classes=classes, **{name: np.concatenate(values)
+                                       for name, values in parts.items()})
+
+    def save(self, path):
+        """Save the artifact as an uncompressed .npz of plain arrays"""
+        arrays = {'feature_names': np.array(self.feature_names), 'feature': self.feature,
+                  'threshold': self.threshold, 'left': self.left, 'right': self.right,
+                  'missing_left': self.missing_left, 'value': self.value,
+                  'roots': self.roots, 'max_depth': np.array(self.max_depth)}
+        if self.classes is not None:
+            arrays['classes'] = self.classes
+        if self.cover is not None:
+            arrays['cover'] = self.cover
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load an artifact written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['feature_names'].tolist(), data['feature'], data['threshold'],
+                       data['left'], data['right'], data['missing_left'], data['value'],
+                       data['roots'], int(data['max_depth']),
+                       data['classes'] if 'classes' in data.files else None,
+                       data['cover'] if 'cover' in data.files else None)
+
+    def _features(self, batch):
+        if hasattr(batch, 'columns') or isinstance(batch, dict):
+            return np.column_stack([np.asarray(batch[name], dtype=np.float32)
+                                    for name in self.feature_names])
+        if sparse.issparse(batch):
+            return sparse.csr_matrix(batch)
+        X = np.asarray(batch, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(
+                f"Expected an array with {len(self.feature_names)} columns "
+                f"({', '.join(self.feature_names)})"
+            )
+        return X
+
+    def _blocks(self, batch, chunk_size):
+        X = self._features(batch)
+        for start in range(0, X.shape[0], chunk_size):
+            block = X[start:start + chunk_size]
+            if sparse.issparse(block):
+                block = block.toarray()
+            yield np.asarray(block, dtype=np.float32)
+
+    def _apply_block(self, X):
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        has_missing = np.isnan(flat).any()
+        nodes = np.tile(self.roots, (len(X), 1))
+        for _ in range(self.max_depth):
+            x = flat[row_offsets + self.feature[nodes]]
+            # x > threshold is "not x <= threshold" for every non-missing x
+            go_right = x > self.threshold[nodes]
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.missing_left[nodes], go_right)
+            nodes = self._children[2 * nodes + go_right]
+        return nodes
+
+    def _chunk_rows(self, chunk_size):
+        # Keep the rows x trees work arrays around a few MB
+        return chunk_size or max(1024, 2 ** 18 // self.n_trees)
+
+    def apply(self, batch, chunk_size=None):
+        """
+        Leaf node (global index) reached by each row in each tree
+
+        Parameters:
+        -----------
+        batch : DataFrame, dict of arrays, 2D array or sparse matrix
+            Features. Frames and dicts are selected by name; arrays must
+            already be in feature_names order.
+        chunk_size : int, optional
+            Rows per block, bounding the rows x trees work arrays
+            (default: about 2**18 / n_trees)
+
+        Returns:
+        --------
+        array
+            Shape (n_rows, n_trees)
+        """
+        blocks = self._blocks(batch, self._chunk_rows(chunk_size))
+        return np.concatenate([self._apply_block(X) for X in blocks]
+                              or [np.empty((0, self.n_trees), dtype=np.intp)])
+
+    def _average(self, batch, chunk_size):
+        blocks = []
+        for X in self._blocks(batch, self._chunk_rows(chunk_size)):
+            leaves = np.ascontiguousarray(self._apply_block(X).T)
+            # Trees are added one at a time in order and divided once, the
+            # same summation sklearn forests use (a reduction may reorder it)
+            total = np.zeros((len(X), self.value.shape[1]))
+            for tree_leaves in leaves:
+                total += self.value[tree_leaves]
+            blocks.append(total / self.n_trees)
+        return np.concatenate(blocks) if blocks else np.empty((0, self.value.shape[1]))
+
+    def predict_proba(self, batch, chunk_size=None):
+        """Class probabilities (classifiers), same as the source model's predict_proba"""
+        if not self.is_classifier:
+            raise ValueError("predict_proba is only available for classifiers")
+        return self._average(batch, chunk_size)
+
+    def predict(self, batch, chunk_size=None):
+        """Predicted class or value, same as the source model's predict"""
+        output = self._average(batch, chunk_size)
+        if self.is_classifier:
+            return self.classes.take(output.argmax(axis=1))
+        return output[:, 0]
+
+
+def export_tree_models(model_dir, feature_names=None):
+    """
+    Compile the saved tree models in a directory next to their joblib files
+
+    Parameters:
+    -----------
+    model_dir : str or Path
+        Directory holding {stem}.joblib files (TREE_MODEL_STEMS)
+    feature_names : list of str, optional
+        Needed only for models fitted without column names
+
+    Returns:
+    --------
+    dict
+        stem -> path of the written .npz artifact
+    """
+    model_dir = Path(model_dir)
+    written = {}
+    for stem in TREE_MODEL_STEMS:
+        source = model_dir / f'{stem}.joblib'
+        if not source.exists():
+            continue
+        path = model_dir / f'{stem}.npz'
+        CompiledTreeEnsemble.from_model(joblib.load(source), feature_names).save(path)
+        written[stem] = path
+    return written
@@ -0,0 +1,210 @@
+"""
+Tree Tuning
+Successive-halving hyperparameter search for decision trees and random forests
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import KFold, ParameterGrid, StratifiedKFold
+
+from ._parallel import shared_pool, worker_array
+from .reporting import get_logger
+
+logger = get_logger(__name__)
+
+
+DEFAULT_TREE_GRID = {
+    'max_depth': [3, 5, 7, 10],
+    'min_samples_leaf': [20, 50, 100]
+}
+
+# Averaging over trees offsets the variance of deeper trees with smaller
+# leaves, so forests search further in that direction than single trees
+DEFAULT_FOREST_GRID = {
+    'max_depth': [5, 10, 15, None],
+    'min_samples_leaf': [5, 10, 25]
+}
+
+# Ensemble sizes are searched as the halving resource: survivors grow from
+# FOREST_MIN_ESTIMATORS trees up to FOREST_MAX_ESTIMATORS by warm starts
+FOREST_MIN_ESTIMATORS = 25
+FOREST_MAX_ESTIMATORS = 200
+
+
+def _feature_arrays(X):
+    """Arrays for shared memory; CSR matrices are shared as their components"""
+    if sparse.issparse(X):
+        X = sparse.csr_matrix(X)
+        return {'X_data': X.data, 'X_indices': X.indices, 'X_indptr': X.indptr,
+                'X_shape': np.array(X.shape)}
+    return {'X': np.asarray(X, dtype=float)}
+
+
+def _worker_features():
+    try:
+        return worker_array('X')
+    except KeyError:
+        return sparse.csr_matrix((worker_array('X_data'), worker_array('X_indices'),
+                                  worker_array('X_indptr')), shape=tuple(worker_array('X_shape')))
+
+
+def _halving_job(estimator, resource, n_resources, fold):
+    """
+    Fit one candidate on one fold's training rows at the given resource
+    and score it on the held-out fold
+
+    With resource='n_estimators' the forest is warm-started, so only the
+    trees added since the last round are grown. With resource='n_samples'
+    the candidate sees the first n_resources training rows of a fixed
+    random order.
+    """
+    X = _worker_features()
+    y = worker_array('y')
+    folds = worker_array('folds')
+
+    if resource == 'n_estimators':
+        estimator.set_params(n_estimators=n_resources)
+        rows = np.flatnonzero(folds != fold)
+    else:
+        order = worker_array('order')
+        rows = order[folds[order] != fold][:n_resources]
+    estimator.fit(X[rows], y[rows])
+
+    test = np.flatnonzero(folds == fold)
+    return estimator, estimator.score(X[test], y[test])
+
+
+def successive_halving(estimator, param_grid, X, y, resource='n_estimators',
+                       min_resources=None, max_resources=None, factor=2, cv=3,
+                       n_jobs=1, random_state=42):
+    """
+    Successive-halving search over a parameter grid
+
+    All candidates are cross-validated with a small resource; the best
+    1/factor of them advance to the next round with factor times more.
+    Every (candidate, fold) fit of a round runs in one process pool. For
+    forests the resource is n_estimators and each candidate's per-fold
+    forest is warm-started, so later rounds only add trees.
+
+    Parameters:
+    -----------
+    estimator : sklearn estimator
+        Tree or forest with the fixed settings (e.g. random_state)
+    param_grid : dict
+        Parameter -> candidate values
+    X : DataFrame, array or sparse matrix
+        Training features
+    y : Series or array
+        Training target
+    resource : str
+        'n_estimators' (forests) or 'n_samples' (training rows per fold)
+    min_resources, max_resources : int, optional
+        Resource range; defaults to FOREST_MIN/MAX_ESTIMATORS for forests
+        and the smallest training fold for n_samples
+    factor : int
+        Fraction of candidates (1/factor) kept after each round
+    cv : int
+        Cross-validation folds (stratified for classifiers)
+    n_jobs : int
+        Worker processes for the search. Candidates are fitted with
+        n_jobs=1 inside the pool; the estimator's n_jobs (if it has one)
+        is set to n_jobs only for the final refit.
+    random_state : int
+        Seed for the folds and the row order
+
+    Returns:
+    --------
+    dict
+        best_params, best_score, best_estimator (refitted on all of X),
+        results (one row per round and candidate)
+    """
+    if resource not in ('n_estimators', 'n_samples'):
+        raise ValueError(f"Unknown halving resource: {resource}")
+
+    candidates = list(ParameterGrid(param_grid))
+    y_values = np.asarray(y)
+    n = len(y_values)
+
+    splitter = (StratifiedKFold if is_classifier(estimator) else KFold)(
+        n_splits=cv, shuffle=True, random_state=random_state)
+    folds = np.empty(n, dtype=np.int64)
+    for fold, (_, test) in enumerate(splitter.split(np.zeros(n), y_values)):
+        folds[test] = fold
+
+    n_rounds = max(math.ceil(math.log(len(candidates), factor)), 1)
+    if resource == 'n_estimators':
+        max_resources = max_resources or FOREST_MAX_ESTIMATORS
+        min_resources = min_resources or FOREST_MIN_ESTIMATORS
+    else:
+        max_resources = max_resources or int(n - np.bincount(folds).max())
+        min_resources = min_resources or max(max_resources // factor ** (n_rounds - 1), 1)
+    schedule = [max(max_resources // factor ** (n_rounds - 1 - i), min_resources)
+                for i in range(n_rounds)]
+
+    # One estimator per (candidate, fold), kept across rounds for warm starts.
+    # Folds already run in parallel, so each fit is single-threaded.
+    threaded = 'n_jobs' in estimator.get_params()
+    models = {}
+    for c, params in enumerate(candidates):
+        for fold in range(cv):
+            model = clone(estimator).set_params(**params)
+            if threaded:
+                model.set_params(n_jobs=1)
+            if resource == 'n_estimators':
+                model.set_params(warm_start=True)
+            models[(c, fold)] = model
+
+    arrays = {**_feature_arrays(X), 'y': y_values, 'folds': folds}
+    if resource == 'n_samples':
+        arrays['order'] = np.random.default_rng(random_state).permutation(n)
+
+    alive = list(range(len(candidates)))
+    records = []
+    with shared_pool(arrays, n_jobs) as pool:
+        for round_idx, n_resources in enumerate(schedule):
+            jobs = [(c, fold) for c in alive for fold in range(cv)]
+            fitted = pool.map(_halving_job, [models[job] for job in jobs],
+                              [resource] * len(jobs), [n_resources] * len(jobs),
+                              [fold for _, fold in jobs])
+
+            scores = {c: [] for c in alive}
+            for job, (model, score) in zip(jobs, fitted):
+                models[job] = model
+                scores[job[0]].append(score)
+            for c in alive:
+                records.append({'Round': round_idx + 1, resource: n_resources,
+                                **candidates[c], 'Mean Score': np.mean(scores[c]),
+                                'Std Score': np.std(scores[c])})
+
+            ranked = sorted(alive, key=lambda c: -np.mean(scores[c]))
+            if round_idx < n_rounds - 1:
+                alive = ranked[:max(math.ceil(len(alive) / factor), 1)]
+                # Models of eliminated candidates are no longer needed
+                models = {job: m for job, m in models.items() if job[0] in alive}
+            else:
+                best, best_score = ranked[0], float(np.mean(scores[ranked[0]]))
+
+    best_params = dict(candidates[best])
+    if resource == 'n_estimators':
+        best_params['n_estimators'] = schedule[-1]
+    best_estimator = clone(estimator).set_params(**best_params)
+    if threaded:
+        best_estimator.set_params(n_jobs=n_jobs)
+    best_estimator.fit(X, y)
+    results = pd.DataFrame(records)
+
+    logger.info(f"Successive halving: {len(candidates)} candidates, {n_rounds} rounds "
+                f"({resource} {schedule[0]} -> {schedule[-1]}), best {best_params} "
+                f"(CV score {best_score:.4f})",
+                extra={'fields': {'best_params': best_params, 'best_score': best_score}})
+
+    return {
+        'best_params': best_params,
+        'best_score': best_score,
+        'best_estimator': best_estimator,
+        'results': results
+    }
@@ -7,6 +7,11 @@ import numpy as np
 import pandas as pd
 
 
+# Sample weights and masked variance units are never special-coded, and
+# stratum numbers such as 7, 9 or 77 occur in some survey cycles
+SURVEY_DESIGN_VARIABLES = ['WTINT2YR', 'WTMEC2YR', 'SDMVPSU', 'SDMVSTRA']
+
+
 def clean_special_values(df, columns=None):
     """
     Recode special NHANES values (7, 9, 77, 99, 777, 999) as NaN
@@ -17,7 +22,8 @@ def clean_special_values(df, columns=None):
     df : DataFrame
         Input dataframe
     columns : list, optional
-        Specific columns to clean. If None, cleans all numeric columns.
+        Specific columns to clean. If None, cleans all numeric columns
+        except the survey design variables.
     
     Returns:
     --------
@@ -25,7 +31,8 @@ def clean_special_values(df, columns=None):
         Dataframe with special values recoded as NaN
     """
     if columns is None:
-        columns = df.select_dtypes(include=[np.number]).columns
+        columns = [c for c in df.select_dtypes(include=[np.number]).columns
+                   if c not in SURVEY_DESIGN_VARIABLES]
     
     special_values = [7, 9, 77, 99, 777, 999, 7.0, 9.0, 77.0, 99.0, 777.0, 999.0]
     
@@ -6,6 +6,8 @@ Functions to create derived variables for analysis
 import numpy as np
 import pandas as pd
 
+from .clean_data import SURVEY_DESIGN_VARIABLES
+
 
 def create_sleep_variables(df):
     """
@@ -183,8 +185,11 @@ def select_analysis_variables(df):
     demo_vars = ['RIAGENDR', 'RIDAGEYR', 'RIDRETH1', 'DMDEDUC2', 
                 'INDFMPIR', 'DMDHHSIZ', 'AGE_GROUP', 'LOW_INCOME', 'GENDER']
     
+    # Survey design: weights, strata and PSUs for design-based estimates
+    design_vars = SURVEY_DESIGN_VARIABLES
+    
     # Select variables that exist in dataframe
-    all_vars = core_vars + sleep_outcomes + smoking_vars + alcohol_vars + demo_vars
+    all_vars = core_vars + sleep_outcomes + smoking_vars + alcohol_vars + demo_vars + design_vars
     selected_vars = [v for v in all_vars if v in df.columns]
     
     df_selected = df[selected_vars].copy()